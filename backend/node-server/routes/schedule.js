@@ -5,10 +5,170 @@ const TimetableCell = require("../models/TimetableCell.js");
 const Class = require("../models/Class.js");
 const Teacher = require("../models/Teacher.js");
 const Subject = require("../models/Subject.js");
+const Room = require("../models/Room.js");
 const { auth } = require("../middleware/auth.js");
 
 const router = express.Router();
 
+const SCHEDULER_URL = "http://localhost:8000";
+const JOB_POLL_INTERVAL_MS = 1000;
+
+// Ask the scheduler for the compact timetable encoding: an ID dictionary
+// plus integer columns, gzip-compressed (axios decompresses it)
+const COLUMNAR_HEADERS = { Accept: "application/vnd.timetable.columnar+json" };
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+// Turn a columnar scheduler result back into the list of timetable cells
+function expandTimetable(result) {
+  if (!result || result.timetableFormat !== "columnar") {
+    return result;
+  }
+  const { ids, columns, length } = result.timetable;
+  const timetable = new Array(length);
+  for (let i = 0; i < length; i++) {
+    const cell = {
+      classId: ids.class[columns.class[i]],
+      day: ids.day[columns.day[i]],
+      period: columns.period[i],
+      subjectId: ids.subject[columns.subject[i]],
+      teacherId: ids.teacher[columns.teacher[i]]
+    };
+    if (columns.room) {
+      cell.roomId = columns.room[i] >= 0 ? ids.room[columns.room[i]] : null;
+    }
+    timetable[i] = cell;
+  }
+  return { ...result, timetable };
+}
+
+// Submit a scheduling job to the Python service and poll until it finishes.
+// The job is cancelled if the client disconnects before it completes.
+async function runScheduleJob(scheduleData, res) {
+  const { data: job } = await axios.post(`${SCHEDULER_URL}/jobs`, scheduleData);
+
+  let clientGone = false;
+  const onClose = () => { clientGone = !res.writableEnded; };
+  res.on("close", onClose);
+
+  try {
+    while (true) {
+      if (clientGone) {
+        await axios.delete(`${SCHEDULER_URL}/jobs/${job.jobId}`).catch(() => {});
+        throw new Error("Client disconnected; scheduling job cancelled");
+      }
+
+      const { data: status } = await axios.get(`${SCHEDULER_URL}/jobs/${job.jobId}`, {
+        headers: COLUMNAR_HEADERS
+      });
+      if (status.status === "completed") {
+        return expandTimetable(status.result);
+      }
+      if (status.status === "failed" || status.status === "cancelled") {
+        return { status: "error", message: status.error || `Scheduling job ${status.status}` };
+      }
+      await sleep(JOB_POLL_INTERVAL_MS);
+    }
+  } finally {
+    res.removeListener("close", onClose);
+  }
+}
+
+// Build the Python scheduler payload for the selected classes
+async function buildScheduleData(classIds) {
+  // Fetch only selected classes from MongoDB
+  const classes = await Class.find({ _id: { $in: classIds } })
+    .populate("subjects.subject")
+    .populate("subjects.teacher");
+
+  // If fewer classes found than requested, warn but proceed
+  if (classes.length !== classIds.length) {
+    console.warn("Some requested classes not found:", classIds);
+  }
+
+  const teachers = await Teacher.find();
+  const subjects = await Subject.find();
+  const rooms = await Room.find();
+  // Fetch fixed slots only for selected classes
+  const fixedSlots = await TimetableCell.find({
+    locked: true,
+    class: { $in: classIds }
+  });
+
+  // Prepare payload for Python (only selected classes)
+  const scheduleData = {
+    selectedClassIds: classIds, // Pass explicitly if Python needs it
+    classes: classes.map(c => ({
+      id: c._id.toString(),
+      name: c.name,
+      subjects: c.subjects
+        .filter(s => s.subject && s.teacher) // ignore invalid entries
+        .map(s => ({
+          subjectId: s.subject._id.toString(),
+          subjectName: s.subject.name,
+          teacherId: s.teacher._id.toString(),
+          hoursPerWeek: s.hoursPerWeek
+        })),
+      studentCount: c.studentCount || 0
+    })),
+    teachers: teachers.map(t => ({
+      id: t._id.toString(),
+      name: t.name,
+      subjectsCanTeach: t.subjectsCanTeach ? t.subjectsCanTeach.map(s => s._id.toString()) : [],
+      unavailableSlots: t.unavailableSlots || [],
+      preferredSlots: t.preferredSlots || [],
+      maxHoursPerDay: t.maxHoursPerDay || 3,  // CHANGED FROM 0 to 6
+      maxHoursPerWeek: t.maxHoursPerWeek || 18, // CHANGED FROM 0 to 30
+      isHOD: t.role === "HOD"
+    })),
+    subjects: subjects.map(s => ({
+      id: s._id.toString(),
+      name: s.name,
+      type: s.type,
+      hoursPerWeek: s.hoursPerWeek
+    })),
+    rooms: rooms.map(r => ({
+      id: r._id.toString(),
+      name: r.name,
+      capacity: r.capacity,
+      type: r.type
+    })),
+    fixedSlots: fixedSlots.map(s => ({
+      classId: s.class.toString(),
+      day: s.day,
+      period: s.period,
+      subjectId: s.subject ? s.subject.toString() : null,
+      teacherId: s.teacher ? s.teacher.toString() : null
+    }))
+  };
+
+  return { classes, scheduleData };
+}
+
+// Save solver output into TimetableCell documents, one per class
+async function saveTimetable(classIds, timetable) {
+  for (const classId of classIds) {
+    const classTimetable = timetable.filter(cell => cell.classId === classId);
+
+    // Map day numbers to names if needed
+    const dayNames = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"];
+    const formattedTimetable = classTimetable.map(cell => ({
+      day: dayNames[cell.day - 1] || `${cell.day}`,
+      period: cell.period,
+      subject: cell.subjectId || null,
+      teacher: cell.teacherId || null,
+      room: cell.roomId || null,
+      locked: false
+    }));
+
+    await TimetableCell.findOneAndUpdate(
+      { class: classId },
+      { timetable: formattedTimetable },
+      { upsert: true }
+    );
+  }
+}
+
 // Trigger automatic scheduling for selected classes
 router.post("/generate", auth, async (req, res) => {
      console.log("Request Body:", req.body); // Debug input
@@ -25,98 +185,19 @@ router.post("/generate", auth, async (req, res) => {
       return res.status(400).json({ message: "At least one class must be selected" });
     }
 
-    // Fetch only selected classes from MongoDB
-    const classes = await Class.find({ _id: { $in: classIds } })
-      .populate("subjects.subject")
-      .populate("subjects.teacher");
-
-    // If fewer classes found than requested, warn but proceed
-    if (classes.length !== classIds.length) {
-      console.warn("Some requested classes not found:", classIds);
-    }
-
-    const teachers = await Teacher.find();
-    const subjects = await Subject.find();
-    // Fetch fixed slots only for selected classes
-    const fixedSlots = await TimetableCell.find({
-      locked: true,
-      class: { $in: classIds }
-    });
-
-    // Prepare payload for Python (only selected classes)
-    const scheduleData = {
-      selectedClassIds: classIds, // Pass explicitly if Python needs it
-      classes: classes.map(c => ({
-        id: c._id.toString(),
-        name: c.name,
-        subjects: c.subjects
-          .filter(s => s.subject && s.teacher) // ignore invalid entries
-          .map(s => ({
-            subjectId: s.subject._id.toString(),
-            subjectName: s.subject.name,
-            teacherId: s.teacher._id.toString(),
-            hoursPerWeek: s.hoursPerWeek
-          })),
-        studentCount: c.studentCount || 0
-      })),
-      teachers: teachers.map(t => ({
-        id: t._id.toString(),
-        name: t.name,
-        subjectsCanTeach: t.subjectsCanTeach ? t.subjectsCanTeach.map(s => s._id.toString()) : [],
-        unavailableSlots: t.unavailableSlots || [],
-        preferredSlots: t.preferredSlots || [],
-        maxHoursPerDay: t.maxHoursPerDay || 3,  // CHANGED FROM 0 to 6
-        maxHoursPerWeek: t.maxHoursPerWeek || 18, // CHANGED FROM 0 to 30
-        isHOD: t.role === "HOD"
-      })),
-      subjects: subjects.map(s => ({
-        id: s._id.toString(),
-        name: s.name,
-        type: s.type,
-        hoursPerWeek: s.hoursPerWeek
-      })),
-      fixedSlots: fixedSlots.map(s => ({
-        classId: s.class.toString(),
-        day: s.day,
-        period: s.period,
-        subjectId: s.subject ? s.subject.toString() : null,
-        teacherId: s.teacher ? s.teacher.toString() : null
-      }))
-    };
+    const { classes, scheduleData } = await buildScheduleData(classIds);
 
     console.log("Sending payload to Python for classes:", classIds, scheduleData);
 
-    // Call Python service
-    const response = await axios.post(
-      "http://localhost:8000/schedule",
-      scheduleData
-    );
-    const { timetable, status, message } = response.data;
+    // Run the Python solver as a background job
+    const { timetable, status, message } = await runScheduleJob(scheduleData, res);
 
     if (status !== "success") {
       return res.status(400).json({ message: message || "Failed to generate schedule" });
     }
 
     // Save timetable into DB, grouped by class
-    for (const classId of classIds) {
-      const classTimetable = timetable.filter(cell => cell.classId === classId);
-
-      // Map day numbers to names if needed
-      const dayNames = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"];
-      const formattedTimetable = classTimetable.map(cell => ({
-        day: dayNames[cell.day - 1] || `${cell.day}`,
-        period: cell.period,
-        subject: cell.subjectId || null,
-        teacher: cell.teacherId || null,
-        locked: false
-      }));
-
-      await TimetableCell.findOneAndUpdate(
-        { class: classId },
-        { timetable: formattedTimetable },
-        { upsert: true }
-      );
-    }
+    await saveTimetable(classIds, timetable);
 
     // Clear any existing non-locked cells for these classes to avoid orphans
     await TimetableCell.deleteMany({
@@ -138,4 +219,80 @@ router.post("/generate", auth, async (req, res) => {
   }
 });
 
+// Repair the stored timetable of the selected classes after a change,
+// keeping as much of the published timetable as possible
+router.post("/reschedule", auth, async (req, res) => {
+  try {
+    if (req.user.role !== 'admin') {
+      return res.status(403).json({ message: 'Only admins can reschedule' });
+    }
+
+    const { classIds, changes, minimizeChanges } = req.body;
+    if (!classIds || !Array.isArray(classIds) || classIds.length === 0) {
+      return res.status(400).json({ message: "At least one class must be selected" });
+    }
+
+    const { scheduleData } = await buildScheduleData(classIds);
+    const previousTimetable = await TimetableCell.find({ class: { $in: classIds } }).lean();
+
+    const response = await axios.post(`${SCHEDULER_URL}/reschedule`, {
+      ...scheduleData,
+      previousTimetable,
+      changes: changes || {},
+      minimizeChanges: minimizeChanges !== false
+    }, { headers: COLUMNAR_HEADERS });
+    const { timetable, status, message, statistics } = expandTimetable(response.data);
+
+    if (status !== "success") {
+      return res.status(400).json({ message: message || "Failed to reschedule" });
+    }
+
+    await saveTimetable(classIds, timetable);
+
+    res.json({
+      status: "success",
+      message,
+      timetable,
+      reschedule: statistics.reschedule
+    });
+  } catch (error) {
+    console.error('Reschedule error:', error);
+    const message = error.response?.data?.message || error.message;
+    res.status(error.response ? 400 : 500).json({ message });
+  }
+});
+
+// Compare what-if variants (teacher days off, changed hours, ...) against
+// the stored timetable of the selected classes; nothing is saved
+router.post("/scenarios", auth, async (req, res) => {
+  try {
+    if (!['admin', 'hod'].includes(req.user.role)) {
+      return res.status(403).json({ message: 'Only admins and HODs can compare scenarios' });
+    }
+
+    const { classIds, scenarios } = req.body;
+    if (!classIds || !Array.isArray(classIds) || classIds.length === 0) {
+      return res.status(400).json({ message: "At least one class must be selected" });
+    }
+    if (!scenarios || !Array.isArray(scenarios) || scenarios.length === 0) {
+      return res.status(400).json({ message: "At least one scenario is required" });
+    }
+
+    const { scheduleData } = await buildScheduleData(classIds);
+    const previousTimetable = await TimetableCell.find({ class: { $in: classIds } }).lean();
+
+    const { data } = await axios.post(`${SCHEDULER_URL}/scenarios`, {
+      ...scheduleData,
+      previousTimetable,
+      scenarios
+    });
+
+    res.json(data);
+  } catch (error) {
+    console.error('Scenario comparison error:', error);
+    const message = error.response?.data?.message || error.response?.data?.error || error.message;
+    res.status(error.response ? 400 : 500).json({ message });
+  }
+});
+
 module.exports = router;
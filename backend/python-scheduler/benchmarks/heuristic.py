@@ -0,0 +1,53 @@
+"""Benchmark for the heuristic engine (heuristic.py) against CP-SAT.
+
+For each size, solves a synthetic institution with engine "heuristic",
+then with "cpsat" and "hybrid" under the same time limit, and prints each
+engine's status, wall time and objective. Heuristic timetables are
+checked with the validation engine, which must report no conflicts.
+
+Usage: python benchmarks/heuristic.py [--sizes 20,100,200] [--time-limit 30] [--heuristic-time 0.5]
+"""
+import argparse
+import time
+
+from synthetic import generate_payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="20,100,200", type=lambda s: [int(x) for x in s.split(",")],
+                        help="comma-separated class counts")
+    parser.add_argument("--lab-ratio", type=float, default=0.2)
+    parser.add_argument("--time-limit", type=float, default=30)
+    parser.add_argument("--heuristic-time", type=float, default=0.5)
+    parser.add_argument("--engines", default="heuristic,cpsat,hybrid", help="comma-separated engines to run")
+    args = parser.parse_args()
+
+    from decomposition import solve_schedule
+    from validation import TimetableValidator
+
+    header = f"{'classes':>8} {'engine':>10} {'status':>11} {'time (s)':>9} {'objective':>10} {'conflicts':>10}"
+    print(header)
+    print("-" * len(header))
+    for num_classes in args.sizes:
+        payload = generate_payload(num_classes, num_teachers=max(2, num_classes * 3 // 2),
+                                   lab_ratio=args.lab_ratio, unavailability=0.05)
+        for engine in args.engines.split(","):
+            payload["solverOptions"] = {
+                "engine": engine, "timeLimit": args.time_limit, "heuristicTime": args.heuristic_time,
+            }
+            start = time.perf_counter()
+            result = solve_schedule(payload)
+            elapsed = time.perf_counter() - start
+
+            objective = (result["statistics"].get("objective") or {}).get("total")
+            conflicts = ""
+            if result["schedule"]:
+                validator = TimetableValidator(payload)
+                conflicts = len(validator.validate(validator.index(result["schedule"])))
+            print(f"{num_classes:>8} {engine:>10} {result['status']:>11} {elapsed:>9.2f} "
+                  f"{str(objective):>10} {conflicts:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Benchmark for large neighborhood search (lns.py): quality against time budget.
+
+For each size and time limit, solves a synthetic institution with engine
+"lns" and with plain CP-SAT, and prints each engine's status, objective,
+time to the first timetable and, for LNS, its iterations and improvements.
+
+Usage: python benchmarks/lns.py [--sizes 150,300] [--budgets 15,30,60] [--engines lns,cpsat]
+"""
+import argparse
+
+from synthetic import generate_payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="150,300", type=lambda s: [int(x) for x in s.split(",")],
+                        help="comma-separated class counts")
+    parser.add_argument("--budgets", default="15,30,60", type=lambda s: [float(x) for x in s.split(",")],
+                        help="comma-separated time limits in seconds")
+    parser.add_argument("--engines", default="lns,cpsat", help="comma-separated engines to run")
+    parser.add_argument("--lab-ratio", type=float, default=0.2)
+    parser.add_argument("--step-time", type=float, default=2.0, help="LNS step time limit")
+    args = parser.parse_args()
+
+    from decomposition import solve_schedule
+
+    header = (f"{'classes':>8} {'budget':>7} {'engine':>7} {'status':>11} {'objective':>10} "
+              f"{'first (s)':>10} {'iterations':>11} {'improved':>9}")
+    print(header)
+    print("-" * len(header))
+    for num_classes in args.sizes:
+        payload = generate_payload(num_classes, num_teachers=max(2, num_classes * 3 // 2),
+                                   lab_ratio=args.lab_ratio, unavailability=0.05)
+        for budget in args.budgets:
+            for engine in args.engines.split(","):
+                payload["solverOptions"] = {
+                    "engine": engine, "timeLimit": budget, "lnsStepTime": args.step_time, "decompose": False,
+                }
+                result = solve_schedule(payload)
+                statistics = result["statistics"]
+                lns = statistics.get("lns") or {}
+                objective = (statistics.get("objective") or {}).get("total")
+                print(f"{num_classes:>8} {budget:>7.0f} {engine:>7} {result['status']:>11} {str(objective):>10} "
+                      f"{str(statistics.get('timeToFirstSolution')):>10} {str(lns.get('iterations', '')):>11} "
+                      f"{str(lns.get('improvements', '')):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Micro-benchmark for teacher lookups during model construction and extraction.
+
+Times the per-slot (class, subject) -> teacher lookups that model building and
+solution extraction perform, once with the old linear scan over the class's
+subject list and once with the precomputed assignment index, plus the full
+model construction time with the index.
+
+Usage: python benchmarks/model_build.py
+"""
+import time
+
+from synthetic import generate_payload
+from optimizer import TimetableScheduler
+
+CLASS_COUNTS = [50, 100, 200]
+
+
+def linear_scan_lookup(scheduler, class_id, subject_id):
+    """The pre-index lookup: walk the class's subject list"""
+    for subject_info in scheduler.classes_dict[class_id].get('subjects', []):
+        if subject_info['subjectId'] == subject_id:
+            return subject_info['teacherId']
+    return None
+
+
+def time_slot_lookups(scheduler, lookup):
+    """Resolve the teacher of every (class, day, period, subject) in the class domain"""
+    start = time.perf_counter()
+    for class_idx, class_id in enumerate(scheduler.class_ids):
+        for _day in scheduler.days:
+            for _period in scheduler.periods:
+                for subject_idx in scheduler.class_subjects[class_idx]:
+                    lookup(class_id, scheduler.subject_ids[subject_idx])
+    return time.perf_counter() - start
+
+
+def main():
+    header = f"{'classes':>8} {'index build (s)':>16} {'scan lookups (s)':>17} {'index lookups (s)':>18} {'model build (s)':>16}"
+    print(header)
+    print("-" * len(header))
+    for num_classes in CLASS_COUNTS:
+        payload = generate_payload(num_classes, subjects_per_class=8)
+
+        start = time.perf_counter()
+        scheduler = TimetableScheduler(payload)
+        index_time = time.perf_counter() - start
+
+        scan_time = time_slot_lookups(
+            scheduler, lambda class_id, subject_id: linear_scan_lookup(scheduler, class_id, subject_id)
+        )
+        indexed_time = time_slot_lookups(scheduler, scheduler._get_teacher_for_subject)
+
+        start = time.perf_counter()
+        scheduler._create_variables_and_constraints()
+        build_time = time.perf_counter() - start
+
+        print(f"{num_classes:>8} {index_time:>16.4f} {scan_time:>17.4f} {indexed_time:>18.4f} {build_time:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Compare dense and sparse model builds: variable counts, constraint counts and build time.
+
+Usage: python benchmarks/model_size.py
+"""
+import time
+
+from synthetic import generate_payload
+from optimizer import TimetableScheduler
+
+SIZES = [
+    # (classes, subjects)
+    (10, 60),
+    (20, 120),
+    (40, 200),
+]
+
+
+def build(payload, sparse):
+    scheduler = TimetableScheduler(payload, sparse=sparse)
+    start = time.perf_counter()
+    is_sub, _ = scheduler._create_variables_and_constraints()
+    scheduler._record_model_stats(is_sub, time.perf_counter() - start)
+    return scheduler.model_stats
+
+
+def main():
+    header = f"{'classes':>8} {'subjects':>9} {'mode':>7} {'is_sub':>10} {'variables':>10} {'constraints':>12} {'build (s)':>10}"
+    print(header)
+    print("-" * len(header))
+    for num_classes, num_subjects in SIZES:
+        payload = generate_payload(num_classes, num_subjects=num_subjects)
+        for sparse in (False, True):
+            stats = build(payload, sparse)
+            print(f"{num_classes:>8} {num_subjects:>9} {'sparse' if sparse else 'dense':>7} "
+                  f"{stats['subjectVariables']:>10} {stats['variables']:>10} "
+                  f"{stats['constraints']:>12} {stats['buildTime']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Benchmark for structural model templates (templates.py).
+
+For each size, builds the model of a synthetic institution from scratch,
+then builds it again for a request that differs only in teacher
+unavailability, which clones the cached template and adds the request
+constraints. Prints both build times, the template size and whether the
+two models are identical to building the second request from scratch.
+
+Usage: python benchmarks/model_template.py [--sizes 50,200,500]
+"""
+import argparse
+import copy
+import time
+
+from synthetic import generate_payload
+from optimizer import TimetableScheduler
+from templates import TEMPLATES
+
+
+def build(payload):
+    scheduler = TimetableScheduler(payload)
+    start = time.perf_counter()
+    scheduler._create_variables_and_constraints()
+    return scheduler, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="50,200,500", type=lambda s: [int(x) for x in s.split(",")],
+                        help="comma-separated class counts")
+    parser.add_argument("--lab-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    cache_size = TEMPLATES.max_entries or 8
+    header = f"{'classes':>8} {'variables':>10} {'template MB':>12} {'cold build (s)':>15} {'from template (s)':>18} {'identical':>10}"
+    print(header)
+    print("-" * len(header))
+    for num_classes in args.sizes:
+        payload = generate_payload(num_classes, lab_ratio=args.lab_ratio, unavailability=0.05)
+        changed = copy.deepcopy(payload)
+        for teacher in changed["teachers"][::3]:
+            teacher["unavailableSlots"] = teacher.get("unavailableSlots", [])[1:]
+
+        TEMPLATES.max_entries = 0
+        reference, _ = build(changed)
+        TEMPLATES.max_entries = cache_size
+        TEMPLATES.clear()
+        first, cold_time = build(payload)
+        second, template_time = build(changed)
+
+        template = next(iter(TEMPLATES.entries.values()))
+        identical = reference.model.Proto() == second.model.Proto()
+        print(f"{num_classes:>8} {len(first.model.Proto().variables):>10} {len(template.proto) / 2**20:>12.1f} "
+              f"{cold_time:>15.3f} {template_time:>18.3f} {str(identical):>10}")
+
+
+if __name__ == "__main__":
+    main()
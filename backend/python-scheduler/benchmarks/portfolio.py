@@ -0,0 +1,55 @@
+"""Benchmark for portfolio solving: which solver settings win on which cases.
+
+Solves synthetic institutions with solverOptions.portfolio, prints every
+member's status, objective and time per case, then counts how often each
+member's settings won, so the defaults in solver_config.PORTFOLIO_MEMBERS
+can be tuned from the results. Members race for the same CPUs, so run it
+on a machine with at least as many cores as members.
+
+Usage: python benchmarks/portfolio.py [--sizes 10,20] [--seeds 3] [--members 4] [--time-limit 30]
+"""
+import argparse
+import json
+from collections import Counter
+
+from synthetic import generate_payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,20", type=lambda s: [int(x) for x in s.split(",")],
+                        help="comma-separated class counts")
+    parser.add_argument("--seeds", type=int, default=3, help="institutions generated per size")
+    parser.add_argument("--members", type=int, default=4, help="portfolio size")
+    parser.add_argument("--lab-ratio", type=float, default=0.2)
+    parser.add_argument("--time-limit", type=float, default=30)
+    parser.add_argument("--target", type=float, default=None, help="stop at this objective value")
+    args = parser.parse_args()
+
+    from decomposition import solve_schedule
+
+    wins = Counter()
+    for num_classes in args.sizes:
+        for seed in range(args.seeds):
+            payload = generate_payload(num_classes, num_teachers=max(2, num_classes * 3 // 2),
+                                       lab_ratio=args.lab_ratio, seed=seed)
+            payload["solverOptions"] = {
+                "timeLimit": args.time_limit, "portfolio": args.members,
+                "targetObjective": args.target, "decompose": False,
+            }
+            portfolio = solve_schedule(payload)["statistics"]["portfolio"]
+            wins[json.dumps(portfolio["winnerSettings"], sort_keys=True)] += 1
+            print(f"classes={num_classes} seed={seed} winner={portfolio['winner']} "
+                  f"stop={portfolio['stopReason']} time={portfolio['solveSeconds']:.2f}s")
+            for member in portfolio["members"]:
+                print(f"    #{member['index']} {member['status']:<10} objective={member.get('objective')} "
+                      f"first={member.get('timeToFirstSolution')} {member.get('outcome') or ''} "
+                      f"{json.dumps(member['settings'], sort_keys=True)}")
+
+    print("\nWins per member settings:")
+    for settings, count in wins.most_common():
+        print(f"{count:>4}  {settings}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Replay captured /schedule requests offline against TimetableScheduler.
+
+Reads the JSON-lines request log written by the scheduler service (see
+SCHED_REQUEST_LOG_SAMPLE / SCHED_REQUEST_LOG_LEVEL in main.py), merging
+every worker's file and its rotated backups, and solves the selected payloads in this process. The
+solver options of the capture can be overridden, and --profile turns on the
+per-request cProfile dump and CP-SAT search log so a slow production request
+can be investigated locally.
+
+Usage:
+    python benchmarks/replay.py logs/requests.jsonl --list
+    python benchmarks/replay.py logs/requests.jsonl --id 3f2a9c1b7d4e --profile
+    python benchmarks/replay.py logs/requests.jsonl --last 5 --time-limit 10 --json replay.json
+"""
+import argparse
+import json
+import sys
+import time
+
+import synthetic  # noqa: F401  (puts the scheduler modules on sys.path)
+from request_log import read_captures
+
+
+def select(entries, args):
+    if args.id:
+        entries = [entry for entry in entries if entry["id"] in args.id]
+    if args.endpoint:
+        entries = [entry for entry in entries if entry["endpoint"] == args.endpoint]
+    if args.last:
+        entries = entries[-args.last:]
+    return entries
+
+
+def replay(entry, args):
+    """Solve one captured payload and return its timing row"""
+    from optimizer import TimetableScheduler
+    from decomposition import solve_schedule
+
+    payload = entry["payload"]
+    options = dict(payload.get("solverOptions") or {})
+    if args.time_limit is not None:
+        options["timeLimit"] = args.time_limit
+    if args.workers is not None:
+        options["numWorkers"] = args.workers
+    if args.seed is not None:
+        options["randomSeed"] = args.seed
+    payload["solverOptions"] = options
+    if args.profile:
+        payload["profile"] = True
+
+    start = time.perf_counter()
+    if args.decompose:
+        result = solve_schedule(payload)
+    else:
+        result = TimetableScheduler(payload).generate_schedule()
+    elapsed = time.perf_counter() - start
+
+    statistics = result["statistics"]
+    return {
+        "id": entry["id"],
+        "endpoint": entry["endpoint"],
+        "receivedAt": entry["receivedAt"],
+        "status": result["status"],
+        "message": result["message"],
+        "seconds": round(elapsed, 3),
+        "phases": statistics.get("phases"),
+        "solverRuns": statistics.get("solverRuns"),
+        "profile": statistics.get("profile"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("log", help="request log file (every worker's file and rotated backups are read)")
+    parser.add_argument("--list", action="store_true", help="list captured requests without solving")
+    parser.add_argument("--id", action="append", help="replay this request id (repeatable)")
+    parser.add_argument("--endpoint", help="only requests captured on this endpoint")
+    parser.add_argument("--last", type=int, help="only the N most recent requests")
+    parser.add_argument("--time-limit", type=float)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--decompose", action="store_true",
+                        help="solve through solve_schedule as /schedule does, not TimetableScheduler directly")
+    parser.add_argument("--profile", action="store_true", help="write a cProfile dump and CP-SAT log per request")
+    parser.add_argument("--json", help="write the replay results as JSON")
+    args = parser.parse_args()
+
+    entries = select(read_captures(args.log), args)
+    if not entries:
+        sys.exit(f"No captured requests selected from {args.log}")
+
+    if args.list:
+        for entry in entries:
+            print(f"{entry['id']}  {entry['receivedAt']}  /{entry['endpoint']:<16} "
+                  f"{entry['bytes']:>10} bytes  {entry['summary']}")
+        return
+
+    rows = []
+    for entry in entries:
+        row = replay(entry, args)
+        rows.append(row)
+        phases = row["phases"] or {}
+        slowest = sorted(phases.items(), key=lambda item: item[1], reverse=True)[:3]
+        print(f"{row['id']}  {row['status']:>10}  {row['seconds']:>8.2f}s  "
+              + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in slowest))
+        if row["profile"]:
+            print(f"    profile: {row['profile'].get('cprofileFile')} {row['profile'].get('solverLogFile')}")
+        sys.stdout.flush()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Benchmark for the /schedule response encodings on large timetables.
+
+Builds timetables with 24-character ObjectId-style IDs, as Node sends them,
+and compares the default list-of-dicts JSON with the columnar encoding
+(JSON, and msgpack when the msgpack module is installed), each with and
+without gzip: body size, serialize time on the scheduler side and
+parse-plus-expand time on the client side.
+
+Usage: python benchmarks/response_size.py [--sizes 50,200,1000]
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+
+import synthetic  # noqa: F401  (puts the scheduler modules on sys.path)
+from encoding import GZIP_LEVEL, COLUMNAR_JSON, COLUMNAR_MSGPACK, encode_body, expand_timetable, msgpack
+from synthetic import DAYS, PERIODS
+
+FREE_PERIOD_RATIO = 0.15
+SUBJECTS_PER_CLASS = 6
+
+
+def object_id(rng):
+    return "%024x" % rng.getrandbits(96)
+
+
+def random_timetable(num_classes, seed):
+    rng = random.Random(seed)
+    teachers = [object_id(rng) for _ in range(max(2, num_classes * 3 // 2))]
+    subjects = [object_id(rng) for _ in range(max(SUBJECTS_PER_CLASS, num_classes * 2))]
+    schedule = []
+    for _ in range(num_classes):
+        class_id = object_id(rng)
+        taught = [(subject, rng.choice(teachers)) for subject in rng.sample(subjects, SUBJECTS_PER_CLASS)]
+        for day in DAYS:
+            for period in range(1, PERIODS + 1):
+                if rng.random() >= FREE_PERIOD_RATIO:
+                    subject_id, teacher_id = rng.choice(taught)
+                    schedule.append({"classId": class_id, "day": day, "period": period,
+                                     "subjectId": subject_id, "teacherId": teacher_id})
+    return schedule
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def measure_json(body, use_gzip):
+    def serialize():
+        payload = json.dumps(body).encode("utf-8")
+        return gzip.compress(payload, compresslevel=GZIP_LEVEL) if use_gzip else payload
+
+    def parse(payload):
+        return json.loads(gzip.decompress(payload) if use_gzip else payload)["timetable"]
+
+    payload, encode_time = timed(serialize)
+    _, decode_time = timed(parse, payload)
+    return len(payload), encode_time, decode_time
+
+
+def measure_columnar(body, media_type, use_gzip):
+    (payload, headers), encode_time = timed(encode_body, body, media_type, use_gzip)
+
+    def parse(payload):
+        if headers.get("Content-Encoding") == "gzip":
+            payload = gzip.decompress(payload)
+        if media_type == COLUMNAR_MSGPACK:
+            decoded = msgpack.unpackb(payload, raw=False)
+        else:
+            decoded = json.loads(payload)
+        return expand_timetable(decoded["timetable"])
+
+    _, decode_time = timed(parse, payload)
+    return len(payload), encode_time, decode_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="50,200,1000", type=lambda s: [int(x) for x in s.split(",")],
+                        help="comma-separated class counts")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    encodings = [("json", None), ("columnar json", COLUMNAR_JSON)]
+    if msgpack is not None:
+        encodings.append(("columnar msgpack", COLUMNAR_MSGPACK))
+
+    header = f"{'classes':>8} {'slots':>7} {'encoding':<18} {'gzip':>5} {'bytes':>11} {'serialize (s)':>14} {'parse (s)':>10}"
+    print(header)
+    print("-" * len(header))
+    for num_classes in args.sizes:
+        schedule = random_timetable(num_classes, args.seed)
+        body = {"status": "success", "message": "Schedule generated successfully", "timetable": schedule}
+        for name, media_type in encodings:
+            for use_gzip in (False, True):
+                if media_type is None:
+                    size, encode_time, decode_time = measure_json(body, use_gzip)
+                else:
+                    size, encode_time, decode_time = measure_columnar(body, media_type, use_gzip)
+                print(f"{num_classes:>8} {len(schedule):>7} {name:<18} {'yes' if use_gzip else 'no':>5} "
+                      f"{size:>11} {encode_time:>14.4f} {decode_time:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Benchmark for serving: cold start and concurrent /schedule throughput.
+
+Cold start is the time from launching a server until /health answers, and
+whether answering it loaded OR-tools, for the development server
+(python main.py) and for gunicorn with gunicorn.conf.py. Throughput sends
+--requests distinct /schedule payloads from --clients concurrent clients
+to gunicorn with each worker count and prints requests per second and
+latency. Pre-forked workers only pay off with as many free cores.
+
+Usage: python benchmarks/serving.py [--workers 1,2,4] [--classes 10] [--requests 16] [--clients 4]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from synthetic import generate_payload, SCHEDULER_DIR
+
+PORT = 8765
+BASE_URL = f"http://127.0.0.1:{PORT}"
+
+
+def start_server(command, env):
+    """Launch a server and return (process, seconds until /health answered)"""
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=SCHEDULER_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    while True:
+        try:
+            with urllib.request.urlopen(f"{BASE_URL}/health", timeout=1):
+                return process, time.perf_counter() - start
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError(f"Server exited with code {process.returncode}")
+            time.sleep(0.02)
+
+
+def stop_server(process):
+    process.terminate()
+    process.wait(timeout=120)
+
+
+def post_schedule(payload):
+    request = urllib.request.Request(f"{BASE_URL}/schedule", data=json.dumps(payload).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=600) as response:
+            response.read()
+        ok = True
+    except urllib.error.HTTPError as e:
+        e.read()
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def loads_ortools():
+    """Whether importing the app loads OR-tools"""
+    code = "import main, sys; print('ortools' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=SCHEDULER_DIR, capture_output=True, text=True)
+    return output.stdout.strip() == "True"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4", type=lambda s: [int(x) for x in s.split(",")],
+                        help="comma-separated gunicorn worker counts")
+    parser.add_argument("--classes", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=16)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--time-limit", type=float, default=10)
+    args = parser.parse_args()
+
+    env = dict(os.environ, PORT=str(PORT), HOST="127.0.0.1", SCHED_CACHE_SIZE="0",
+               SCHED_REQUEST_LOG_SAMPLE="0")
+    print(f"cpus: {os.cpu_count()}, importing main loads OR-tools: {loads_ortools()}")
+
+    header = f"{'server':>20} {'cold start (s)':>15}"
+    print(header)
+    print("-" * len(header))
+    servers = [("development", [sys.executable, "main.py"], {})]
+    servers += [(f"gunicorn x{workers}", [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+                 {"SCHED_SERVER_WORKERS": str(workers)}) for workers in args.workers]
+    for name, command, extra in servers:
+        process, cold_start = start_server(command, dict(env, **extra))
+        stop_server(process)
+        print(f"{name:>20} {cold_start:>15.2f}")
+
+    payloads = []
+    for seed in range(args.requests):
+        payload = generate_payload(args.classes, num_teachers=max(2, args.classes * 3 // 2), seed=seed,
+                                   lab_ratio=0.2, unavailability=0.05)
+        payload["solverOptions"] = {"timeLimit": args.time_limit, "numWorkers": 1}
+        payloads.append(payload)
+
+    print()
+    header = f"{'workers':>8} {'requests':>9} {'clients':>8} {'req/s':>7} {'p50 (s)':>8} {'max (s)':>8} {'errors':>7}"
+    print(header)
+    print("-" * len(header))
+    for workers in args.workers:
+        process, _ = start_server([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+                                  dict(env, SCHED_SERVER_WORKERS=str(workers), SCHED_SERVER_THREADS="1"))
+        try:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(args.clients) as pool:
+                responses = list(pool.map(post_schedule, payloads))
+            elapsed = time.perf_counter() - start
+        finally:
+            stop_server(process)
+        latencies = [latency for latency, _ in responses]
+        errors = sum(1 for _, ok in responses if not ok)
+        print(f"{workers:>8} {len(payloads):>9} {args.clients:>8} {len(payloads) / elapsed:>7.2f} "
+              f"{statistics.median(latencies):>8.2f} {max(latencies):>8.2f} {errors:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Benchmark suite: solve synthetic institutions over a matrix of sizes and record a report.
+
+Every case runs TimetableScheduler.generate_schedule in a fresh process so
+peak RSS is measured per case. The report holds model-build time, model
+size, time to first feasible timetable, total solve time, status, objective
+and peak RSS, and is written as JSON and/or CSV. Passing --baseline with an
+earlier JSON report prints the change per case, so regressions between
+versions show up directly.
+
+Usage:
+    python benchmarks/suite.py --sizes 10,20,40 --lab-ratio 0.2 --json report.json --csv report.csv
+    python benchmarks/suite.py --baseline old.json --json new.json
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+from synthetic import generate_payload, SCHEDULER_DIR
+
+FIELDS = [
+    "case", "classes", "teachers", "subjects", "labRatio", "departments", "unavailability",
+    "fixedPerClass", "repeat", "status", "buildTime", "subjectVariables", "variables",
+    "constraints", "timeToFirstSolution", "solveTime", "objective", "peakRssMb", "message",
+]
+
+
+def run_case(case, conn):
+    """Generate and solve one case (runs in a child process)"""
+    from optimizer import TimetableScheduler
+
+    payload = generate_payload(
+        case["classes"], num_teachers=case["teachers"], num_subjects=case["subjects"],
+        lab_ratio=case["labRatio"], seed=case["seed"], departments=case["departments"],
+        unavailability=case["unavailability"], fixed_per_class=case["fixedPerClass"]
+    )
+    payload["solverOptions"] = case["solverOptions"]
+
+    start = time.perf_counter()
+    result = TimetableScheduler(payload).generate_schedule()
+    solve_time = time.perf_counter() - start
+
+    statistics = result["statistics"]
+    model = statistics.get("model") or {}
+    objective = statistics.get("objective") or {}
+    conn.send({
+        "status": result["status"],
+        "message": result["message"],
+        "buildTime": model.get("buildTime"),
+        "subjectVariables": model.get("subjectVariables"),
+        "variables": model.get("variables"),
+        "constraints": model.get("constraints"),
+        "timeToFirstSolution": statistics.get("timeToFirstSolution"),
+        "solveTime": round(solve_time, 3),
+        "objective": objective.get("total"),
+        # ru_maxrss is in KiB on Linux
+        "peakRssMb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    })
+    conn.close()
+
+
+def measure(case):
+    parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=run_case, args=(case, child_conn))
+    process.start()
+    child_conn.close()
+    try:
+        result = parent_conn.recv()
+    except EOFError:
+        result = {"status": f"crashed (exit code {process.exitcode})"}
+    process.join()
+    return result
+
+
+def build_cases(args):
+    cases = []
+    for num_classes in args.sizes:
+        for repeat in range(args.repeats):
+            cases.append({
+                "case": f"c{num_classes}-lab{args.lab_ratio}-d{args.departments}"
+                        f"-u{args.unavailability}-f{args.fixed_per_class}",
+                "classes": num_classes,
+                "teachers": max(2, round(num_classes * args.teachers_per_class)),
+                "subjects": max(6, num_classes * 2),
+                "labRatio": args.lab_ratio,
+                "departments": args.departments,
+                "unavailability": args.unavailability,
+                "fixedPerClass": args.fixed_per_class,
+                "repeat": repeat,
+                "seed": args.seed + repeat,
+                "solverOptions": {
+                    "timeLimit": args.time_limit,
+                    "numWorkers": args.workers,
+                    "randomSeed": args.seed,
+                    "decompose": False,
+                },
+            })
+    return cases
+
+
+def environment(label):
+    try:
+        from ortools import __version__ as ortools_version
+    except ImportError:
+        ortools_version = None
+    if label is None:
+        try:
+            label = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=SCHEDULER_DIR,
+                                   capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            label = "unknown"
+    return {
+        "label": label,
+        "startedAt": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "ortools": ortools_version,
+        "platform": platform.platform(),
+        "cpus": multiprocessing.cpu_count(),
+    }
+
+
+def compare(results, baseline_path):
+    """Print per-case changes against an earlier JSON report"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(row["case"], row["repeat"]): row for row in baseline["results"]}
+
+    print(f"\nAgainst {baseline['environment']['label']} ({baseline_path}):")
+    for row in results:
+        old = previous.get((row["case"], row["repeat"]))
+        if old is None:
+            print(f"  {row['case']} #{row['repeat']}: not in baseline")
+            continue
+        changes = []
+        if old["status"] != row["status"]:
+            changes.append(f"status {old['status']} -> {row['status']}")
+        for key in ("buildTime", "timeToFirstSolution", "solveTime", "objective", "peakRssMb", "variables"):
+            if old.get(key) and row.get(key) is not None:
+                changes.append(f"{key} {(row[key] - old[key]) / old[key] * 100:+.0f}%")
+        print(f"  {row['case']} #{row['repeat']}: {', '.join(changes)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="5,10,20,40", type=lambda s: [int(x) for x in s.split(",")],
+                        help="comma-separated class counts")
+    parser.add_argument("--teachers-per-class", type=float, default=1.5,
+                        help="teachers per class; at 1.0 every teacher is fully loaded")
+    parser.add_argument("--lab-ratio", type=float, default=0.2)
+    parser.add_argument("--departments", type=int, default=1)
+    parser.add_argument("--unavailability", type=float, default=0.0,
+                        help="probability that a teacher slot is unavailable")
+    parser.add_argument("--fixed-per-class", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=1, help="seeds per size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-limit", type=float, default=30.0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--label", help="version label for the report (default: git describe)")
+    parser.add_argument("--json", help="write the report as JSON")
+    parser.add_argument("--csv", help="write one CSV row per case")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    report = {"environment": environment(args.label), "results": []}
+    header = f"{'case':<32} {'#':>2} {'status':>10} {'build':>7} {'vars':>8} {'first':>7} {'total':>7} {'objective':>9} {'rss MB':>7}"
+    print(header)
+    print("-" * len(header))
+
+    for case in build_cases(args):
+        row = {key: case.get(key) for key in FIELDS}
+        row.update(measure(case))
+        report["results"].append(row)
+        print(f"{row['case']:<32} {row['repeat']:>2} {row['status']:>10} {_fmt(row.get('buildTime')):>7} "
+              f"{_fmt(row.get('variables')):>8} {_fmt(row.get('timeToFirstSolution')):>7} "
+              f"{_fmt(row.get('solveTime')):>7} {_fmt(row.get('objective')):>9} {_fmt(row.get('peakRssMb')):>7}")
+        sys.stdout.flush()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(report["results"])
+    if args.baseline:
+        compare(report["results"], args.baseline)
+
+
+def _fmt(value):
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Synthetic institution generator producing payloads in the /schedule format."""
+import math
+import os
+import random
+import sys
+
+# Make the scheduler modules importable the same way main.py imports them
+SCHEDULER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scheduler")
+if SCHEDULER_DIR not in sys.path:
+    sys.path.insert(0, SCHEDULER_DIR)
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+PERIODS = 6
+
+
+def generate_payload(num_classes, num_teachers=None, num_subjects=None,
+                     subjects_per_class=6, lab_ratio=0.0, seed=0,
+                     departments=1, unavailability=0.0, fixed_per_class=0, sections=1):
+    """Generate a /schedule payload for a synthetic institution
+
+    Classes, teachers and subjects are split round-robin into departments;
+    a class only takes subjects and teachers from its own department, so
+    departments share no teacher. Each teacher slot is unavailable with
+    probability unavailability, and up to fixed_per_class theory lessons per
+    class are pinned as fixed slots placed without clashes. With sections
+    above 1, classes come in groups of that many identical sections (same
+    subjects, teachers and size), the way one cohort is split.
+    """
+    rng = random.Random(seed)
+    num_teachers = num_teachers or max(2, num_classes)
+    num_subjects = num_subjects or max(subjects_per_class, num_classes * 2)
+
+    subjects = []
+    for subject_idx in range(num_subjects):
+        is_lab = rng.random() < lab_ratio
+        subjects.append({
+            "id": f"sub{subject_idx:04d}",
+            "name": f"Subject {subject_idx}",
+            "type": "lab" if is_lab else "theory",
+            "isLab": is_lab,
+            "hoursPerWeek": 2 if is_lab else 3
+        })
+
+    teachers = [{
+        "id": f"tch{teacher_idx:04d}",
+        "name": f"Teacher {teacher_idx}",
+        "unavailableSlots": [],
+        "preferredSlots": [],
+        "maxHoursPerDay": 3,
+        "maxHoursPerWeek": 18
+    } for teacher_idx in range(num_teachers)]
+
+    classes = []
+    num_groups = math.ceil(num_classes / sections)
+    for class_idx in range(num_classes):
+        group = class_idx // sections
+        if class_idx % sections == 0:
+            department = group % departments
+            department_subjects = subjects[department::departments]
+            department_teachers = teachers[department::departments]
+            position = group // departments
+            # Spread groups over all department teachers when there are more
+            # teachers than groups
+            step = max(1.0, len(department_teachers) / len(range(department, num_groups, departments)))
+            chosen = rng.sample(department_subjects, min(subjects_per_class, len(department_subjects)))
+            group_subjects = [{
+                "subjectId": subject["id"],
+                "subjectName": subject["name"],
+                "teacherId": department_teachers[(int(position * step) + offset) % len(department_teachers)]["id"],
+                "hoursPerWeek": subject["hoursPerWeek"]
+            } for offset, subject in enumerate(chosen)]
+            student_count = rng.randint(30, 60)
+        classes.append({
+            "id": f"cls{class_idx:04d}",
+            "name": f"Class {class_idx}",
+            "subjects": [dict(subject_info) for subject_info in group_subjects],
+            "studentCount": student_count
+        })
+
+    # Separate streams so the base institution does not depend on these options
+    if unavailability:
+        slot_rng = random.Random(seed + 1)
+        for teacher in teachers:
+            teacher["unavailableSlots"] = [
+                {"day": day, "period": period}
+                for day in DAYS for period in range(1, PERIODS + 1)
+                if slot_rng.random() < unavailability
+            ]
+
+    fixed_slots = []
+    if fixed_per_class:
+        fixed_slots = _place_fixed_slots(classes, teachers, subjects, fixed_per_class, random.Random(seed + 2))
+
+    return {
+        "classes": classes,
+        "teachers": teachers,
+        "subjects": subjects,
+        "fixedSlots": fixed_slots
+    }
+
+
+def _place_fixed_slots(classes, teachers, subjects, per_class, rng):
+    """Pin theory lessons to random slots without breaking any hard rule
+
+    Avoids teacher unavailability, teacher double booking and back-to-back
+    periods, class double booking and the same subject twice in a row.
+    """
+    labs = {subject["id"] for subject in subjects if subject["isLab"]}
+    teacher_busy = {(t["id"], slot["day"], slot["period"]) for t in teachers for slot in t["unavailableSlots"]}
+    teacher_near = set()
+    class_busy = set()
+    fixed_slots = []
+
+    for class_obj in classes:
+        theory = [s for s in class_obj["subjects"] if s["subjectId"] not in labs]
+        placed = 0
+        for _ in range(per_class * 20):
+            if placed == per_class or not theory:
+                break
+            subject_info = rng.choice(theory)
+            day, period = rng.choice(DAYS), rng.randint(1, PERIODS)
+            teacher_id = subject_info["teacherId"]
+            if ((class_obj["id"], day, period) in class_busy
+                    or (teacher_id, day, period) in teacher_busy
+                    or (teacher_id, day, period) in teacher_near
+                    or any((class_obj["id"], day, p, subject_info["subjectId"]) in class_busy
+                           for p in (period - 1, period + 1))):
+                continue
+            class_busy.add((class_obj["id"], day, period))
+            class_busy.add((class_obj["id"], day, period, subject_info["subjectId"]))
+            teacher_busy.add((teacher_id, day, period))
+            teacher_near.update((teacher_id, day, p) for p in (period - 1, period + 1))
+            fixed_slots.append({
+                "classId": class_obj["id"],
+                "day": day,
+                "period": period,
+                "subjectId": subject_info["subjectId"],
+                "teacherId": teacher_id
+            })
+            placed += 1
+            # Never pin more hours than the subject has
+            if sum(1 for slot in fixed_slots if slot["classId"] == class_obj["id"]
+                   and slot["subjectId"] == subject_info["subjectId"]) >= subject_info["hoursPerWeek"]:
+                theory.remove(subject_info)
+
+    return fixed_slots
@@ -0,0 +1,144 @@
+"""Benchmark for solution extraction, statistics and conflict checks on large timetables.
+
+Builds the subject variables for synthetic institutions, draws a random
+solution vector (one subject or a free period per class slot) and times the
+old dict-based passes against the array-backed TimetableArray ones:
+extraction from solver values, the /schedule statistics with conflict
+detection, and the helpers' usage statistics and byClass/byTeacher/byRoom
+views. Sizes run from a few thousand to 30k+ scheduled slots.
+
+Usage: python benchmarks/timetable_stats.py [--sizes 100,300,1000]
+"""
+import argparse
+import random
+import time
+from collections import defaultdict
+
+import numpy as np
+from ortools.sat.python import cp_model
+
+from synthetic import generate_payload
+from optimizer import TimetableScheduler
+from timetable_array import solution_variables
+from utils.helpers import calculate_statistics, format_solution
+
+FREE_PERIOD_RATIO = 0.15
+
+
+class FixedSolution:
+    """Stands in for a solver: answers Value() and ResponseProto() from a fixed vector"""
+
+    def __init__(self, values):
+        self.values = values
+        self.response = cp_model.cp_model_pb2.CpSolverResponse(solution=values.tolist())
+
+    def Value(self, var):
+        return cp_model.EvaluateLinearExpr(var, self.response)
+
+    def ResponseProto(self):
+        return self.response
+
+
+def random_solution(scheduler, seed):
+    """Subject variables of the scheduler plus a random solution vector over them"""
+    is_sub = {}
+    scheduler._add_subject_variables(is_sub, len(scheduler.class_ids), len(scheduler.days), len(scheduler.periods))
+    rng = random.Random(seed)
+    values = np.zeros(len(scheduler.model.Proto().variables), dtype=np.int64)
+    for class_idx, domain in scheduler.class_subjects.items():
+        for day_idx in range(len(scheduler.days)):
+            for period_idx in range(len(scheduler.periods)):
+                if domain and rng.random() >= FREE_PERIOD_RATIO:
+                    values[is_sub[(class_idx, day_idx, period_idx, rng.choice(domain))].Index()] = 1
+    return is_sub, FixedSolution(values)
+
+
+def dict_extract(scheduler, solver, is_sub):
+    """The pre-array extraction: one Value() call per variable"""
+    schedule = []
+    for class_idx, class_id in enumerate(scheduler.class_ids):
+        for day_idx, day in enumerate(scheduler.days):
+            for period_idx, period in enumerate(scheduler.periods):
+                for subject_idx in scheduler.class_subjects[class_idx]:
+                    if solver.Value(is_sub[(class_idx, day_idx, period_idx, subject_idx)]) == 1:
+                        subject_id = scheduler.subject_ids[subject_idx]
+                        schedule.append({
+                            "classId": class_id, "day": day, "period": period, "subjectId": subject_id,
+                            "teacherId": scheduler._get_teacher_for_subject(class_id, subject_id)
+                        })
+                        break
+    return schedule
+
+
+def dict_statistics(schedule):
+    """The pre-array /schedule statistics: counters plus tuple-keyed conflict sets"""
+    teacher_hours, class_hours, subject_hours = defaultdict(int), defaultdict(int), defaultdict(int)
+    for item in schedule:
+        teacher_hours[item['teacherId']] += 1
+        class_hours[item['classId']] += 1
+        subject_hours[item['subjectId']] += 1
+    conflicts = 0
+    seen = {"teacher": set(), "class": set()}
+    for item in schedule:
+        for kind, key in (("teacher", item['teacherId']), ("class", item['classId'])):
+            slot = (key, item['day'], item['period'])
+            conflicts += slot in seen[kind]
+            seen[kind].add(slot)
+    return teacher_hours, class_hours, subject_hours, conflicts
+
+
+def dict_helpers(schedule, classes, teachers):
+    """The pre-array helpers: one timetable scan per class and per teacher, three view passes"""
+    class_usage = {c['id']: len([s for s in schedule if s['classId'] == c['id']]) for c in classes}
+    teacher_usage = {t['id']: len([s for s in schedule if s.get('teacherId') == t['id']]) for t in teachers}
+    by_class, by_teacher = {}, {}
+    for slot in schedule:
+        by_class.setdefault(slot['classId'], {}).setdefault(slot['day'], []).append(slot)
+    for slot in schedule:
+        by_teacher.setdefault(slot['teacherId'], []).append(slot)
+    return class_usage, teacher_usage, by_class, by_teacher
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="100,300,1000", type=lambda s: [int(x) for x in s.split(",")],
+                        help="comma-separated class counts")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    header = (f"{'classes':>8} {'slots':>7} {'extract dict':>13} {'extract array':>14} "
+              f"{'stats dict':>11} {'stats array':>12} {'helpers dict':>13} {'helpers array':>14}")
+    print(header)
+    print("-" * len(header))
+    for num_classes in args.sizes:
+        payload = generate_payload(num_classes, seed=args.seed)
+        scheduler = TimetableScheduler(payload)
+        is_sub, solver = random_solution(scheduler, args.seed)
+
+        old_schedule, old_extract = timed(dict_extract, scheduler, solver, is_sub)
+        variables, index_time = timed(solution_variables, is_sub)
+        scheduler.solution_variables = variables
+        solution, new_extract = timed(lambda: scheduler._solution_array(solver, is_sub))
+        schedule = solution.to_items()
+        assert schedule == old_schedule
+
+        _, old_stats = timed(dict_statistics, schedule)
+        _, new_stats = timed(scheduler._generate_statistics, None, schedule, 0.0, solution)
+
+        classes, teachers = payload["classes"], payload["teachers"]
+        _, old_helpers = timed(dict_helpers, schedule, classes, teachers)
+        _, new_helpers = timed(lambda: (calculate_statistics(schedule, classes, teachers, []),
+                                        format_solution(schedule)))
+
+        print(f"{num_classes:>8} {len(schedule):>7} {old_extract:>13.4f} {new_extract + index_time:>14.4f} "
+              f"{old_stats:>11.4f} {new_stats:>12.4f} {old_helpers:>13.4f} {new_helpers:>14.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark for what-if scenarios (scenarios.py): one batch against separate solves.
+
+For each size, builds --scenarios variants of a synthetic institution
+(a teacher off for a day, a subject's hours changed) and times solving
+them all with solve_scenarios against solving every variant as its own
+/schedule payload. Prints wall times and, per scenario, feasibility,
+objective against the base and the slots changed.
+
+Usage: python benchmarks/what_if.py [--sizes 20,60] [--scenarios 4] [--time-limit 20]
+"""
+import argparse
+import time
+
+from synthetic import generate_payload, DAYS, PERIODS
+
+
+def make_scenarios(payload, count):
+    """Alternate teacher days off with one more hour of a class subject"""
+    scenarios = []
+    for index in range(count):
+        class_obj = payload["classes"][index % len(payload["classes"])]
+        subject_info = class_obj["subjects"][index % len(class_obj["subjects"])]
+        if index % 2 == 0:
+            delta = {"unavailableSlots": [{"teacherId": subject_info["teacherId"], "day": DAYS[index % len(DAYS)]}]}
+        else:
+            delta = {"hoursPerWeek": [{"classId": class_obj["id"], "subjectId": subject_info["subjectId"],
+                                       "hoursPerWeek": subject_info["hoursPerWeek"] + 1}]}
+        scenarios.append({"name": f"scenario {index + 1}", "delta": delta})
+    return scenarios
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="20,60", type=lambda s: [int(x) for x in s.split(",")],
+                        help="comma-separated class counts")
+    parser.add_argument("--scenarios", type=int, default=4)
+    parser.add_argument("--time-limit", type=float, default=20)
+    parser.add_argument("--scenario-time-limit", type=float, default=5)
+    args = parser.parse_args()
+
+    from decomposition import solve_schedule
+    from scenarios import apply_delta, solve_scenarios
+
+    for num_classes in args.sizes:
+        payload = generate_payload(num_classes, num_teachers=max(2, num_classes * 3 // 2),
+                                   lab_ratio=0.2, unavailability=0.05)
+        payload["solverOptions"] = {"timeLimit": args.time_limit, "scenarioTimeLimit": args.scenario_time_limit}
+        scenarios = make_scenarios(payload, args.scenarios)
+
+        start = time.perf_counter()
+        result = solve_scenarios(dict(payload, scenarios=scenarios))
+        batch_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for scenario in scenarios:
+            variant, _ = apply_delta(payload, scenario["delta"], list(range(1, PERIODS + 1)))
+            solve_schedule(variant)
+        separate_seconds = time.perf_counter() - start
+
+        print(f"{num_classes} classes, {len(scenarios)} scenarios: batch {batch_seconds:.2f}s "
+              f"(base {result['statistics']['baseSeconds']:.2f}s, {result['statistics'].get('poolSize')} processes), "
+              f"separate solves {separate_seconds:.2f}s; base objective {result['base']['objective']}")
+        header = f"{'scenario':>12} {'status':>10} {'objective':>10} {'delta':>6} {'changed':>8} {'time (s)':>9}"
+        print(header)
+        print("-" * len(header))
+        for summary in result["scenarios"]:
+            print(f"{summary['name']:>12} {summary['status']:>10} {str(summary['objective']):>10} "
+                  f"{str(summary.get('objectiveDelta')):>6} {str(summary.get('changedSlots')):>8} "
+                  f"{summary['solveSeconds']:>9.2f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# cache.py
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from objective import resolve_objective
+from solver_config import resolve_config
+
+logger = logging.getLogger("timetable-scheduler")
+
+# Top-level payload keys that affect the solve; everything else is ignored
+PAYLOAD_FIELDS = ["classes", "teachers", "subjects", "fixedSlots", "rooms"]
+
+# Display-only fields that never change the timetable
+IGNORED_FIELDS = {"name", "subjectName"}
+
+CACHEABLE_STATUSES = {"optimal", "feasible"}
+
+
+# Lists whose order changes the result, by key path: within a class the
+# first entry of a duplicated subject decides its teacher
+ORDERED_FIELDS = {("classes", "subjects")}
+
+
+def _canonical(value, path=()):
+    """Normalize a JSON value: drop display fields and sort order-insensitive lists"""
+    if isinstance(value, dict):
+        return {key: _canonical(item, path + (key,)) for key, item in value.items() if key not in IGNORED_FIELDS}
+    if isinstance(value, list):
+        items = [_canonical(item, path) for item in value]
+        if path in ORDERED_FIELDS:
+            return items
+        return sorted(items, key=lambda item: json.dumps(item, sort_keys=True))
+    return value
+
+
+def payload_key(data):
+    """Stable hash of the parts of a /schedule payload that determine the result"""
+    canonical = {field: _canonical(data.get(field, []), (field,)) for field in PAYLOAD_FIELDS}
+    # Resolved settings, so env defaults and explicit options hash the same
+    canonical["solverConfig"] = resolve_config(data.get("solverOptions"))
+    canonical["objective"] = resolve_objective(data.get("objective"))
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Two-tier cache of solver results: in-memory LRU plus an optional directory"""
+
+    def __init__(self, max_entries=128, ttl_seconds=3600, directory=None, max_disk_entries=1024):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.directory = directory
+        self.max_disk_entries = max_disk_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.counters = {"hits": 0, "diskHits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, key):
+        """Return a copy of the cached result for key, or None"""
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and now - entry[0] <= self.ttl_seconds:
+                self.entries.move_to_end(key)
+                self.counters["hits"] += 1
+                return copy.deepcopy(entry[1])
+            if entry is not None:
+                del self.entries[key]
+
+        result = self._read_disk(key, now)
+        with self.lock:
+            if result is None:
+                self.counters["misses"] += 1
+                return None
+            self.counters["hits"] += 1
+            self.counters["diskHits"] += 1
+            self._put_memory(key, result, now)
+        return copy.deepcopy(result)
+
+    def put(self, key, result):
+        """Store a solved result; infeasible or timed-out results are not cached"""
+        if result.get("status") not in CACHEABLE_STATUSES:
+            return
+        result = copy.deepcopy(result)
+        now = time.time()
+        with self.lock:
+            self._put_memory(key, result, now)
+            self.counters["stores"] += 1
+        self._write_disk(key, result)
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, entries=len(self.entries), diskEnabled=bool(self.directory))
+
+    def _put_memory(self, key, result, now):
+        """Insert into the LRU tier (lock held)"""
+        self.entries[key] = (now, result)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _read_disk(self, key, now):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            if now - os.path.getmtime(path) > self.ttl_seconds:
+                os.remove(path)
+                return None
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key, result):
+        if not self.directory:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(result, f)
+            os.replace(tmp_path, path)
+            self._prune_disk()
+        except OSError:
+            logger.warning("Could not write cache entry %s", key, exc_info=True)
+
+    def _prune_disk(self):
+        """Drop expired files, then the oldest ones beyond the size bound"""
+        now = time.time()
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            if now - mtime > self.ttl_seconds:
+                self._remove(path)
+            else:
+                files.append((mtime, path))
+
+        files.sort()
+        for _, path in files[:max(0, len(files) - self.max_disk_entries)]:
+            self._remove(path)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            with self.lock:
+                self.counters["evictions"] += 1
+        except OSError:
+            pass
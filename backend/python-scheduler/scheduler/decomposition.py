@@ -0,0 +1,247 @@
+# decomposition.py
+import logging
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from heuristic import HeuristicScheduler, solve_hybrid
+from instrumentation import merge_instrumentation
+from lns import LNSScheduler
+from optimizer import TimetableScheduler
+from portfolio import solve_portfolio
+from solver_config import resolve_config
+from templates import TEMPLATES
+
+logger = logging.getLogger("timetable-scheduler")
+
+# A component is never given less search time than this, even past the deadline
+MIN_COMPONENT_SECONDS = 0.1
+
+
+def find_components(data):
+    """Group class IDs into components of classes linked by shared teachers
+
+    Classes in different components share no teacher, so no constraint in
+    the model connects them and each component can be solved on its own.
+    """
+    class_ids = [c['id'] for c in data.get('classes', [])]
+    parent = {class_id: class_id for class_id in class_ids}
+
+    def find(class_id):
+        while parent[class_id] != class_id:
+            parent[class_id] = parent[parent[class_id]]
+            class_id = parent[class_id]
+        return class_id
+
+    # Union every class with the first class seen for each of its teachers
+    teacher_owner = {}
+    for class_obj in data.get('classes', []):
+        for subject_info in class_obj.get('subjects', []):
+            teacher_id = subject_info.get('teacherId')
+            if teacher_id is None:
+                continue
+            owner = teacher_owner.setdefault(teacher_id, class_obj['id'])
+            root_a, root_b = find(owner), find(class_obj['id'])
+            if root_a != root_b:
+                parent[root_b] = root_a
+
+    components = {}
+    for class_id in class_ids:
+        components.setdefault(find(class_id), []).append(class_id)
+
+    # Largest first so the biggest solves start earliest
+    return sorted(components.values(), key=len, reverse=True)
+
+
+def split_payload(data, class_ids, solver_options):
+    """Build a standalone /schedule payload covering only the given classes"""
+    class_set = set(class_ids)
+    classes = [c for c in data.get('classes', []) if c['id'] in class_set]
+    fixed_slots = [s for s in data.get('fixedSlots', []) if s['classId'] in class_set]
+
+    teacher_ids = set()
+    subject_ids = set()
+    for class_obj in classes:
+        for subject_info in class_obj.get('subjects', []):
+            teacher_ids.add(subject_info.get('teacherId'))
+            subject_ids.add(subject_info['subjectId'])
+    for slot in fixed_slots:
+        if slot.get('subjectId'):
+            subject_ids.add(slot['subjectId'])
+
+    payload = dict(data)
+    payload.update({
+        'classes': classes,
+        'teachers': [t for t in data.get('teachers', []) if t['id'] in teacher_ids],
+        'subjects': [s for s in data.get('subjects', []) if s['id'] in subject_ids],
+        'fixedSlots': fixed_slots,
+        # Rooms are shared by all components; they are assigned after merging
+        'rooms': [],
+        'solverOptions': solver_options
+    })
+    return payload
+
+
+def _solve_component(payload, deadline, share):
+    """Solve one component payload (runs in a pool worker)
+
+    The component searches for its share of the time limit, cut short by
+    the shared deadline when earlier rounds overran. Returns the result
+    and the model templates the worker stored, which the parent keeps for
+    later solves.
+    """
+    time_limit = max(MIN_COMPONENT_SECONDS, min(share, deadline - time.time()))
+    payload = dict(payload, solverOptions=dict(payload['solverOptions'], timeLimit=time_limit))
+    return TimetableScheduler(payload).generate_schedule(), TEMPLATES.take_captured()
+
+
+def solve_schedule(data):
+    """Generate a timetable, solving independent components in parallel
+
+    Falls back to a single monolithic model when decomposition is disabled,
+    all classes are connected through shared teachers, or room capacity is
+    part of the model (rooms then link every class). A monolithic model is
+    raced by a portfolio of solver settings when one is configured;
+    components are solved once each, as they already share the CPUs.
+    The heuristic, hybrid and LNS engines always work on the whole payload.
+    """
+    config = resolve_config(data.get('solverOptions'))
+    if config['engine'] == 'heuristic':
+        return HeuristicScheduler(data, config=config).generate_schedule()
+    if config['engine'] == 'hybrid':
+        return solve_hybrid(data, config)
+    if config['engine'] == 'lns':
+        return LNSScheduler(data, config=config).generate_schedule()
+    rooms_in_model = bool(data.get('rooms')) and config['roomAssignment'] == 'model'
+    components = find_components(data) if config['decompose'] and not rooms_in_model else []
+
+    if len(components) <= 1:
+        if config['portfolio']:
+            return solve_portfolio(data, config)
+        return TimetableScheduler(data, config=config).generate_schedule()
+
+    start_time = time.time()
+    pool_size = min(len(components), config['numWorkers'])
+    solver_options = dict(data.get('solverOptions') or {})
+    # Share the CPU budget between concurrently running components
+    solver_options['numWorkers'] = max(1, config['numWorkers'] // pool_size)
+    solver_options['decompose'] = False
+    solver_options['portfolio'] = 0
+
+    # With more components than processes they run in rounds, which share
+    # the time limit so the whole solve stays within it
+    rounds = math.ceil(len(components) / pool_size)
+    share = config['timeLimit'] / rounds
+    deadline = start_time + config['timeLimit']
+
+    payloads = [split_payload(data, class_ids, solver_options) for class_ids in components]
+    logger.info("Solving %d independent components with %d processes in %d round(s)",
+                len(components), pool_size, rounds)
+
+    with ProcessPoolExecutor(max_workers=pool_size) as pool:
+        outcomes = list(pool.map(_solve_component, payloads, repeat(deadline), repeat(share)))
+    results = [result for result, _ in outcomes]
+    for _, templates in outcomes:
+        TEMPLATES.adopt(templates)
+
+    return merge_results(data, config, components, results, time.time() - start_time)
+
+
+def merge_results(data, config, components, results, solve_time):
+    """Combine per-component results into one /schedule result"""
+    statuses = [result['status'] for result in results]
+    component_stats = [{
+        "classes": len(class_ids),
+        "status": result['status'],
+        "model": result['statistics'].get('model', {})
+    } for class_ids, result in zip(components, results)]
+
+    decomposition = {
+        "components": len(components),
+        "componentDetails": component_stats
+    }
+
+    instrumentation = merge_instrumentation([result['statistics'] for result in results])
+    instrumentation["solveSeconds"] = round(solve_time, 4)
+    feasibility = merge_feasibility(components, results)
+
+    if any(status not in ("optimal", "feasible") for status in statuses):
+        failed = [i for i, status in enumerate(statuses) if status not in ("optimal", "feasible")]
+        message = "; ".join(
+            f"Classes {', '.join(components[i])}: {results[i]['message']}" for i in failed
+        )
+        return {
+            "message": message,
+            "schedule": [],
+            "statistics": dict(
+                instrumentation,
+                solveTime=solve_time,
+                solverConfig=config,
+                feasibility=feasibility,
+                decomposition=dict(decomposition, failedComponents=failed)
+            ),
+            "status": "infeasible"
+        }
+
+    # Keep the original class order in the merged schedule
+    class_order = {c['id']: idx for idx, c in enumerate(data.get('classes', []))}
+    schedule = [item for result in results for item in result['schedule']]
+    schedule.sort(key=lambda item: class_order[item['classId']])
+
+    scheduler = TimetableScheduler(data, config=config)
+    scheduler.model_stats = {
+        key: sum(stats['model'].get(key, 0) for stats in component_stats)
+        for key in ("subjectVariables", "variables", "constraints", "buildTime")
+    }
+    scheduler.model_stats["sparse"] = scheduler.sparse
+    statistics = scheduler._generate_statistics(None, schedule, solve_time)
+    statistics["decomposition"] = decomposition
+    statistics["feasibility"] = feasibility
+    statistics.update(instrumentation)
+    statistics["objective"] = merge_objectives(
+        [result['statistics'].get('objective') for result in results]
+    )
+
+    return scheduler.with_rooms({
+        "message": "Schedule generated successfully",
+        "schedule": schedule,
+        "statistics": statistics,
+        "status": "optimal" if all(status == "optimal" for status in statuses) else "feasible"
+    }, time.time() - solve_time)
+
+
+def merge_feasibility(components, results):
+    """Collect every component's feasibility issues and conflicting constraints
+
+    Each entry is tagged with the classIds of the component it came from.
+    """
+    issues = []
+    conflicts = []
+    for class_ids, result in zip(components, results):
+        feasibility = result['statistics'].get('feasibility') or {}
+        issues.extend(dict(issue, classIds=class_ids) for issue in feasibility.get('issues', []))
+        conflicts.extend(dict(conflict, classIds=class_ids)
+                         for conflict in feasibility.get('conflictingConstraints', []))
+    merged = {"issues": issues}
+    if conflicts:
+        merged["conflictingConstraints"] = conflicts
+    return merged
+
+
+def merge_objectives(breakdowns):
+    """Sum per-component penalty breakdowns; components share no penalty term"""
+    breakdowns = [b for b in breakdowns if b]
+    if not breakdowns:
+        return None
+    terms = {}
+    for breakdown in breakdowns:
+        for group, term in breakdown['terms'].items():
+            merged = terms.setdefault(group, {"weight": term['weight'], "penalty": 0, "weighted": 0})
+            merged['penalty'] += term['penalty']
+            merged['weighted'] += term['weighted']
+    return {
+        "total": sum(b['total'] for b in breakdowns),
+        "rules": breakdowns[0]['rules'],
+        "terms": terms
+    }
@@ -0,0 +1,99 @@
+# encoding.py
+import gzip
+import json
+import logging
+
+from timetable_array import MISSING, TimetableArray
+
+try:
+    import msgpack
+except ImportError:  # optional: columnar JSON is served instead
+    msgpack = None
+
+logger = logging.getLogger("timetable-scheduler")
+
+JSON = "application/json"
+COLUMNAR_JSON = "application/vnd.timetable.columnar+json"
+COLUMNAR_MSGPACK = "application/vnd.timetable.columnar+msgpack"
+
+# Smaller bodies are sent uncompressed
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+
+ID_FIELDS = ("class", "day", "subject", "teacher", "room")
+
+
+def columnar_timetable(schedule):
+    """A timetable as an ID dictionary plus one integer column per field
+
+    ids[field] lists each distinct ID once; columns[field][i] is the
+    position of lesson i's ID in that list. Periods are sent as they are,
+    and the room column (present only when rooms were assigned) holds -1
+    for lessons without a room.
+    """
+    solution = TimetableArray.from_items(schedule)
+    has_rooms = bool((solution.codes["room"] != MISSING).any())
+    fields = [field for field in ID_FIELDS if field != "room" or has_rooms]
+    columns = {field: solution.codes[field].tolist() for field in fields}
+    columns["period"] = solution.decode("period")
+    return {
+        "length": len(solution),
+        "ids": {field: solution.interners[field].values for field in fields},
+        "columns": columns,
+    }
+
+
+def expand_timetable(columnar):
+    """Inverse of columnar_timetable: the list of lesson dicts"""
+    ids, columns = columnar["ids"], columnar["columns"]
+    keys = {"class": "classId", "day": "day", "subject": "subjectId", "teacher": "teacherId", "room": "roomId"}
+    fields = [field for field in ID_FIELDS if field in columns]
+    decoded = [
+        [ids[field][code] if code != MISSING else None for code in columns[field]]
+        for field in fields
+    ]
+    items = []
+    for values, period in zip(zip(*decoded), columns["period"]):
+        item = {keys[field]: value for field, value in zip(fields, values)}
+        item["period"] = period
+        items.append(item)
+    return items
+
+
+def offered_types():
+    """Response media types this server can produce, the default first"""
+    return [JSON, COLUMNAR_JSON] + ([COLUMNAR_MSGPACK] if msgpack is not None else [])
+
+
+def negotiate(accept_mimetypes):
+    """Pick the response media type from a werkzeug Accept header; JSON unless asked"""
+    return accept_mimetypes.best_match(offered_types(), default=JSON) or JSON
+
+
+def compact_body(body):
+    """Replace the timetable of a response body (or its job result) by the columnar form"""
+    body = dict(body)
+    if "timetable" in body:
+        body["timetable"] = columnar_timetable(body["timetable"])
+        body["timetableFormat"] = "columnar"
+    if isinstance(body.get("result"), dict):
+        body["result"] = compact_body(body["result"])
+    return body
+
+
+def encode_body(body, media_type, use_gzip):
+    """Serialize a response body for a negotiated compact media type
+
+    Returns (payload bytes, headers).
+    """
+    body = compact_body(body)
+    if media_type == COLUMNAR_MSGPACK:
+        payload = msgpack.packb(body, use_bin_type=True)
+    else:
+        payload = json.dumps(body, separators=(",", ":")).encode("utf-8")
+
+    headers = {"Content-Type": media_type, "Vary": "Accept, Accept-Encoding"}
+    if use_gzip and len(payload) >= GZIP_MIN_BYTES:
+        payload = gzip.compress(payload, compresslevel=GZIP_LEVEL)
+        headers["Content-Encoding"] = "gzip"
+    return payload, headers
@@ -0,0 +1,364 @@
+# feasibility.py
+import logging
+import math
+import time
+from collections import Counter, defaultdict
+
+from ortools.sat.python import cp_model
+
+from rooms import room_capacity, room_type, rooms_by_type, student_count
+
+logger = logging.getLogger("timetable-scheduler")
+
+# Explaining an infeasible solve takes at most this share of its time limit
+EXPLAIN_SHARE = 0.5
+
+
+def _issue(severity, issue_type, message, **details):
+    return dict(details, severity=severity, type=issue_type, message=message)
+
+
+def _name(record, fallback):
+    return (record or {}).get('name') or fallback
+
+
+def _max_non_adjacent(periods):
+    """Most lessons that fit in the given period numbers with a gap between each"""
+    count = 0
+    last = None
+    for period in sorted(periods):
+        if last is None or period > last + 1:
+            count += 1
+            last = period
+    return count
+
+
+def analyze_payload(scheduler):
+    """Run counting checks that prove infeasibility without building a model
+
+    Every check is a necessary condition of the CP-SAT model, so an "error"
+    issue means the solver could never succeed. Runs in milliseconds.
+    """
+    issues = []
+    num_days = len(scheduler.days)
+    num_periods = len(scheduler.periods)
+    total_slots = num_days * num_periods
+    theory_per_day = math.ceil(num_periods / 2)
+    pairs_per_day = (num_periods + 1) // 3 if num_periods >= 2 else 0
+
+    teacher_demand = Counter()
+    teacher_has_lab = set()
+
+    for class_obj in scheduler.data.get('classes', []):
+        class_id = class_obj['id']
+        class_name = _name(class_obj, class_id)
+        total_hours = 0
+
+        for subject_info in class_obj.get('subjects', []):
+            subject_id = subject_info['subjectId']
+            teacher_id = subject_info.get('teacherId')
+            hours = subject_info.get('hoursPerWeek', 1)
+            total_hours += hours
+
+            if subject_id not in scheduler.subject_to_index:
+                issues.append(_issue("error", "unknown_subject",
+                                     f"Class {class_name} references unknown subject {subject_id}",
+                                     classId=class_id, subjectId=subject_id))
+                continue
+            if teacher_id not in scheduler.teacher_to_index:
+                issues.append(_issue("error", "unknown_teacher",
+                                     f"Class {class_name} references unknown teacher {teacher_id}",
+                                     classId=class_id, teacherId=teacher_id))
+                continue
+
+            subject_name = _name(scheduler.subjects_dict.get(subject_id), subject_id)
+            teacher_demand[teacher_id] += hours
+            is_lab = scheduler.subject_to_index[subject_id] in scheduler.lab_subjects
+
+            if is_lab:
+                teacher_has_lab.add(teacher_id)
+                if hours % 2:
+                    issues.append(_issue("error", "lab_odd_hours",
+                                         f"Lab {subject_name} in class {class_name} needs {hours} hours, "
+                                         f"but labs are scheduled in pairs",
+                                         classId=class_id, subjectId=subject_id))
+                elif hours // 2 > num_days * pairs_per_day:
+                    issues.append(_issue("error", "lab_pairs_do_not_fit",
+                                         f"Lab {subject_name} in class {class_name} needs {hours // 2} pairs, "
+                                         f"at most {num_days * pairs_per_day} fit in a week",
+                                         classId=class_id, subjectId=subject_id))
+            elif hours > num_days * theory_per_day:
+                issues.append(_issue("error", "subject_spacing",
+                                     f"{subject_name} in class {class_name} needs {hours} hours, but without "
+                                     f"back-to-back periods at most {num_days * theory_per_day} fit in a week",
+                                     classId=class_id, subjectId=subject_id))
+
+        if total_hours > total_slots:
+            issues.append(_issue("error", "class_overload",
+                                 f"Class {class_name} needs {total_hours} hours, "
+                                 f"only {total_slots} slots exist",
+                                 classId=class_id, hours=total_hours, slots=total_slots))
+
+    issues.extend(_check_teacher_capacity(scheduler, teacher_demand, teacher_has_lab))
+    issues.extend(_check_fixed_slots(scheduler))
+    issues.extend(_check_rooms(scheduler))
+    return issues
+
+
+def _unavailable_periods(scheduler, teacher):
+    """Map day index -> set of unavailable period numbers for a teacher"""
+    unavailable = defaultdict(set)
+    for slot in teacher.get('unavailableSlots', []):
+        day_idx = scheduler._day_index(slot['day'])
+        if day_idx is not None:
+            unavailable[day_idx].add(slot['period'])
+    return unavailable
+
+
+def _check_teacher_capacity(scheduler, teacher_demand, teacher_has_lab):
+    issues = []
+    daily_hard = scheduler._rule_is_hard("teacherDailyLimit")
+    unavailable_hard = scheduler._rule_is_hard("teacherUnavailable")
+    breaks_hard = scheduler._rule_is_hard("teacherNoConsecutive")
+
+    for teacher_id, demand in teacher_demand.items():
+        teacher = scheduler.teachers_dict[teacher_id]
+        teacher_name = _name(teacher, teacher_id)
+        max_per_day = scheduler._teacher_daily_limit(teacher) if daily_hard else len(scheduler.periods)
+        unavailable = _unavailable_periods(scheduler, teacher) if unavailable_hard else defaultdict(set)
+
+        capacity = 0
+        for day_idx in range(len(scheduler.days)):
+            free = [p for p in scheduler.periods if p not in unavailable[day_idx]]
+            # Without labs, no-consecutive leaves at most every other free period
+            if breaks_hard and teacher_id not in teacher_has_lab:
+                fits = _max_non_adjacent(free)
+            else:
+                fits = len(free)
+            capacity += min(max_per_day, fits)
+
+        weekly_limit = teacher.get('maxHoursPerWeek')
+        if weekly_limit is not None and scheduler._rule_is_hard("teacherWeeklyLimit") and demand > weekly_limit:
+            issues.append(_issue("error", "teacher_weekly_limit",
+                                 f"Teacher {teacher_name} must teach {demand} periods, "
+                                 f"above the weekly limit of {weekly_limit}",
+                                 teacherId=teacher_id, demand=demand, limit=weekly_limit))
+        if demand > capacity:
+            issues.append(_issue("error", "teacher_overload",
+                                 f"Teacher {teacher_name} must teach {demand} periods, "
+                                 f"but daily limits, unavailability and breaks allow at most {capacity}",
+                                 teacherId=teacher_id, demand=demand, capacity=capacity))
+        elif demand > 0.9 * capacity:
+            issues.append(_issue("warning", "teacher_near_capacity",
+                                 f"Teacher {teacher_name} must teach {demand} of at most "
+                                 f"{capacity} possible periods",
+                                 teacherId=teacher_id, demand=demand, capacity=capacity))
+    return issues
+
+
+def _check_fixed_slots(scheduler):
+    issues = []
+    placed = {}
+    fixed_counts = Counter()
+
+    for slot in scheduler.data.get('fixedSlots', []):
+        class_id = slot.get('classId')
+        subject_id = slot.get('subjectId')
+        if not subject_id:
+            continue
+
+        day_idx = scheduler._day_index(slot.get('day'))
+        period = slot.get('period')
+        where = f"{slot.get('day')} period {period}"
+
+        if class_id not in scheduler.class_to_index:
+            issues.append(_issue("error", "fixed_slot_unknown_class",
+                                 f"Fixed slot at {where} references unknown class {class_id}",
+                                 classId=class_id))
+            continue
+        class_name = _name(scheduler.classes_dict[class_id], class_id)
+        if subject_id not in scheduler.subject_to_index:
+            issues.append(_issue("error", "fixed_slot_unknown_subject",
+                                 f"Fixed slot for class {class_name} at {where} references unknown subject {subject_id}",
+                                 classId=class_id, subjectId=subject_id))
+            continue
+        if day_idx is None or period not in scheduler.periods:
+            issues.append(_issue("error", "fixed_slot_off_grid",
+                                 f"Fixed slot for class {class_name} at {where} is outside the timetable grid",
+                                 classId=class_id))
+            continue
+
+        key = (class_id, day_idx, period)
+        if key in placed and placed[key] != subject_id:
+            issues.append(_issue("error", "fixed_slot_clash",
+                                 f"Class {class_name} has two different fixed subjects at {where}",
+                                 classId=class_id))
+        placed[key] = subject_id
+        fixed_counts[(class_id, subject_id)] += 1
+
+        teacher_id = scheduler._get_teacher_for_subject(class_id, subject_id)
+        teacher = scheduler.teachers_dict.get(teacher_id)
+        if (teacher and scheduler._rule_is_hard("teacherUnavailable")
+                and period in _unavailable_periods(scheduler, teacher)[day_idx]):
+            issues.append(_issue("error", "fixed_slot_teacher_unavailable",
+                                 f"Fixed slot for class {class_name} at {where} needs teacher "
+                                 f"{_name(teacher, teacher_id)}, who is unavailable then",
+                                 classId=class_id, teacherId=teacher_id))
+
+    for (class_id, subject_id), count in fixed_counts.items():
+        required = next((s.get('hoursPerWeek', 1) for s in scheduler.classes_dict[class_id].get('subjects', [])
+                         if s['subjectId'] == subject_id), 0)
+        if count > required:
+            issues.append(_issue("error", "fixed_slots_exceed_hours",
+                                 f"Class {_name(scheduler.classes_dict[class_id], class_id)} has {count} fixed "
+                                 f"slots for {_name(scheduler.subjects_dict.get(subject_id), subject_id)} "
+                                 f"but needs only {required} hours",
+                                 classId=class_id, subjectId=subject_id))
+    return issues
+
+
+def _check_rooms(scheduler):
+    """Classes no room can host, and weekly room demand beyond supply
+
+    A missing room only blocks the solve when rooms are in the model;
+    otherwise the room stage leaves those lessons without a room.
+    """
+    if not scheduler.rooms:
+        return []
+    issues = []
+    severity = "error" if scheduler.room_constraints else "warning"
+    grouped = rooms_by_type(scheduler.rooms)
+    num_slots = len(scheduler.days) * len(scheduler.periods)
+
+    demand = defaultdict(list)
+    for class_obj in scheduler.data.get('classes', []):
+        size = student_count(scheduler, class_obj['id'])
+        for subject_info in class_obj.get('subjects', []):
+            if subject_info['subjectId'] in scheduler.subject_to_index:
+                kind = room_type(scheduler, subject_info['subjectId'])
+                demand[kind].append((size, subject_info.get('hoursPerWeek', 1), class_obj))
+
+    for kind, lessons in sorted(demand.items()):
+        capacities = [room_capacity(room) for room in grouped.get(kind, [])]
+        unhosted = {}
+        for size, _, class_obj in lessons:
+            if not any(capacity >= size for capacity in capacities):
+                unhosted[class_obj['id']] = (size, class_obj)
+        for class_id, (size, class_obj) in unhosted.items():
+            issues.append(_issue(severity, "no_suitable_room",
+                                 f"Class {_name(class_obj, class_id)} has {size} students, "
+                                 f"but no {kind} room is large enough",
+                                 classId=class_id, roomType=kind, studentCount=size))
+
+        # Hall's condition summed over the week, per class size threshold
+        for threshold in sorted({size for size, _, _ in lessons}):
+            hours = sum(h for size, h, _ in lessons if size >= threshold)
+            seats = sum(1 for capacity in capacities if capacity >= threshold) * num_slots
+            if seats and hours > seats:
+                issues.append(_issue(severity, "room_overload",
+                                     f"{hours} {kind} lessons for classes of {threshold}+ students need "
+                                     f"rooms, only {seats} room-periods exist",
+                                     roomType=kind, hours=hours, roomPeriods=seats))
+                break
+    return issues
+
+
+def describe_assumption(scheduler, key):
+    """Human-readable description of an assumption group key"""
+    kind = key[0]
+    if kind in ("classHours", "subjectSpacing"):
+        _, class_id, subject_id = key
+        class_name = _name(scheduler.classes_dict.get(class_id), class_id)
+        subject_name = _name(scheduler.subjects_dict.get(subject_id), subject_id)
+        if kind == "classHours":
+            hours = next((s.get('hoursPerWeek', 1) for s in scheduler.classes_dict[class_id].get('subjects', [])
+                          if s['subjectId'] == subject_id), None)
+            return f"class {class_name} needs {hours} hours of {subject_name}"
+        return f"{subject_name} in class {class_name} may not be taught in consecutive periods"
+    if kind == "fixedSlot":
+        _, class_id, day_idx, period = key
+        return (f"class {_name(scheduler.classes_dict.get(class_id), class_id)} is fixed at "
+                f"{scheduler.days[day_idx]} period {period}")
+
+    if kind == "roomCapacity":
+        return f"each period needs a free {key[1]} room large enough for every lesson"
+
+    teacher_id = key[1]
+    teacher = scheduler.teachers_dict.get(teacher_id)
+    teacher_name = _name(teacher, teacher_id)
+    if kind == "teacherDailyLimit":
+        return f"teacher {teacher_name} may teach at most {scheduler._teacher_daily_limit(teacher)} periods a day"
+    if kind == "teacherWeeklyLimit":
+        return f"teacher {teacher_name} may teach at most {teacher.get('maxHoursPerWeek')} periods a week"
+    if kind == "teacherUnavailable":
+        return f"teacher {teacher_name} is unavailable in some slots"
+    if kind == "teacherNoConsecutive":
+        return f"teacher {teacher_name} may not teach consecutive periods"
+    return str(key)
+
+
+def explain_budget(config):
+    """Seconds an infeasible solve may spend explaining itself
+
+    The lesser of config["explainTimeLimit"] and EXPLAIN_SHARE of the
+    solve's own time limit; 0 turns explanations off.
+    """
+    return min(config['explainTimeLimit'], EXPLAIN_SHARE * config['timeLimit'])
+
+
+def explain_infeasibility(scheduler, time_limit=None):
+    """Find a small set of constraint groups that cannot hold together
+
+    Rebuilds the model with every named constraint group guarded by an
+    assumption literal, asks CP-SAT for a sufficient infeasible subset and
+    shrinks it by deletion while the time budget (explain_budget of the
+    scheduler's config by default) lasts. Returns a list of
+    {"constraint", "message"} dicts, or None if no core was found.
+    """
+    if time_limit is None:
+        time_limit = explain_budget(scheduler.config)
+    if time_limit <= 0:
+        return None
+    start_time = time.time()
+    explainer = type(scheduler)(scheduler.data, sparse=scheduler.sparse, config=scheduler.config)
+    explainer.explain = True
+    explainer._create_variables_and_constraints()
+    key_by_index = {literal.Index(): key for key, literal in explainer.assumptions.items()}
+    if not key_by_index:
+        return None
+
+    def solve_with(keys):
+        remaining = time_limit - (time.time() - start_time)
+        if remaining <= 0:
+            return None, []
+        explainer.model.ClearAssumptions()
+        explainer.model.AddAssumptions([explainer.assumptions[key] for key in keys])
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = remaining
+        # Cores are only reported by the single-worker search
+        solver.parameters.num_search_workers = 1
+        status = solver.Solve(explainer.model)
+        if status != cp_model.INFEASIBLE:
+            return status, []
+        return status, [key_by_index[i] for i in solver.SufficientAssumptionsForInfeasibility() if i in key_by_index]
+
+    status, core = solve_with(list(explainer.assumptions))
+    if status != cp_model.INFEASIBLE or not core:
+        return None
+
+    # Deletion filter: drop each group whose removal keeps the core infeasible
+    for key in list(core):
+        if key not in core:
+            continue
+        trial = [k for k in core if k != key]
+        status, smaller = solve_with(trial)
+        if status is None:
+            break
+        if status == cp_model.INFEASIBLE:
+            core = smaller or trial
+
+    logger.info("Infeasibility explained by %d constraint groups in %.2fs", len(core), time.time() - start_time)
+    return [{
+        "constraint": list(key),
+        "message": describe_assumption(scheduler, key)
+    } for key in core]
@@ -0,0 +1,96 @@
+# gunicorn.conf.py
+"""Production serving: gunicorn -c gunicorn.conf.py main:app
+
+Pre-forks SCHED_SERVER_WORKERS processes, each serving SCHED_SERVER_THREADS
+requests at a time. The master imports the solver modules once before
+forking (SCHED_PRELOAD_SOLVER), so workers share OR-tools and their first
+solve pays no import; the app itself is loaded per worker, since its job
+and cache threads cannot be forked. A worker is recycled after
+SCHED_MAX_SOLVES_PER_WORKER solves, once its background jobs have
+finished, to bound memory growth.
+
+Workers share their state through directories, each a fresh temporary
+one unless set: background jobs (SCHED_JOB_DIR) and validation sessions
+(SCHED_SESSION_DIR), so any worker answers for them; solved results
+(SCHED_CACHE_DIR, the cache's disk tier); and metrics snapshots
+(SCHED_METRICS_DIR), merged by whichever worker serves /metrics. Only
+the model template cache stays per worker.
+"""
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+
+# Routes that run a solve in the request or queue one in the job manager
+SOLVE_ROUTES = {"/schedule", "/schedule/stream", "/reschedule", "/jobs", "/scenarios"}
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', 8000)}"
+chdir = os.path.dirname(os.path.abspath(__file__))
+
+workers = int(os.environ.get("SCHED_SERVER_WORKERS", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.environ.get("SCHED_SERVER_THREADS", 4))
+
+# Long enough for the largest synchronous solve (SCHED_TIME_LIMIT plus the
+# model build); graceful_timeout lets requests in flight finish on restart
+timeout = int(os.environ.get("SCHED_WORKER_TIMEOUT", 660))
+graceful_timeout = int(os.environ.get("SCHED_GRACEFUL_TIMEOUT", 60))
+keepalive = 5
+
+preload_app = False
+PRELOAD_SOLVER = os.environ.get("SCHED_PRELOAD_SOLVER", "true").lower() == "true"
+MAX_SOLVES_PER_WORKER = int(os.environ.get("SCHED_MAX_SOLVES_PER_WORKER", 0))
+
+# Read by main.py when each worker loads the app
+SHARED_DIRS = {
+    "SCHED_JOB_DIR": "timetable-jobs-",
+    "SCHED_SESSION_DIR": "timetable-sessions-",
+    "SCHED_CACHE_DIR": "timetable-cache-",
+    "SCHED_METRICS_DIR": "timetable-metrics-",
+}
+TEMPORARY_DIRS = []
+for variable, prefix in SHARED_DIRS.items():
+    if not os.environ.get(variable):
+        os.environ[variable] = tempfile.mkdtemp(prefix=prefix)
+        TEMPORARY_DIRS.append(os.environ[variable])
+
+
+def on_starting(server):
+    if PRELOAD_SOLVER:
+        if chdir not in sys.path:
+            sys.path.insert(0, chdir)
+        import decomposition  # noqa: F401
+        import reschedule  # noqa: F401
+        import scenarios  # noqa: F401
+        server.log.info("Solver modules preloaded")
+
+
+def post_worker_init(worker):
+    worker.solves = 0
+
+
+def post_request(worker, req, environ, resp):
+    if not MAX_SOLVES_PER_WORKER:
+        return
+    if req.method == "POST" and req.path in SOLVE_ROUTES:
+        worker.solves += 1
+    if worker.solves < MAX_SOLVES_PER_WORKER or not worker.alive:
+        return
+    # Wait for queued and running jobs, which would die with the worker
+    main = sys.modules.get("main")
+    if main is not None and main.job_manager.active():
+        return
+    worker.log.info("Recycling worker %s after %d solves", worker.pid, worker.solves)
+    worker.alive = False
+
+
+def worker_exit(server, worker):
+    main = sys.modules.get("main")
+    if main is not None:
+        main.job_manager.shutdown()
+
+
+def on_exit(server):
+    for directory in TEMPORARY_DIRS:
+        shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,767 @@
+# heuristic.py
+import logging
+import math
+import random
+import time
+
+import numpy as np
+
+from optimizer import TimetableScheduler
+from timetable_array import TimetableArray
+
+logger = logging.getLogger("timetable-scheduler")
+
+FREE = -1
+
+# Repair: a lesson placed within this many insertions may not be ejected again
+EJECTION_TENURE = 10
+
+# Simulated annealing temperature, in weighted penalty units, at the start
+# and at the end of the search time
+INITIAL_TEMPERATURE = 2.0
+FINAL_TEMPERATURE = 0.05
+
+# Share of annealing moves that swap two lessons of a class instead of moving one
+SWAP_RATIO = 0.5
+
+
+class HeuristicScheduler(TimetableScheduler):
+    """Greedy construction plus local search over the CP-SAT model's hard rules
+
+    Lessons are units of one theory period or one lab pair, which is
+    placed as a two-period block. Units are placed most constrained first
+    (fixed slots, then lab pairs, then by how tight their teacher and
+    class are), each in the feasible slot that keeps days balanced and
+    lessons together. Units that found no slot are inserted by ejecting
+    the lessons in their way, and simulated annealing then moves and
+    swaps lessons to lower the same weighted penalty the CP-SAT objective
+    uses. No model is built and nothing is proven; the result has the
+    CP-SAT result shape with status "feasible".
+    """
+
+    def __init__(self, data, sparse=True, config=None):
+        super().__init__(data, sparse=sparse, config=config)
+        # Rooms are assigned to the finished timetable; there is no model
+        # to add room capacity to
+        self.room_constraints = False
+        if self.config['roomAssignment'] != 'stage':
+            self.config = dict(self.config, roomAssignment='stage')
+        self.rng = random.Random(self.config['randomSeed'])
+        self.search_stats = {}
+
+    def _generate(self, on_solution, start_time):
+        rejected = self._analyze(start_time)
+        if rejected:
+            rejected["statistics"]["engine"] = "heuristic"
+            return rejected
+
+        schedule, unplaced = self.draft(start_time)
+        end_time = time.time()
+
+        if unplaced:
+            return {
+                "message": f"Heuristic could not place {len(unplaced)} lessons",
+                "schedule": [],
+                "statistics": {
+                    "solveTime": end_time - start_time,
+                    "solverConfig": self.config,
+                    "feasibility": {"issues": self.feasibility_issues},
+                    "engine": "heuristic",
+                    "heuristic": dict(self.search_stats, unplacedLessons=unplaced)
+                },
+                "status": "infeasible"
+            }
+
+        with self.timer.phase("statistics"):
+            statistics = self._generate_statistics(None, schedule, end_time - start_time, self.solution)
+            statistics["feasibility"] = {"issues": self.feasibility_issues}
+            statistics["objective"] = self.penalty_breakdown()
+            statistics["timeToFirstSolution"] = round(self.first_solution_at - start_time, 3)
+            statistics["engine"] = "heuristic"
+            statistics["heuristic"] = self.search_stats
+        return self.with_rooms({
+            "message": "Schedule generated successfully",
+            "schedule": schedule,
+            "statistics": statistics,
+            "status": "feasible"
+        }, start_time)
+
+    def draft(self, start_time=None):
+        """Construct and improve a timetable within config['heuristicTime']
+
+        Returns (schedule, unplaced): the lessons placed, in class/day/period
+        order, and the (class, subject, periods) of every unit left without
+        a slot. A partial schedule is still a useful CP-SAT hint.
+        """
+        start_time = start_time or time.time()
+        deadline = start_time + min(self.config['heuristicTime'], self.config['timeLimit'])
+
+        with self.timer.phase("construct"):
+            self._setup()
+            self._construct()
+        constructed = len(self.unplaced)
+        if not self.unplaced:
+            self.first_solution_at = time.time()
+
+        with self.timer.phase("repair"):
+            insertions = self._repair(deadline)
+        if not self.unplaced and self.first_solution_at is None:
+            self.first_solution_at = time.time()
+
+        initial_cost = self._total_cost()
+        moves = accepted = 0
+        if not self.unplaced:
+            with self.timer.phase("localSearch"):
+                moves, accepted = self._anneal(deadline)
+
+        self.search_stats = {
+            "units": len(self.unit_class),
+            "unplacedAfterConstruction": constructed,
+            "insertions": insertions,
+            "moves": moves,
+            "acceptedMoves": accepted,
+            "initialObjective": initial_cost,
+            "finalObjective": self._total_cost(),
+        }
+        self.solution = self._solution()
+        return self.solution.to_items(), self._unplaced_lessons()
+
+    # ------------------------------------------------------------------
+    # Problem setup
+    # ------------------------------------------------------------------
+
+    def _setup(self):
+        """Index the payload into units, per-teacher rules and empty grids"""
+        num_periods = len(self.periods)
+        num_slots = len(self.days) * num_periods
+        rules = self.objective['rules']
+        weights = self.objective['weights']
+
+        self.num_periods = num_periods
+        self.hard = {rule: kind == 'hard' for rule, kind in rules.items()}
+        self.weights = weights
+
+        # Per-teacher limits, unavailable and preferred slots (slot = day * periods + period)
+        self.daily_limit = []
+        self.weekly_limit = []
+        self.unavailable = []
+        self.preferred = []
+        for teacher_id in self.teacher_ids:
+            teacher = self.teachers_dict[teacher_id]
+            self.daily_limit.append(self._teacher_daily_limit(teacher))
+            weekly = teacher.get('maxHoursPerWeek')
+            self.weekly_limit.append(weekly if weekly is not None else num_slots)
+            self.unavailable.append(self._slots(teacher.get('unavailableSlots', [])))
+            # Preferences only count when weighted; an empty list means none
+            preferred = teacher.get('preferredSlots', [])
+            self.preferred.append(self._slots(preferred) if preferred and weights["preferredSlots"] else None)
+
+        # Units: parallel lists indexed by unit
+        self.unit_class = []
+        self.unit_subject = []
+        self.unit_teacher = []
+        self.unit_length = []
+        self.unit_allowed = []
+        self.unit_start = []
+
+        fixed = {}
+        for slot in self.data.get('fixedSlots', []):
+            subject_id = slot.get('subjectId')
+            class_idx = self.class_to_index.get(slot['classId'])
+            day_idx = self._day_index(slot['day'])
+            if not subject_id or class_idx is None or day_idx is None or subject_id not in self.subject_to_index:
+                continue
+            if not 1 <= slot['period'] <= num_periods:
+                continue
+            key = (class_idx, self.subject_to_index[subject_id])
+            fixed.setdefault(key, set()).add(day_idx * num_periods + slot['period'] - 1)
+
+        hours = {}
+        for class_idx, class_id in enumerate(self.class_ids):
+            for subject_info in self.classes_dict[class_id].get('subjects', []):
+                subject_idx = self.subject_to_index.get(subject_info['subjectId'])
+                if subject_idx is not None:
+                    hours.setdefault((class_idx, subject_idx), subject_info.get('hoursPerWeek', 1))
+
+        for class_idx, subject_idx in list(hours) + [key for key in fixed if key not in hours]:
+            teacher_id = self._get_teacher_for_subject(self.class_ids[class_idx], self.subject_ids[subject_idx])
+            teacher_idx = self.teacher_to_index.get(teacher_id, FREE)
+            pinned = sorted(fixed.get((class_idx, subject_idx), ()))
+            # Subjects only present through fixed slots have no hour count
+            required = hours.get((class_idx, subject_idx), 0)
+
+            if subject_idx in self.lab_subjects:
+                placed = 0
+                position = 0
+                while position < len(pinned):
+                    slot = pinned[position]
+                    period = slot % num_periods
+                    if position + 1 < len(pinned) and pinned[position + 1] == slot + 1 and period + 1 < num_periods:
+                        allowed = (slot,)
+                        position += 2
+                    else:
+                        # A lone fixed lab period is the first or second half of its pair
+                        allowed = tuple(s for s in (slot - 1, slot) if 0 <= s % num_periods < num_periods - 1
+                                        and s // num_periods == slot // num_periods)
+                        position += 1
+                    self._add_unit(class_idx, subject_idx, teacher_idx, 2, allowed)
+                    placed += 2
+                for _ in range(max(0, required - placed) // 2):
+                    self._add_unit(class_idx, subject_idx, teacher_idx, 2, None)
+            else:
+                for slot in pinned:
+                    self._add_unit(class_idx, subject_idx, teacher_idx, 1, (slot,))
+                for _ in range(max(0, required - len(pinned))):
+                    self._add_unit(class_idx, subject_idx, teacher_idx, 1, None)
+
+        # Occupancy grids hold the unit in each slot
+        self.class_cells = [[FREE] * num_slots for _ in self.class_ids]
+        self.teacher_cells = [[FREE] * num_slots for _ in self.teacher_ids]
+        self.class_load = [[0] * len(self.days) for _ in self.class_ids]
+        self.teacher_load = [[0] * len(self.days) for _ in self.teacher_ids]
+        self.teacher_week = [0] * len(self.teacher_ids)
+        self.unplaced = []
+
+        teacher_units = [0] * len(self.teacher_ids)
+        for unit, teacher_idx in enumerate(self.unit_teacher):
+            if teacher_idx != FREE:
+                teacher_units[teacher_idx] += 1
+        self.teacher_has_units = [count > 0 for count in teacher_units]
+
+    def _slots(self, slots):
+        """Slot numbers of payload {day, period} entries on the grid"""
+        result = set()
+        for slot in slots:
+            day_idx = self._day_index(slot['day'])
+            if day_idx is not None and 1 <= slot['period'] <= self.num_periods:
+                result.add(day_idx * self.num_periods + slot['period'] - 1)
+        return result
+
+    def _add_unit(self, class_idx, subject_idx, teacher_idx, length, allowed):
+        self.unit_class.append(class_idx)
+        self.unit_subject.append(subject_idx)
+        self.unit_teacher.append(teacher_idx)
+        self.unit_length.append(length)
+        self.unit_allowed.append(allowed)
+        self.unit_start.append(FREE)
+
+    def _starts(self, unit):
+        """Candidate start slots of a unit"""
+        allowed = self.unit_allowed[unit]
+        if allowed is not None:
+            return allowed
+        last = self.num_periods - self.unit_length[unit]
+        return [slot for slot in range(len(self.days) * self.num_periods) if slot % self.num_periods <= last]
+
+    # ------------------------------------------------------------------
+    # Grid updates and the hard rules
+    # ------------------------------------------------------------------
+
+    def _can_place(self, unit, start):
+        """Whether a unit fits at start without breaking a hard rule"""
+        num_periods = self.num_periods
+        length = self.unit_length[unit]
+        period = start % num_periods
+        if period + length > num_periods:
+            return False
+
+        row = self.class_cells[self.unit_class[unit]]
+        for slot in range(start, start + length):
+            if row[slot] != FREE:
+                return False
+        # Theory lessons are never back to back, lab pairs never adjacent
+        subject_idx = self.unit_subject[unit]
+        subjects = self.unit_subject
+        if period > 0 and row[start - 1] != FREE and subjects[row[start - 1]] == subject_idx:
+            return False
+        if period + length < num_periods and row[start + length] != FREE and subjects[row[start + length]] == subject_idx:
+            return False
+
+        teacher_idx = self.unit_teacher[unit]
+        if teacher_idx == FREE:
+            return True
+        cells = self.teacher_cells[teacher_idx]
+        for slot in range(start, start + length):
+            if cells[slot] != FREE:
+                return False
+        hard = self.hard
+        if hard["teacherUnavailable"]:
+            unavailable = self.unavailable[teacher_idx]
+            if unavailable and any(slot in unavailable for slot in range(start, start + length)):
+                return False
+        if hard["teacherDailyLimit"] and self.teacher_load[teacher_idx][start // num_periods] + length > self.daily_limit[teacher_idx]:
+            return False
+        if hard["teacherWeeklyLimit"] and self.teacher_week[teacher_idx] + length > self.weekly_limit[teacher_idx]:
+            return False
+        if hard["teacherNoConsecutive"]:
+            if period > 0 and cells[start - 1] != FREE:
+                return False
+            if period + length < num_periods and cells[start + length] != FREE:
+                return False
+        return True
+
+    def _place(self, unit, start):
+        length = self.unit_length[unit]
+        day_idx = start // self.num_periods
+        class_idx = self.unit_class[unit]
+        row = self.class_cells[class_idx]
+        for slot in range(start, start + length):
+            row[slot] = unit
+        self.class_load[class_idx][day_idx] += length
+        teacher_idx = self.unit_teacher[unit]
+        if teacher_idx != FREE:
+            cells = self.teacher_cells[teacher_idx]
+            for slot in range(start, start + length):
+                cells[slot] = unit
+            self.teacher_load[teacher_idx][day_idx] += length
+            self.teacher_week[teacher_idx] += length
+        self.unit_start[unit] = start
+
+    def _remove(self, unit):
+        start = self.unit_start[unit]
+        length = self.unit_length[unit]
+        day_idx = start // self.num_periods
+        class_idx = self.unit_class[unit]
+        row = self.class_cells[class_idx]
+        for slot in range(start, start + length):
+            row[slot] = FREE
+        self.class_load[class_idx][day_idx] -= length
+        teacher_idx = self.unit_teacher[unit]
+        if teacher_idx != FREE:
+            cells = self.teacher_cells[teacher_idx]
+            for slot in range(start, start + length):
+                cells[slot] = FREE
+            self.teacher_load[teacher_idx][day_idx] -= length
+            self.teacher_week[teacher_idx] -= length
+        self.unit_start[unit] = FREE
+
+    # ------------------------------------------------------------------
+    # Greedy construction and repair
+    # ------------------------------------------------------------------
+
+    def _construct(self):
+        """Place every unit, most constrained first, in its best feasible slot"""
+        num_slots = len(self.days) * self.num_periods
+        teacher_demand = [0] * len(self.teacher_ids)
+        class_demand = [0] * len(self.class_ids)
+        for unit, length in enumerate(self.unit_length):
+            class_demand[self.unit_class[unit]] += length
+            if self.unit_teacher[unit] != FREE:
+                teacher_demand[self.unit_teacher[unit]] += length
+
+        teacher_tightness = []
+        for teacher_idx in range(len(self.teacher_ids)):
+            capacity = num_slots
+            if self.hard["teacherUnavailable"]:
+                capacity -= len(self.unavailable[teacher_idx])
+            if self.hard["teacherDailyLimit"]:
+                capacity = min(capacity, self.daily_limit[teacher_idx] * len(self.days))
+            if self.hard["teacherWeeklyLimit"]:
+                capacity = min(capacity, self.weekly_limit[teacher_idx])
+            teacher_tightness.append(teacher_demand[teacher_idx] / max(capacity, 1))
+
+        def priority(unit):
+            teacher_idx = self.unit_teacher[unit]
+            return (
+                self.unit_allowed[unit] is None,
+                -self.unit_length[unit],
+                -(teacher_tightness[teacher_idx] if teacher_idx != FREE else 0.0),
+                -class_demand[self.unit_class[unit]],
+                self.rng.random(),
+            )
+
+        for unit in sorted(range(len(self.unit_class)), key=priority):
+            best = None
+            best_score = None
+            for start in self._starts(unit):
+                if not self._can_place(unit, start):
+                    continue
+                score = self._placement_score(unit, start)
+                if best_score is None or score < best_score:
+                    best, best_score = start, score
+            if best is None:
+                self.unplaced.append(unit)
+            else:
+                self._place(unit, best)
+
+    def _placement_score(self, unit, start):
+        """Cheap greedy preference: light days, lessons kept together, soft rules kept"""
+        num_periods = self.num_periods
+        day_idx, period = divmod(start, num_periods)
+        length = self.unit_length[unit]
+        class_idx = self.unit_class[unit]
+        row = self.class_cells[class_idx]
+        score = self.class_load[class_idx][day_idx] + self.rng.random() * 0.5
+
+        # Next to a lesson of the same class: no new hole
+        if self.class_load[class_idx][day_idx]:
+            touching = (period > 0 and row[start - 1] != FREE) or \
+                (period + length < num_periods and row[start + length] != FREE)
+            if not touching:
+                score += self.weights["classGaps"]
+
+        teacher_idx = self.unit_teacher[unit]
+        if teacher_idx != FREE:
+            score += self.teacher_load[teacher_idx][day_idx]
+            preferred = self.preferred[teacher_idx]
+            slots = range(start, start + length)
+            if preferred is not None:
+                score += self.weights["preferredSlots"] * sum(1 for slot in slots if slot not in preferred)
+            if not self.hard["teacherUnavailable"]:
+                score += self.weights["teacherUnavailable"] * sum(1 for slot in slots if slot in self.unavailable[teacher_idx])
+            if not self.hard["teacherDailyLimit"] and self.teacher_load[teacher_idx][day_idx] + length > self.daily_limit[teacher_idx]:
+                score += self.weights["teacherDailyLimit"] * length
+        return score
+
+    def _blockers(self, unit, start):
+        """Units occupying the cells a unit needs at start, or None if one is fixed"""
+        num_periods = self.num_periods
+        length = self.unit_length[unit]
+        period = start % num_periods
+        blockers = set()
+        row = self.class_cells[self.unit_class[unit]]
+        for slot in range(start, start + length):
+            if row[slot] != FREE:
+                blockers.add(row[slot])
+        subject_idx = self.unit_subject[unit]
+        for slot, inside in ((start - 1, period > 0), (start + length, period + length < num_periods)):
+            if inside and row[slot] != FREE and self.unit_subject[row[slot]] == subject_idx:
+                blockers.add(row[slot])
+
+        teacher_idx = self.unit_teacher[unit]
+        if teacher_idx != FREE:
+            cells = self.teacher_cells[teacher_idx]
+            for slot in range(start, start + length):
+                if cells[slot] != FREE:
+                    blockers.add(cells[slot])
+            if self.hard["teacherNoConsecutive"]:
+                for slot, inside in ((start - 1, period > 0), (start + length, period + length < num_periods)):
+                    if inside and cells[slot] != FREE:
+                        blockers.add(cells[slot])
+
+        if any(self.unit_allowed[blocker] is not None for blocker in blockers):
+            return None
+        return blockers
+
+    def _repair(self, deadline):
+        """Insert unplaced units by ejecting the units in their way
+
+        Each unplaced unit goes to the start that ejects the fewest lesson
+        periods; ejected units join the queue. Recently inserted units may
+        not be ejected, so the search does not cycle between two lessons.
+        Returns the number of insertions made.
+        """
+        inserted_at = {}
+        insertions = 0
+        queue = list(self.unplaced)
+        self.unplaced = []
+        while queue:
+            if time.time() > deadline:
+                self.unplaced.extend(queue)
+                break
+            unit = queue.pop(0)
+            best = None
+            best_cost = None
+            for start in self._starts(unit):
+                blockers = self._blockers(unit, start)
+                if blockers is None or any(insertions - inserted_at.get(b, -EJECTION_TENURE) < EJECTION_TENURE for b in blockers):
+                    continue
+                # Limits and availability must hold once the blockers are gone
+                previous = [(blocker, self.unit_start[blocker]) for blocker in blockers]
+                for blocker, _ in previous:
+                    self._remove(blocker)
+                fits = self._can_place(unit, start)
+                for blocker, blocker_start in previous:
+                    self._place(blocker, blocker_start)
+                if not fits:
+                    continue
+                cost = sum(self.unit_length[blocker] for blocker in blockers) + self.rng.random()
+                if best_cost is None or cost < best_cost:
+                    best, best_cost = (start, blockers), cost
+
+            if best is None:
+                self.unplaced.append(unit)
+                continue
+            start, blockers = best
+            for blocker in blockers:
+                self._remove(blocker)
+                queue.append(blocker)
+            self._place(unit, start)
+            inserted_at[unit] = insertions
+            insertions += 1
+        return insertions
+
+    # ------------------------------------------------------------------
+    # Penalties and simulated annealing
+    # ------------------------------------------------------------------
+
+    def _gaps(self, cells, day_idx, allowed_break=0):
+        """Lesson blocks beyond the first in one day of a grid row
+
+        As in the CP-SAT model, holes of up to allowed_break periods do not
+        separate blocks.
+        """
+        base = day_idx * self.num_periods
+        blocks = 0
+        for slot in range(base, base + self.num_periods):
+            if cells[slot] != FREE and all(cells[s] == FREE for s in range(max(base, slot - allowed_break - 1), slot)):
+                blocks += 1
+        return blocks - 1 if blocks else 0
+
+    def _consecutive(self, cells, day_idx):
+        """Two-period windows holding two different lessons of a teacher"""
+        base = day_idx * self.num_periods
+        count = 0
+        for slot in range(base, base + self.num_periods - 1):
+            if cells[slot] != FREE and cells[slot + 1] != FREE and cells[slot] != cells[slot + 1]:
+                count += 1
+        return count
+
+    def _class_day_terms(self, class_idx, day_idx):
+        return {"classGaps": self._gaps(self.class_cells[class_idx], day_idx)}
+
+    def _class_terms(self, class_idx):
+        loads = self.class_load[class_idx]
+        return {"classBalance": max(loads) - min(loads)}
+
+    def _teacher_day_terms(self, teacher_idx, day_idx):
+        cells = self.teacher_cells[teacher_idx]
+        terms = {"teacherGaps": self._gaps(cells, day_idx, 1 if self.hard["teacherNoConsecutive"] else 0)}
+        base = day_idx * self.num_periods
+        slots = [slot for slot in range(base, base + self.num_periods) if cells[slot] != FREE]
+        preferred = self.preferred[teacher_idx]
+        if preferred is not None:
+            terms["preferredSlots"] = sum(1 for slot in slots if slot not in preferred)
+        if not self.hard["teacherUnavailable"]:
+            terms["teacherUnavailable"] = sum(1 for slot in slots if slot in self.unavailable[teacher_idx])
+        if not self.hard["teacherDailyLimit"]:
+            terms["teacherDailyLimit"] = max(0, len(slots) - self.daily_limit[teacher_idx])
+        if not self.hard["teacherNoConsecutive"]:
+            terms["teacherNoConsecutive"] = self._consecutive(cells, day_idx)
+        return terms
+
+    def _teacher_terms(self, teacher_idx):
+        loads = self.teacher_load[teacher_idx]
+        terms = {"teacherBalance": max(loads) - min(loads)}
+        if not self.hard["teacherWeeklyLimit"]:
+            terms["teacherWeeklyLimit"] = max(0, self.teacher_week[teacher_idx] - self.weekly_limit[teacher_idx])
+        return terms
+
+    def _weighted(self, terms):
+        weights = self.weights
+        return sum(weights[group] * value for group, value in terms.items())
+
+    def _penalties(self):
+        """Raw penalty per weighted group over the whole timetable"""
+        totals = {}
+
+        def add(terms):
+            for group, value in terms.items():
+                if self.weights[group]:
+                    totals[group] = totals.get(group, 0) + value
+
+        for class_idx in range(len(self.class_ids)):
+            if not self.class_subjects[class_idx]:
+                continue
+            for day_idx in range(len(self.days)):
+                add(self._class_day_terms(class_idx, day_idx))
+            add(self._class_terms(class_idx))
+        for teacher_idx in range(len(self.teacher_ids)):
+            if not self.teacher_has_units[teacher_idx]:
+                continue
+            for day_idx in range(len(self.days)):
+                add(self._teacher_day_terms(teacher_idx, day_idx))
+            add(self._teacher_terms(teacher_idx))
+        return totals
+
+    def _total_cost(self):
+        return self._weighted(self._penalties())
+
+    def penalty_breakdown(self):
+        """Per-group penalty, weight and weighted contribution, as objective.penalty_breakdown reports"""
+        terms = {}
+        total = 0
+        for group, penalty in self._penalties().items():
+            weight = self.weights[group]
+            terms[group] = {"weight": weight, "penalty": penalty, "weighted": weight * penalty}
+            total += weight * penalty
+        return {"total": total, "rules": self.objective['rules'], "terms": terms}
+
+    def _local_cost(self, class_days, teacher_days):
+        """Weighted penalty of the given class-days and teacher-days and their entities"""
+        cost = 0
+        for class_idx in {class_idx for class_idx, _ in class_days}:
+            cost += self._weighted(self._class_terms(class_idx))
+        for class_idx, day_idx in class_days:
+            cost += self._weighted(self._class_day_terms(class_idx, day_idx))
+        for teacher_idx in {teacher_idx for teacher_idx, _ in teacher_days}:
+            cost += self._weighted(self._teacher_terms(teacher_idx))
+        for teacher_idx, day_idx in teacher_days:
+            cost += self._weighted(self._teacher_day_terms(teacher_idx, day_idx))
+        return cost
+
+    def _affected(self, moves):
+        """Class-days and teacher-days touched by (unit, start) pairs"""
+        class_days = set()
+        teacher_days = set()
+        for unit, start in moves:
+            day_idx = start // self.num_periods
+            class_days.add((self.unit_class[unit], day_idx))
+            if self.unit_teacher[unit] != FREE:
+                teacher_days.add((self.unit_teacher[unit], day_idx))
+        return class_days, teacher_days
+
+    def _anneal(self, deadline):
+        """Simulated annealing over lesson moves and same-class swaps
+
+        Returns (moves tried, moves accepted); the best timetable seen is
+        restored at the end.
+        """
+        movable = [unit for unit in range(len(self.unit_class))
+                   if self.unit_allowed[unit] is None or len(self.unit_allowed[unit]) > 1]
+        if not movable:
+            return 0, 0
+        class_units = {}
+        for unit in movable:
+            class_units.setdefault(self.unit_class[unit], []).append(unit)
+
+        start_time = time.time()
+        budget = max(deadline - start_time, 1e-6)
+        cost = best_cost = self._total_cost()
+        best_starts = list(self.unit_start)
+        moves = accepted = 0
+        temperature = INITIAL_TEMPERATURE
+
+        while best_cost > 0:
+            if moves % 64 == 0:
+                elapsed = time.time() - start_time
+                if elapsed >= budget:
+                    break
+                temperature = INITIAL_TEMPERATURE * (FINAL_TEMPERATURE / INITIAL_TEMPERATURE) ** (elapsed / budget)
+            moves += 1
+
+            unit = self.rng.choice(movable)
+            if self.rng.random() < SWAP_RATIO:
+                delta = self._try_swap(unit, class_units[self.unit_class[unit]], temperature)
+            else:
+                delta = self._try_move(unit, temperature)
+            if delta is None:
+                continue
+            accepted += 1
+            cost += delta
+            if cost < best_cost:
+                best_cost = cost
+                best_starts = list(self.unit_start)
+
+        # Back to the best timetable seen
+        for unit in range(len(self.unit_class)):
+            if self.unit_start[unit] != FREE:
+                self._remove(unit)
+        for unit, start in enumerate(best_starts):
+            if start != FREE:
+                self._place(unit, start)
+        return moves, accepted
+
+    def _accept(self, delta, temperature):
+        return delta <= 0 or self.rng.random() < math.exp(-delta / temperature)
+
+    def _try_move(self, unit, temperature):
+        """Move a unit to a random other start; returns the accepted cost change or None"""
+        old = self.unit_start[unit]
+        new = self.rng.choice(self._starts(unit))
+        if new == old:
+            return None
+        class_days, teacher_days = self._affected([(unit, old), (unit, new)])
+        before = self._local_cost(class_days, teacher_days)
+        self._remove(unit)
+        if not self._can_place(unit, new):
+            self._place(unit, old)
+            return None
+        self._place(unit, new)
+        delta = self._local_cost(class_days, teacher_days) - before
+        if self._accept(delta, temperature):
+            return delta
+        self._remove(unit)
+        self._place(unit, old)
+        return None
+
+    def _try_swap(self, unit, candidates, temperature):
+        """Swap a unit with another unit of its class and length; returns the accepted change or None"""
+        other = self.rng.choice(candidates)
+        if other == unit or self.unit_length[other] != self.unit_length[unit] \
+                or self.unit_subject[other] == self.unit_subject[unit]:
+            return None
+        start, other_start = self.unit_start[unit], self.unit_start[other]
+        for candidate, target in ((unit, other_start), (other, start)):
+            allowed = self.unit_allowed[candidate]
+            if allowed is not None and target not in allowed:
+                return None
+
+        moved = [(unit, start), (unit, other_start), (other, start), (other, other_start)]
+        class_days, teacher_days = self._affected(moved)
+        before = self._local_cost(class_days, teacher_days)
+        self._remove(unit)
+        self._remove(other)
+        if self._can_place(unit, other_start):
+            self._place(unit, other_start)
+            if self._can_place(other, start):
+                self._place(other, start)
+                delta = self._local_cost(class_days, teacher_days) - before
+                if self._accept(delta, temperature):
+                    return delta
+                self._remove(other)
+            self._remove(unit)
+        self._place(unit, start)
+        self._place(other, other_start)
+        return None
+
+    # ------------------------------------------------------------------
+    # Output
+    # ------------------------------------------------------------------
+
+    def _solution(self):
+        """Array-backed timetable of the placed lessons, in class/day/period order"""
+        lessons = []
+        for unit, start in enumerate(self.unit_start):
+            if start == FREE:
+                continue
+            day_idx, period_idx = divmod(start, self.num_periods)
+            for offset in range(self.unit_length[unit]):
+                lessons.append((self.unit_class[unit], day_idx, period_idx + offset, self.unit_subject[unit]))
+        lessons.sort()
+        coords = np.array(lessons, dtype=np.int64).reshape(-1, 4)
+        indices = np.arange(len(lessons), dtype=np.int64)
+        values = np.ones(len(lessons), dtype=np.int64)
+        return TimetableArray.from_solution(self, values, (coords, indices))
+
+    def _unplaced_lessons(self):
+        return [{
+            "classId": self.class_ids[self.unit_class[unit]],
+            "subjectId": self.subject_ids[self.unit_subject[unit]],
+            "periods": self.unit_length[unit]
+        } for unit in self.unplaced]
+
+
+def solve_hybrid(data, config):
+    """Draft a timetable with the heuristic, then solve with CP-SAT hinted by it
+
+    The draft (complete or not) hints every subject variable through
+    warm_start; CP-SAT gets what is left of the time limit.
+    """
+    start_time = time.time()
+    drafter = HeuristicScheduler(data, config=config)
+    schedule, unplaced = drafter.draft(start_time)
+    logger.info("Heuristic draft: %d lessons, %d units unplaced, objective %s",
+                len(schedule), len(unplaced), drafter.search_stats["finalObjective"])
+    remaining = max(0.1, config['timeLimit'] - (time.time() - start_time))
+
+    scheduler = TimetableScheduler(data, config=dict(config, timeLimit=remaining))
+    scheduler.warm_start(schedule, complete=not unplaced)
+    result = scheduler.generate_schedule()
+    result['statistics']['engine'] = "hybrid"
+    result['statistics']['heuristic'] = dict(
+        drafter.search_stats,
+        seconds=round(sum(drafter.timer.phases.get(name, 0.0) for name in ("construct", "repair", "localSearch")), 4),
+        unplacedLessons=unplaced
+    )
+    return result
@@ -0,0 +1,331 @@
+# instrumentation.py
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+logger = logging.getLogger("timetable-scheduler")
+
+PROFILE_DIR = os.environ.get("SCHED_PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "timetable-profiles")
+PROFILE_TOP_FUNCTIONS = 20
+
+
+class PhaseTimer:
+    """Wall-clock seconds and model growth per named phase of a solve"""
+
+    def __init__(self, model=None):
+        self.model = model
+        self.phases = {}
+        self.model_size = {}
+
+    @contextmanager
+    def phase(self, name):
+        proto = self.model.Proto() if self.model is not None else None
+        if proto is not None:
+            variables, constraints = len(proto.variables), len(proto.constraints)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+            if proto is not None:
+                added_variables = len(proto.variables) - variables
+                added_constraints = len(proto.constraints) - constraints
+                if added_variables or added_constraints:
+                    size = self.model_size.setdefault(name, {"variables": 0, "constraints": 0})
+                    size["variables"] += added_variables
+                    size["constraints"] += added_constraints
+
+    def to_dict(self):
+        return {
+            "phases": {name: round(seconds, 4) for name, seconds in self.phases.items()},
+            "modelFamilies": self.model_size
+        }
+
+
+def solver_run_stats(phase, solver, status_name, has_objective):
+    """CP-SAT response statistics for one search"""
+    stats = {
+        "phase": phase,
+        "status": status_name,
+        "wallTime": round(solver.WallTime(), 4),
+        "userTime": round(solver.UserTime(), 4),
+        "branches": solver.NumBranches(),
+        "conflicts": solver.NumConflicts(),
+    }
+    if has_objective and status_name in ("OPTIMAL", "FEASIBLE"):
+        stats["objective"] = solver.ObjectiveValue()
+        stats["bestBound"] = solver.BestObjectiveBound()
+    return stats
+
+
+def merge_instrumentation(statistics_list):
+    """Combine the timing blocks of independently solved components"""
+    phases = {}
+    families = {}
+    runs = []
+    for statistics in statistics_list:
+        for name, seconds in (statistics.get("phases") or {}).items():
+            phases[name] = round(phases.get(name, 0.0) + seconds, 4)
+        for name, size in (statistics.get("modelFamilies") or {}).items():
+            merged = families.setdefault(name, {"variables": 0, "constraints": 0})
+            merged["variables"] += size["variables"]
+            merged["constraints"] += size["constraints"]
+        runs.extend(statistics.get("solverRuns") or [])
+    return {"phases": phases, "modelFamilies": families, "solverRuns": runs}
+
+
+def profile_options(value):
+    """Normalize the payload's "profile" flag into {"cprofile", "solverLog"}"""
+    if isinstance(value, dict):
+        return {"cprofile": bool(value.get("cprofile")), "solverLog": bool(value.get("solverLog"))}
+    return {"cprofile": bool(value), "solverLog": bool(value)}
+
+
+class RequestProfile:
+    """Opt-in per-request cProfile and CP-SAT search log, dumped to PROFILE_DIR"""
+
+    def __init__(self, options):
+        self.options = profile_options(options)
+        self.enabled = self.options["cprofile"] or self.options["solverLog"]
+        self.label = uuid.uuid4().hex[:12]
+        self.profiler = None
+        self.solver_log = []
+
+    def start(self):
+        if self.options["cprofile"]:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def attach(self, solver):
+        """Capture the search log of a solver into this profile"""
+        if self.options["solverLog"]:
+            solver.parameters.log_search_progress = True
+            solver.parameters.log_to_stdout = False
+            solver.log_callback = self.solver_log.append
+
+    def finish(self):
+        """Stop profiling, write the dumps and return the summary for statistics"""
+        summary = {"id": self.label}
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+        except OSError:
+            logger.warning("Cannot create profile directory %s", PROFILE_DIR, exc_info=True)
+            return summary
+
+        if self.profiler is not None:
+            self.profiler.disable()
+            path = os.path.join(PROFILE_DIR, f"{self.label}.prof")
+            self.profiler.dump_stats(path)
+            out = io.StringIO()
+            pstats.Stats(self.profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+            summary["cprofileFile"] = path
+            summary["cprofileTop"] = out.getvalue().splitlines()
+        if self.solver_log:
+            path = os.path.join(PROFILE_DIR, f"{self.label}.solver.log")
+            with open(path, "w") as f:
+                f.write("\n".join(self.solver_log))
+            summary["solverLogFile"] = path
+        return summary
+
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges and histograms in Prometheus text format
+
+    After share(directory), every process writes its values to a snapshot
+    file there and render() merges all of them: counters and histograms
+    are summed over every process that ever wrote one, so totals survive
+    worker restarts; gauges come from live processes only, summed or (with
+    merge="last") taken from the most recent snapshot.
+    """
+
+    DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.meta = {}
+        self.values = {}
+        self.histograms = {}
+        self.collectors = []
+        self.directory = None
+        self.snapshot_path = None
+
+    def describe(self, name, metric_type, help_text, buckets=None, merge="sum"):
+        self.meta[name] = (metric_type, help_text, tuple(buckets or self.DEFAULT_BUCKETS), merge)
+
+    def collect(self, callback):
+        """Run callback (which sets values) before each render or flush"""
+        self.collectors.append(callback)
+
+    def share(self, directory):
+        """Merge metrics with every process writing snapshots to directory"""
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.snapshot_path = os.path.join(directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.json")
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.values[(name, _label_key(labels))] = value
+
+    def observe(self, name, value, **labels):
+        buckets = self.meta[name][2]
+        key = (name, _label_key(labels))
+        with self.lock:
+            counts, total, count = self.histograms.get(key, ([0] * len(buckets), 0.0, 0))
+            counts = [c + (1 if value <= bound else 0) for c, bound in zip(counts, buckets)]
+            self.histograms[key] = (counts, total + value, count + 1)
+
+    def flush(self):
+        """Write this process's snapshot for the others (a no-op unless shared)"""
+        if not self.directory:
+            return
+        for callback in self.collectors:
+            callback()
+        with self.lock:
+            snapshot = {
+                "pid": os.getpid(),
+                "time": time.time(),
+                "values": [[name, labels, value] for (name, labels), value in self.values.items()],
+                "histograms": [[name, labels] + list(histogram) for (name, labels), histogram in self.histograms.items()],
+            }
+        tmp_path = f"{self.snapshot_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError:
+            logger.warning("Could not write metrics snapshot %s", self.snapshot_path, exc_info=True)
+
+    def _merged(self):
+        """Values and histograms of every process sharing the directory"""
+        snapshots = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        snapshots.sort(key=lambda snapshot: snapshot["time"])
+
+        values = {}
+        histograms = {}
+        for snapshot in snapshots:
+            alive = _process_alive(snapshot["pid"])
+            for name, labels, value in snapshot["values"]:
+                if name not in self.meta:
+                    continue
+                metric_type, _, _, merge = self.meta[name]
+                key = (name, tuple(tuple(label) for label in labels))
+                if metric_type == "gauge" and not alive:
+                    continue
+                if metric_type == "gauge" and merge == "last":
+                    values[key] = value
+                else:
+                    values[key] = values.get(key, 0) + value
+            for name, labels, counts, total, count in snapshot["histograms"]:
+                key = (name, tuple(tuple(label) for label in labels))
+                merged = histograms.get(key, ([0] * len(counts), 0.0, 0))
+                histograms[key] = ([a + b for a, b in zip(merged[0], counts)], merged[1] + total, merged[2] + count)
+        return values, histograms
+
+    def render(self):
+        if self.directory:
+            self.flush()
+            values, histograms = self._merged()
+        else:
+            for callback in self.collectors:
+                callback()
+            with self.lock:
+                values = dict(self.values)
+                histograms = dict(self.histograms)
+        lines = []
+        for name, (metric_type, help_text, buckets, _) in sorted(self.meta.items()):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            if metric_type == "histogram":
+                for (metric, labels), (counts, total, count) in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, bucket_count in zip(buckets, counts):
+                        lines.append(f"{name}_bucket{_format_labels(labels + (('le', str(bound)),))} {bucket_count}")
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {count}")
+            else:
+                for (metric, labels), value in sorted(values.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_value(value):
+    return repr(round(value, 6)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        f'{key}="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for key, value in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+METRICS = MetricsRegistry()
+METRICS.describe("scheduler_requests_total", "counter", "Schedule requests by endpoint and result status")
+METRICS.describe("scheduler_request_seconds", "histogram", "End-to-end request time in seconds")
+METRICS.describe("scheduler_phase_seconds_total", "counter", "Seconds spent per solver phase")
+METRICS.describe("scheduler_solver_branches_total", "counter", "CP-SAT search branches")
+METRICS.describe("scheduler_solver_conflicts_total", "counter", "CP-SAT search conflicts")
+METRICS.describe("scheduler_model_variables", "gauge", "Variables in the most recent model", merge="last")
+METRICS.describe("scheduler_model_constraints", "gauge", "Constraints in the most recent model", merge="last")
+METRICS.describe("scheduler_cache_events_total", "counter", "Result cache hits, misses, stores and evictions")
+METRICS.describe("scheduler_template_events_total", "counter", "Model template hits, misses, stores and evictions")
+METRICS.describe("scheduler_jobs", "gauge", "Background jobs by state")
+
+
+def record_result(endpoint, result, seconds):
+    """Update request metrics from a solver result's statistics"""
+    statistics = result.get("statistics") or {}
+    METRICS.inc("scheduler_requests_total", endpoint=endpoint, status=result.get("status", "error"))
+    METRICS.observe("scheduler_request_seconds", seconds, endpoint=endpoint)
+    if (statistics.get("cache") or {}).get("hit"):
+        return
+    for phase, phase_seconds in (statistics.get("phases") or {}).items():
+        METRICS.inc("scheduler_phase_seconds_total", phase_seconds, phase=phase)
+    for run in statistics.get("solverRuns") or []:
+        METRICS.inc("scheduler_solver_branches_total", run["branches"], phase=run["phase"])
+        METRICS.inc("scheduler_solver_conflicts_total", run["conflicts"], phase=run["phase"])
+    model = statistics.get("model") or {}
+    if "variables" in model:
+        METRICS.set("scheduler_model_variables", model["variables"])
+        METRICS.set("scheduler_model_constraints", model["constraints"])
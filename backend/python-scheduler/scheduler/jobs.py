@@ -0,0 +1,352 @@
+# jobs.py
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import re
+import signal
+import threading
+import time
+import uuid
+
+from cache import payload_key
+from templates import TEMPLATES
+
+logger = logging.getLogger("timetable-scheduler")
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = {COMPLETED, FAILED, CANCELLED}
+
+# How often the owner of a running job checks for a cancel request left by
+# another server process
+CANCEL_POLL_SECONDS = 0.5
+
+JOB_ID = re.compile(r"[0-9a-f]{32}")
+
+
+def _run_job(data, conn):
+    """Solve one payload in a worker process and send the result back"""
+    # Own process group, so cancelling also stops component solver processes
+    os.setpgrp()
+    # Forked from a server that may handle SIGTERM itself (gunicorn workers do)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # Imported here so the server process does not load OR-tools for jobs
+    from decomposition import solve_schedule
+    try:
+        conn.send(("progress", {"phase": "solving"}))
+        result = solve_schedule(data)
+        # Model templates built here would die with this process
+        conn.send(("templates", TEMPLATES.take_captured()))
+        conn.send(("result", result))
+    except Exception as e:
+        conn.send(("error", str(e)))
+    finally:
+        conn.close()
+
+
+class Job:
+    def __init__(self, data):
+        self.id = uuid.uuid4().hex
+        self.data = data
+        self.status = QUEUED
+        self.progress = {"phase": "queued"}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.process = None
+        self.cache_key = None
+
+    def to_dict(self):
+        """Public view of the job, without the payload"""
+        now = self.finished_at or time.time()
+        return {
+            "jobId": self.id,
+            "status": self.status,
+            "progress": dict(self.progress, elapsedSeconds=round(now - (self.started_at or now), 2)),
+            "createdAt": self.created_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+            "error": self.error
+        }
+
+    @classmethod
+    def from_record(cls, record):
+        """Job published by another server process, for reading only"""
+        job = cls(None)
+        job.id = record["jobId"]
+        job.status = record["status"]
+        job.progress = {key: value for key, value in record["progress"].items() if key != "elapsedSeconds"}
+        job.result = record.get("result")
+        job.error = record["error"]
+        job.created_at = record["createdAt"]
+        job.started_at = record["startedAt"]
+        job.finished_at = record["finishedAt"]
+        return job
+
+
+class JobManager:
+    """In-memory job queue that runs solves in a bounded set of worker processes
+
+    With a directory, every job's public state (and result) is also written
+    there, so server processes sharing the directory answer for each
+    other's jobs; a job owned by another process is cancelled by leaving a
+    marker file its owner picks up.
+    """
+
+    def __init__(self, max_workers=2, retention_seconds=3600, cache=None, on_finish=None, directory=None):
+        self.max_workers = max_workers
+        self.retention_seconds = retention_seconds
+        self.cache = cache
+        self.directory = directory
+        # Called with each job that finishes in a worker (metrics hook)
+        self.on_finish = on_finish
+        self.jobs = {}
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        for worker_idx in range(max_workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"job-worker-{worker_idx}", daemon=True)
+            thread.start()
+
+    def submit(self, data):
+        """Queue a payload for solving and return its job
+
+        Payloads with a cached result complete immediately without a solve.
+        """
+        job = Job(data)
+        cached = None
+        if self.cache is not None:
+            job.cache_key = payload_key(data)
+            cached = self.cache.get(job.cache_key)
+
+        with self.lock:
+            self._purge_finished()
+            self.jobs[job.id] = job
+            if cached is not None:
+                cached["statistics"]["cache"] = {"hit": True}
+                job.result = cached
+                job.status = COMPLETED
+                job.progress = {"phase": "done"}
+                job.finished_at = job.started_at = time.time()
+                job.data = None
+                self._publish(job)
+                logger.info("Job %s served from cache", job.id)
+                return job
+            self._publish(job)
+        self.queue.put(job.id)
+        logger.info("Queued job %s (%d queued)", job.id, self.queue.qsize())
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            job = self._read_published(job_id)
+        return job
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; returns the job or None if unknown"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return self._request_cancel(job_id)
+            if job.status in FINISHED_STATES:
+                return job
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            job.progress = {"phase": "cancelled"}
+            job.data = None
+            process = job.process
+            self._publish(job)
+
+        # Stopping the worker process group aborts the CP-SAT search immediately
+        if process is not None and process.is_alive():
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        logger.info("Cancelled job %s", job_id)
+        return job
+
+    def stats(self):
+        with self.lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {"maxWorkers": self.max_workers, "jobs": counts}
+
+    def active(self):
+        """Number of this process's jobs still queued or running"""
+        with self.lock:
+            return sum(1 for job in self.jobs.values() if job.status not in FINISHED_STATES)
+
+    def shutdown(self):
+        """Cancel every unfinished job, for a server process that is exiting"""
+        with self.lock:
+            job_ids = [job_id for job_id, job in self.jobs.items() if job.status not in FINISHED_STATES]
+        for job_id in job_ids:
+            self.cancel(job_id)
+
+    def _worker_loop(self):
+        while True:
+            job_id = self.queue.get()
+            try:
+                self._run(job_id)
+            except Exception:
+                logger.exception("Job worker failed on job %s", job_id)
+            finally:
+                self.queue.task_done()
+
+    def _run(self, job_id):
+        if self._cancel_requested(job_id):
+            self.cancel(job_id)
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                return
+            parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
+            # Not daemonic: the worker may start its own component solver pool
+            process = multiprocessing.Process(target=_run_job, args=(job.data, child_conn))
+            job.status = RUNNING
+            job.started_at = time.time()
+            job.progress = {"phase": "starting"}
+            job.process = process
+            process.start()
+            self._publish(job)
+        child_conn.close()
+
+        while True:
+            if not parent_conn.poll(CANCEL_POLL_SECONDS):
+                if job.status == RUNNING and self._cancel_requested(job_id):
+                    # Stops the process, so the next receive ends the loop
+                    self.cancel(job_id)
+                continue
+            try:
+                kind, payload = parent_conn.recv()
+            except (EOFError, OSError):
+                # Worker exited without a result (terminated or crashed)
+                break
+            with self.lock:
+                if job.status != RUNNING:
+                    break
+                if kind == "progress":
+                    job.progress = payload
+                    self._publish(job)
+                    continue
+                if kind == "templates":
+                    TEMPLATES.adopt(payload)
+                    continue
+                if kind == "result":
+                    job.result = payload
+                    job.status = COMPLETED
+                else:
+                    job.error = payload
+                    job.status = FAILED
+                job.progress = {"phase": "done"}
+                job.finished_at = time.time()
+            break
+
+        process.join()
+        parent_conn.close()
+        with self.lock:
+            job.process = None
+            if job.status == RUNNING:
+                job.status = FAILED
+                job.error = f"Worker exited with code {process.exitcode}"
+                job.finished_at = time.time()
+            self._publish(job)
+        if job.status == COMPLETED and self.cache is not None:
+            self.cache.put(job.cache_key, job.result)
+        # Drop the payload once the job is finished
+        job.data = None
+        logger.info("Job %s finished with status %s", job.id, job.status)
+        if self.on_finish is not None:
+            self.on_finish(job)
+
+    def _purge_finished(self):
+        """Forget finished jobs older than the retention window (lock held)"""
+        cutoff = time.time() - self.retention_seconds
+        expired = [job_id for job_id, job in self.jobs.items()
+                   if job.status in FINISHED_STATES and job.finished_at and job.finished_at < cutoff]
+        for job_id in expired:
+            del self.jobs[job_id]
+        if self.directory:
+            for job_id in expired:
+                self._remove_published(job_id)
+            self._prune_published(cutoff)
+
+    def _path(self, job_id, suffix="json"):
+        return os.path.join(self.directory, f"{job_id}.{suffix}")
+
+    def _publish(self, job):
+        """Write a job's public state and result for the other server processes"""
+        if not self.directory:
+            return
+        path = self._path(job.id)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(dict(job.to_dict(), result=job.result), f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError):
+            logger.warning("Could not publish job %s", job.id, exc_info=True)
+
+    def _read_published(self, job_id):
+        if not self.directory or not JOB_ID.fullmatch(job_id):
+            return None
+        try:
+            with open(self._path(job_id)) as f:
+                return Job.from_record(json.load(f))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _request_cancel(self, job_id):
+        """Leave a cancel marker for a job another process owns (lock held)"""
+        job = self._read_published(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return job
+        try:
+            open(self._path(job_id, "cancel"), "w").close()
+        except OSError:
+            logger.warning("Could not request cancelling job %s", job_id, exc_info=True)
+            return job
+        job.status = CANCELLED
+        job.finished_at = time.time()
+        job.progress = {"phase": "cancelled"}
+        logger.info("Requested cancelling job %s", job_id)
+        return job
+
+    def _cancel_requested(self, job_id):
+        return bool(self.directory) and os.path.exists(self._path(job_id, "cancel"))
+
+    def _remove_published(self, job_id):
+        for suffix in ("json", "cancel"):
+            try:
+                os.remove(self._path(job_id, suffix))
+            except OSError:
+                pass
+
+    def _prune_published(self, cutoff):
+        """Drop files left behind by server processes that have exited"""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
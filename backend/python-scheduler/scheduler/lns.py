@@ -0,0 +1,331 @@
+# lns.py
+import logging
+import random
+import time
+
+import numpy as np
+from ortools.sat.python import cp_model
+
+from heuristic import HeuristicScheduler
+from objective import penalty_breakdown
+from optimizer import TimetableScheduler
+from solver_config import apply_to_solver
+from timetable_array import TimetableArray, solution_variables
+
+logger = logging.getLogger("timetable-scheduler")
+
+# Neighborhoods, tried in turn: one day of a group of classes, every day of
+# the classes some teachers share, or every day of random classes
+NEIGHBORHOODS = ("day", "teacher", "classes")
+
+# Share of the (class, day) cells a neighborhood frees, at the start and
+# at most/least as it adapts
+INITIAL_NEIGHBORHOOD = 0.05
+MIN_NEIGHBORHOOD = 0.01
+MAX_NEIGHBORHOOD = 0.5
+
+# Neighborhood size factor after a subproblem solved to optimality (grow)
+# or ran out of step time without an improvement (shrink)
+GROW = 1.25
+SHRINK = 0.8
+
+# Time allowed for the solve that only completes a fixed timetable
+MIN_STEP_TIME = 1.0
+
+
+class LNSScheduler(TimetableScheduler):
+    """Large neighborhood search around the CP-SAT model
+
+    The heuristic engine's draft is the initial timetable. The model is
+    built once; each step copies it, fixes the subject variables outside a
+    neighborhood of (class, day) cells to the best timetable so far and
+    re-solves the rest for at most config['lnsStepTime'] seconds, hinted
+    with the best solution. Improvements are kept, and the neighborhood
+    grows while subproblems are solved to optimality and shrinks while
+    they run out of time without improving. Whatever the time limit, the best timetable
+    found so far is returned, so a short budget gives the draft rather
+    than no timetable at all.
+    """
+
+    def __init__(self, data, sparse=True, config=None):
+        super().__init__(data, sparse=sparse, config=config)
+        # The draft ignores room capacity, so rooms are assigned afterwards
+        self.room_constraints = False
+        if self.config['roomAssignment'] != 'stage':
+            self.config = dict(self.config, roomAssignment='stage')
+        self.rng = random.Random(self.config['randomSeed'])
+        self.lns_stats = {}
+
+    def _generate(self, on_solution, start_time):
+        rejected = self._analyze(start_time)
+        if rejected:
+            rejected["statistics"]["engine"] = "lns"
+            return rejected
+        deadline = start_time + self.config['timeLimit']
+
+        drafter = HeuristicScheduler(self.data, config=self.config)
+        schedule, unplaced = drafter.draft(start_time)
+        self.timer.phases["draft"] = sum(drafter.timer.phases.get(name, 0.0) for name in ("construct", "repair", "localSearch"))
+        if not unplaced:
+            self.first_solution_at = time.time()
+            if time.time() >= deadline:
+                return self._draft_result(drafter, start_time)
+
+        timetable, _ = self._create_variables_and_constraints()
+        self._record_model_stats(timetable, time.time() - start_time)
+        if self.penalties:
+            self.model.Minimize(self._objective_expression())
+        if self.solution_variables is None:
+            self.solution_variables = solution_variables(timetable)
+        self.coords, self.indices = self.solution_variables
+        self.serialized = self.model.Proto().SerializeToString()
+        self._index_neighborhoods()
+
+        self.lns_stats = {
+            "initialUnplaced": len(unplaced),
+            "initialObjective": drafter.search_stats["finalObjective"] if not unplaced else None,
+            "iterations": 0,
+            "improvements": 0,
+            "neighborhoods": {kind: {"tried": 0, "improved": 0} for kind in NEIGHBORHOODS},
+            "trace": [],
+        }
+
+        with self.timer.phase("lnsInitial"):
+            best = self._initial_solution(schedule, unplaced, deadline)
+        if best is None:
+            if unplaced:
+                return self._no_timetable(start_time, unplaced)
+            # Stopped before CP-SAT completed the draft: it is the answer
+            return self._draft_result(drafter, start_time)
+        self._record(best, start_time, on_solution)
+
+        size = INITIAL_NEIGHBORHOOD
+        # Without soft goals any timetable is optimal
+        optimal = not self.penalties
+        with self.timer.phase("lns"):
+            while not optimal and not self.stop_requested.is_set():
+                remaining = deadline - time.time()
+                if remaining <= 0.05:
+                    break
+                kind = NEIGHBORHOODS[self.lns_stats["iterations"] % len(NEIGHBORHOODS)]
+                free = self._neighborhood(kind, size)
+                status, solver = self._solve_neighborhood(free, best, min(self.config['lnsStepTime'], remaining))
+                self.lns_stats["iterations"] += 1
+                self.lns_stats["neighborhoods"][kind]["tried"] += 1
+
+                improved = status in (cp_model.OPTIMAL, cp_model.FEASIBLE) and solver.ObjectiveValue() < best.ObjectiveValue()
+                if improved:
+                    best = solver
+                    self.lns_stats["improvements"] += 1
+                    self.lns_stats["neighborhoods"][kind]["improved"] += 1
+                    if self._record(best, start_time, on_solution) is False:
+                        break
+                if status == cp_model.OPTIMAL and free.all():
+                    # The whole timetable was the neighborhood
+                    optimal = True
+                    break
+                if status == cp_model.OPTIMAL:
+                    size = min(MAX_NEIGHBORHOOD, size * GROW)
+                elif not improved:
+                    size = max(MIN_NEIGHBORHOOD, size * SHRINK)
+        self.lns_stats["neighborhoodSize"] = round(size, 4)
+        end_time = time.time()
+
+        with self.timer.phase("extract"):
+            solution = TimetableArray.from_solution(self, np.array(best.ResponseProto().solution), self.solution_variables)
+            schedule = solution.to_items()
+        with self.timer.phase("statistics"):
+            statistics = self._generate_statistics(best, schedule, end_time - start_time, solution)
+            statistics["feasibility"] = {"issues": self.feasibility_issues}
+            statistics["objective"] = penalty_breakdown(self, best)
+            statistics["timeToFirstSolution"] = round(self.first_solution_at - start_time, 3)
+            statistics["engine"] = "lns"
+            statistics["heuristic"] = drafter.search_stats
+            statistics["lns"] = self.lns_stats
+        return self.with_rooms({
+            "message": "Schedule generated successfully",
+            "schedule": schedule,
+            "statistics": statistics,
+            "status": "optimal" if optimal else "feasible"
+        }, start_time, on_solution)
+
+    def _index_neighborhoods(self):
+        """Classes per teacher and teachers per class, for related neighborhoods"""
+        self.teacher_class_indices = {}
+        self.class_teachers = []
+        for class_idx, class_id in enumerate(self.class_ids):
+            teachers = sorted({teacher_id for teacher_id in self.subject_teacher.get(class_id, {}).values() if teacher_id})
+            self.class_teachers.append(teachers)
+            for teacher_id in teachers:
+                self.teacher_class_indices.setdefault(teacher_id, []).append(class_idx)
+
+    def _related_classes(self, count, seed_classes=None):
+        """Up to count classes, grown from seed classes through shared teachers"""
+        queue = list(seed_classes) if seed_classes else [self.rng.randrange(len(self.class_ids))]
+        chosen = []
+        seen = set(queue)
+        while queue and len(chosen) < count:
+            class_idx = queue.pop(0)
+            chosen.append(class_idx)
+            teachers = list(self.class_teachers[class_idx])
+            self.rng.shuffle(teachers)
+            for teacher_id in teachers:
+                for other in self.teacher_class_indices[teacher_id]:
+                    if other not in seen:
+                        seen.add(other)
+                        queue.append(other)
+            if not queue and len(chosen) < count:
+                # Component exhausted: continue from an unrelated class
+                rest = [c for c in range(len(self.class_ids)) if c not in seen]
+                if rest:
+                    other = self.rng.choice(rest)
+                    seen.add(other)
+                    queue.append(other)
+        return chosen
+
+    def _neighborhood(self, kind, size):
+        """Boolean (class, day) mask of the cells a step frees"""
+        num_classes, num_days = len(self.class_ids), len(self.days)
+        cells = max(1, int(round(size * num_classes * num_days)))
+        free = np.zeros((num_classes, num_days), dtype=bool)
+        if kind == "day":
+            free[self._related_classes(cells), self.rng.randrange(num_days)] = True
+        elif kind == "teacher":
+            teacher_id = self.rng.choice(sorted(self.teacher_class_indices)) if self.teacher_class_indices else None
+            seeds = self.teacher_class_indices.get(teacher_id)
+            free[self._related_classes(max(1, cells // num_days), seeds), :] = True
+        else:
+            count = min(num_classes, max(1, cells // num_days))
+            free[self.rng.sample(range(num_classes), count), :] = True
+        return free
+
+    def _solve_neighborhood(self, free, hint, time_limit, values=None, feasibility=False):
+        """Solve the model with the subject variables outside free fixed
+
+        Pinned values come from the hint solver's response, or from values
+        (subject variable values in solution_variables order) before the
+        first solution. With feasibility the objective is left out.
+        Returns (status, solver).
+        """
+        model = cp_model.CpModel()
+        proto = model.Proto()
+        proto.ParseFromString(self.serialized)
+        if feasibility:
+            proto.ClearField('objective')
+        if values is None:
+            solution = np.array(hint.ResponseProto().solution)
+            values = solution[self.indices]
+            proto.solution_hint.vars.extend(range(len(solution)))
+            proto.solution_hint.values.extend(solution.tolist())
+        else:
+            proto.solution_hint.vars.extend(self.indices.tolist())
+            proto.solution_hint.values.extend(values.tolist())
+
+        pinned = ~free[self.coords[:, 0], self.coords[:, 1]]
+        for index, value in zip(self.indices[pinned].tolist(), values[pinned].tolist()):
+            proto.variables[index].domain[:] = [value, value]
+
+        solver = cp_model.CpSolver()
+        apply_to_solver(self.config, solver)
+        solver.parameters.max_time_in_seconds = time_limit
+        if self.stop_requested.is_set():
+            return cp_model.UNKNOWN, solver
+        self.solver = solver
+        status = solver.Solve(model)
+        self.solver = None
+        return status, solver
+
+    def _initial_solution(self, schedule, unplaced, deadline):
+        """CP-SAT solution around the heuristic draft, or None
+
+        Classes with unplaced lessons are freed, together with more and
+        more of the classes sharing their teachers while a step finds no
+        timetable, up to the whole timetable, which gets the rest of the
+        time. These repair steps only look for a timetable, as the first
+        CP-SAT phase does; the objective is then minimized around it with
+        every subject variable fixed. A complete draft only goes through
+        that last step.
+        """
+        grid = np.full((len(self.class_ids), len(self.days), len(self.periods)), -1, dtype=np.int64)
+        for item in schedule:
+            grid[self.class_to_index[item['classId']], self._day_index(item['day']),
+                 item['period'] - 1] = self.subject_to_index[item['subjectId']]
+        coords = self.coords
+        values = (grid[coords[:, 0], coords[:, 1], coords[:, 2]] == coords[:, 3]).astype(np.int64)
+
+        free = np.zeros((len(self.class_ids), len(self.days)), dtype=bool)
+        seeds = sorted({self.class_to_index[lesson['classId']] for lesson in unplaced})
+        count = len(seeds)
+        while seeds:
+            remaining = deadline - time.time()
+            if remaining <= 0 or self.stop_requested.is_set():
+                return None
+            free[self._related_classes(count, seeds), :] = True
+            if not free.all():
+                remaining = min(remaining, self.config['lnsStepTime'])
+            status, solver = self._solve_neighborhood(free, None, remaining, values, feasibility=True)
+            if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                self.first_solution_at = time.time()
+                values = np.array(solver.ResponseProto().solution)[self.indices]
+                break
+            if free.all():
+                return None
+            count = min(len(self.class_ids), count * 2)
+
+        # Every subject variable is fixed, so this is quick even past the deadline
+        free[:] = False
+        remaining = max(deadline - time.time(), MIN_STEP_TIME)
+        status, solver = self._solve_neighborhood(free, None, remaining, values)
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            return solver
+        return None
+
+    def _record(self, solver, start_time, on_solution):
+        """Trace an accepted solution and report it to on_solution"""
+        objective = solver.ObjectiveValue()
+        elapsed = round(time.time() - start_time, 3)
+        self.lns_stats["trace"].append([elapsed, objective])
+        logger.info("LNS objective %s at %.1fs", objective, elapsed)
+        if on_solution is None:
+            return True
+        values = np.array(solver.ResponseProto().solution)
+        return on_solution({
+            "solutionIndex": len(self.lns_stats["trace"]),
+            "objective": objective,
+            "bestBound": solver.BestObjectiveBound(),
+            "wallTime": elapsed,
+            "schedule": TimetableArray.from_solution(self, values, self.solution_variables).to_items()
+        })
+
+    def _draft_result(self, drafter, start_time):
+        """Result for a complete draft CP-SAT had no time to start from"""
+        schedule = drafter.solution.to_items()
+        end_time = time.time()
+        statistics = self._generate_statistics(None, schedule, end_time - start_time, drafter.solution)
+        statistics["feasibility"] = {"issues": self.feasibility_issues}
+        statistics["objective"] = drafter.penalty_breakdown()
+        statistics["timeToFirstSolution"] = round(self.first_solution_at - start_time, 3)
+        statistics["engine"] = "lns"
+        statistics["heuristic"] = drafter.search_stats
+        statistics["lns"] = self.lns_stats
+        return self.with_rooms({
+            "message": "Schedule generated successfully",
+            "schedule": schedule,
+            "statistics": statistics,
+            "status": "feasible"
+        }, start_time)
+
+    def _no_timetable(self, start_time, unplaced):
+        return {
+            "message": f"No timetable found: {len(unplaced)} lessons could not be placed",
+            "schedule": [],
+            "statistics": {
+                "solveTime": time.time() - start_time,
+                "model": self.model_stats,
+                "solverConfig": self.config,
+                "feasibility": {"issues": self.feasibility_issues},
+                "engine": "lns",
+                "lns": dict(self.lns_stats, unplacedLessons=unplaced)
+            },
+            "status": "infeasible"
+        }
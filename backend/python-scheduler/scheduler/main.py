@@ -1,10 +1,23 @@
 # main.py
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
+import atexit
+import json
 import logging
 import os
+import queue
+import threading
+import time
 from datetime import datetime
-from optimizer import TimetableScheduler
+from cache import ResultCache, payload_key
+from jobs import JobManager, COMPLETED
+from solver_config import resolve_config
+from objective import resolve_objective
+from instrumentation import METRICS, record_result
+from request_log import RequestLog
+from validation import TimetableValidator, ValidationSessions
+from encoding import JSON, encode_body, negotiate
+from templates import TEMPLATES
 
 # ----------------------------
 # Logging Setup
@@ -25,9 +38,187 @@ CORS(app)
 # ----------------------------
 # Configuration (from env)
 # ----------------------------
-DEFAULT_DAYS = int(os.environ.get("SCHED_DAYS", 6))
-DEFAULT_PERIODS = int(os.environ.get("SCHED_PERIODS", 6))
-DEFAULT_TIME_LIMIT = int(os.environ.get("SCHED_TIME_LIMIT", 30))
+# Solver settings (SCHED_TIME_LIMIT, SCHED_WORKERS, SCHED_RANDOM_SEED,
+# SCHED_DAYS, SCHED_PERIODS, SCHED_RELATIVE_GAP, SCHED_ABSOLUTE_GAP) are
+# resolved per request by solver_config, merged with "solverOptions".
+MAX_CONCURRENT_JOBS = int(os.environ.get("SCHED_MAX_CONCURRENT_JOBS", 2))
+JOB_RETENTION_SECONDS = int(os.environ.get("SCHED_JOB_RETENTION", 3600))
+# Shared by every server process, so any of them answers for a job
+# (gunicorn.conf.py sets one up for its workers)
+JOB_DIR = os.environ.get("SCHED_JOB_DIR") or None
+
+CACHE_SIZE = int(os.environ.get("SCHED_CACHE_SIZE", 128))
+CACHE_TTL_SECONDS = int(os.environ.get("SCHED_CACHE_TTL", 3600))
+CACHE_DIR = os.environ.get("SCHED_CACHE_DIR") or None
+CACHE_DISK_ENTRIES = int(os.environ.get("SCHED_CACHE_DISK_ENTRIES", 1024))
+# Structural model templates are kept per process (SCHED_TEMPLATE_CACHE_SIZE,
+# read by templates.py; 0 disables them)
+
+VALIDATION_SESSIONS = int(os.environ.get("SCHED_VALIDATION_SESSIONS", 64))
+VALIDATION_SESSION_TTL = int(os.environ.get("SCHED_VALIDATION_SESSION_TTL", 1800))
+# Sessions (and, below, metrics) shared by every server process
+VALIDATION_SESSION_DIR = os.environ.get("SCHED_SESSION_DIR") or None
+METRICS_DIR = os.environ.get("SCHED_METRICS_DIR") or None
+
+MAX_SCENARIOS = int(os.environ.get("SCHED_MAX_SCENARIOS", 16))
+
+# Payload capture: a sampled fraction of requests up to a size cap; with
+# SCHED_REQUEST_LOG_LEVEL=DEBUG every payload is captured in full. Each
+# worker writes its own pid-suffixed file next to SCHED_REQUEST_LOG_FILE
+REQUEST_LOG_FILE = os.environ.get("SCHED_REQUEST_LOG_FILE", os.path.join("logs", "requests.jsonl"))
+REQUEST_LOG_SAMPLE = float(os.environ.get("SCHED_REQUEST_LOG_SAMPLE", 0.0))
+REQUEST_LOG_MAX_BYTES = int(os.environ.get("SCHED_REQUEST_LOG_MAX_BYTES", 1048576))
+REQUEST_LOG_ROTATE_BYTES = int(os.environ.get("SCHED_REQUEST_LOG_ROTATE_BYTES", 10485760))
+REQUEST_LOG_BACKUPS = int(os.environ.get("SCHED_REQUEST_LOG_BACKUPS", 5))
+REQUEST_LOG_LEVEL = os.environ.get("SCHED_REQUEST_LOG_LEVEL", "INFO").upper()
+
+# ----------------------------
+# Request Log
+# ----------------------------
+request_log = RequestLog(
+    REQUEST_LOG_FILE,
+    sample_rate=REQUEST_LOG_SAMPLE,
+    max_bytes=REQUEST_LOG_MAX_BYTES,
+    rotate_bytes=REQUEST_LOG_ROTATE_BYTES,
+    backups=REQUEST_LOG_BACKUPS,
+    level=getattr(logging, REQUEST_LOG_LEVEL, logging.INFO)
+)
+atexit.register(request_log.close)
+
+# ----------------------------
+# Result Cache
+# ----------------------------
+result_cache = ResultCache(
+    max_entries=CACHE_SIZE,
+    ttl_seconds=CACHE_TTL_SECONDS,
+    directory=CACHE_DIR,
+    max_disk_entries=CACHE_DISK_ENTRIES
+) if CACHE_SIZE > 0 else None
+
+# ----------------------------
+# Validation Sessions
+# ----------------------------
+validation_sessions = ValidationSessions(
+    max_entries=VALIDATION_SESSIONS,
+    ttl_seconds=VALIDATION_SESSION_TTL,
+    directory=VALIDATION_SESSION_DIR
+)
+
+# ----------------------------
+# Background Jobs
+# ----------------------------
+def record_job(job):
+    """Metrics for a job finished by a worker"""
+    elapsed = (job.finished_at or time.time()) - (job.started_at or job.created_at)
+    record_result("jobs", job.result or {"status": job.status}, elapsed)
+
+
+job_manager = JobManager(
+    max_workers=MAX_CONCURRENT_JOBS,
+    retention_seconds=JOB_RETENTION_SECONDS,
+    cache=result_cache,
+    on_finish=record_job,
+    directory=JOB_DIR
+)
+
+
+# ----------------------------
+# Metrics
+# ----------------------------
+def collect_metrics():
+    """Cache, template and job counts, read when metrics are rendered or shared"""
+    if result_cache is not None:
+        for event, count in result_cache.stats().items():
+            if event not in ("entries", "diskEnabled"):
+                METRICS.set("scheduler_cache_events_total", count, event=event)
+    for event, count in TEMPLATES.stats().items():
+        if event != "entries":
+            METRICS.set("scheduler_template_events_total", count, event=event)
+    for state, count in job_manager.stats()["jobs"].items():
+        METRICS.set("scheduler_jobs", count, state=state)
+
+
+METRICS.collect(collect_metrics)
+if METRICS_DIR:
+    METRICS.share(METRICS_DIR)
+
+
+@app.after_request
+def share_metrics(response):
+    """Publish this process's metrics for /metrics served by the others"""
+    if request.path != "/metrics":
+        METRICS.flush()
+    return response
+
+
+# ----------------------------
+# Helpers
+# ----------------------------
+def log_request(endpoint, data):
+    """Summarize the request and hand its raw body to the request log"""
+    return request_log.capture(endpoint, data, raw=request.get_data(cache=True))
+
+
+def schedule_payload_error(data):
+    """Return an error message if the schedule payload is unusable, else None"""
+    for field in ["classes", "teachers", "subjects"]:
+        if field not in data:
+            return f"Missing required field: {field}"
+    try:
+        resolve_config(data.get("solverOptions"))
+    except ValueError as e:
+        return f"Invalid solverOptions: {str(e)}"
+    try:
+        resolve_objective(data.get("objective"))
+    except ValueError as e:
+        return f"Invalid objective: {str(e)}"
+    return None
+
+
+def timetable_response(body, status_code=200):
+    """JSON by default; the columnar (msgpack, gzip) encoding when Accept asks for it"""
+    media_type = negotiate(request.accept_mimetypes)
+    if media_type == JSON:
+        return jsonify(body), status_code
+    payload, headers = encode_body(body, media_type, "gzip" in request.accept_encodings)
+    return Response(payload, status=status_code, headers=headers)
+
+
+def cached_solve_schedule(data):
+    """Solve a payload, serving identical earlier payloads from the result cache"""
+    # Imported on first solve, so light endpoints never load OR-tools
+    from decomposition import solve_schedule
+
+    if result_cache is None:
+        return solve_schedule(data)
+
+    key = payload_key(data)
+    cached = result_cache.get(key)
+    if cached is not None:
+        logger.info("Serving schedule from cache")
+        cached["statistics"]["cache"] = {"hit": True}
+        return cached
+
+    result = solve_schedule(data)
+    result_cache.put(key, result)
+    return result
+
+
+def schedule_response(result):
+    """Build the /schedule response body and status code from a solver result"""
+    if result["status"] in ["optimal", "feasible"]:
+        return {
+            "status": "success",
+            "message": result["message"],
+            "timetable": result["schedule"],
+            "statistics": result["statistics"]
+        }, 200
+    return {
+        "status": "error",
+        "message": result["message"],
+        "statistics": result.get("statistics", {})
+    }, 400
+
 
 # ----------------------------
 # Routes
@@ -38,10 +229,19 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "service": "timetable-scheduler",
-        "timestamp": datetime.now().isoformat()
+        "timestamp": datetime.now().isoformat(),
+        "jobs": job_manager.stats(),
+        "cache": result_cache.stats() if result_cache is not None else None,
+        "modelTemplates": TEMPLATES.stats()
     })
 
 
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus text-format metrics: requests, phase timings, solver, caches and jobs"""
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
+
+
 @app.route("/schedule", methods=["POST"])
 def generate_schedule():
     """Generate timetable using optimizer"""
@@ -50,43 +250,23 @@ def generate_schedule():
         if not data:
             return jsonify({"error": "No data provided"}), 400
 
-
-        # 👇 Add this for debugging
-        logger.info("Payload received from Node: %s", data)
-
-        # Or pretty-print JSON
-        import json
-        print("=== Raw Payload from Node ===")
-        print(json.dumps(data, indent=2))
-        print("============================")
-
-
-        logger.info("Received schedule generation request")
+        log_request("schedule", data)
 
         # Validate required fields
-        required_fields = ["classes", "teachers", "subjects"]
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Missing required field: {field}"}), 400
+        error = schedule_payload_error(data)
+        if error:
+            return jsonify({"error": error}), 400
 
-        scheduler = TimetableScheduler(data)
-        result = scheduler.generate_schedule()
+        start_time = time.time()
+        result = cached_solve_schedule(data)
+        record_result("schedule", result, time.time() - start_time)
 
-        if result["status"] in ["optimal", "feasible"]:
+        body, status_code = schedule_response(result)
+        if status_code == 200:
             logger.info("Schedule generated successfully")
-            return jsonify({
-                "status": "success",
-                "message": result["message"],
-                "timetable": result["schedule"],
-                "statistics": result["statistics"]
-            })
         else:
             logger.warning("Failed to generate feasible schedule")
-            return jsonify({
-                "status": "error",
-                "message": result["message"],
-                "statistics": result.get("statistics", {})
-            }), 400
+        return timetable_response(body, status_code)
 
     except Exception as e:
         logger.exception("Unhandled exception in /schedule")
@@ -96,24 +276,246 @@ def generate_schedule():
         }), 500
 
 
+@app.route("/reschedule", methods=["POST"])
+def reschedule_timetable():
+    """Repair a previously published timetable after a change"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "No data provided"}), 400
+
+        error = schedule_payload_error(data)
+        if error:
+            return jsonify({"error": error}), 400
+        if "previousTimetable" not in data:
+            return jsonify({"error": "Missing required field: previousTimetable"}), 400
+
+        log_request("reschedule", data)
+        from reschedule import reschedule
+
+        start_time = time.time()
+        result = reschedule(data)
+        record_result("reschedule", result, time.time() - start_time)
+
+        body, status_code = schedule_response(result)
+        return timetable_response(body, status_code)
+
+    except Exception as e:
+        logger.exception("Unhandled exception in /reschedule")
+        return jsonify({
+            "status": "error",
+            "message": f"Internal server error: {str(e)}"
+        }), 500
+
+
+@app.route("/scenarios", methods=["POST"])
+def compare_scenarios():
+    """Compare what-if variants of a payload against its base timetable
+
+    The body is a /schedule payload plus "scenarios": [{"name", "delta"}].
+    The base is solved once and each scenario repairs its timetable; the
+    response holds the base and, per scenario, feasibility, objective
+    (and its change against the base) and the slots that moved.
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "No data provided"}), 400
+
+        error = schedule_payload_error(data)
+        if error:
+            return jsonify({"error": error}), 400
+        scenarios = data.get("scenarios")
+        if not isinstance(scenarios, list) or not scenarios:
+            return jsonify({"error": "Missing required field: scenarios"}), 400
+        if len(scenarios) > MAX_SCENARIOS:
+            return jsonify({"error": f"At most {MAX_SCENARIOS} scenarios per request"}), 400
+
+        log_request("scenarios", data)
+        from scenarios import solve_scenarios
+
+        start_time = time.time()
+        try:
+            result = solve_scenarios(data)
+        except ValueError as e:
+            return jsonify({"error": f"Invalid scenario: {str(e)}"}), 400
+        record_result("scenarios", result, time.time() - start_time)
+
+        solved = result["base"]["feasible"]
+        return jsonify({
+            "status": "success" if solved else "error",
+            "message": result["message"],
+            "base": result["base"],
+            "scenarios": result["scenarios"],
+            "statistics": result["statistics"]
+        }), 200 if solved else 400
+
+    except Exception as e:
+        logger.exception("Unhandled exception in /scenarios")
+        return jsonify({
+            "status": "error",
+            "message": f"Internal server error: {str(e)}"
+        }), 500
+
+
+@app.route("/schedule/stream", methods=["POST"])
+def stream_schedule():
+    """Stream each improved solution as NDJSON (or server-sent events)
+
+    Every line is an event: "solution" for each improved timetable found
+    during the search and a final "result" with the /schedule response body.
+    Closing the connection stops the search.
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+
+    error = schedule_payload_error(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    log_request("schedule/stream", data)
+    use_sse = "text/event-stream" in request.headers.get("Accept", "")
+    from optimizer import TimetableScheduler
+
+    scheduler = TimetableScheduler(data)
+    events = queue.Queue()
+
+    def on_solution(solution):
+        events.put(("solution", solution))
+        return not scheduler.stop_requested.is_set()
+
+    def solve():
+        try:
+            start_time = time.time()
+            result = scheduler.generate_schedule(on_solution=on_solution)
+            record_result("stream", result, time.time() - start_time)
+            body, _ = schedule_response(result)
+            events.put(("result", body))
+        except Exception as e:
+            logger.exception("Unhandled exception in /schedule/stream")
+            events.put(("result", {"status": "error", "message": f"Internal server error: {str(e)}"}))
+
+    def encode(event, payload):
+        if use_sse:
+            return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        return json.dumps({"event": event, **payload}) + "\n"
+
+    def generate():
+        thread = threading.Thread(target=solve, daemon=True)
+        thread.start()
+        try:
+            while True:
+                event, payload = events.get()
+                yield encode(event, payload)
+                if event == "result":
+                    break
+        finally:
+            # Client went away or stream finished: stop any running search
+            scheduler.stop_search()
+
+    mimetype = "text/event-stream" if use_sse else "application/x-ndjson"
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+
+@app.route("/jobs", methods=["POST"])
+def submit_schedule_job():
+    """Queue a schedule generation job and return its ID immediately"""
+    data = request.get_json()
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+
+    error = schedule_payload_error(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    log_request("jobs", data)
+    job = job_manager.submit(data)
+    return jsonify(job.to_dict()), 202
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_schedule_job(job_id):
+    """Return job status, progress and, once completed, the schedule result"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    body = job.to_dict()
+    if job.status == COMPLETED:
+        body["result"], _ = schedule_response(job.result)
+    return timetable_response(body)
+
+
+@app.route("/jobs/<job_id>", methods=["DELETE"])
+def cancel_schedule_job(job_id):
+    """Cancel a queued or running job"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+
 @app.route("/validate", methods=["POST"])
 def validate_schedule():
-    """Validate timetable for conflicts (teacher/class double booking)"""
+    """Validate a timetable, or candidate edits to it, against the hard constraints
+
+    With classes/teachers/subjects (and optionally rooms, fixedSlots,
+    objective, solverOptions, checkHours) in the body every hard rule the
+    optimizer enforces is checked; with only a timetable, double bookings.
+    "move" checks one edit and "edits" a batch of candidates against the
+    timetable. "session": true keeps the indexed timetable so later calls
+    send "sessionId" instead, and "apply": true commits a move to it.
+    """
     try:
+        start_time = time.perf_counter()
         data = request.get_json()
-        if not data or "timetable" not in data:
+        if not data or ("timetable" not in data and "sessionId" not in data):
             return jsonify({"error": "Timetable data required"}), 400
 
-        scheduler = TimetableScheduler({
-            "classes": [], "teachers": [], "subjects": []
-        })
-        conflicts = scheduler.validate_timetable(data["timetable"])
+        if "sessionId" in data:
+            session_id = data["sessionId"]
+            session = validation_sessions.get(session_id)
+            if session is None:
+                return jsonify({"error": "Validation session not found"}), 404
+        else:
+            try:
+                validator = TimetableValidator(data)
+            except ValueError as e:
+                return jsonify({"error": f"Invalid validation options: {str(e)}"}), 400
+            state = validator.index(data["timetable"])
+            if data.get("session"):
+                session_id = validation_sessions.create(validator, state, data)
+                session = validation_sessions.get(session_id)
+            else:
+                session_id = None
+                session = {"validator": validator, "state": state, "lock": threading.Lock()}
 
-        return jsonify({
-            "valid": len(conflicts) == 0,
-            "conflicts": conflicts,
-            "message": "Validation completed" if len(conflicts) == 0 else "Conflicts found"
-        })
+        try:
+            # A shared session is brought up to date when its lock is taken
+            with session["lock"]:
+                validator, state = session["validator"], session["state"]
+                if "move" in data:
+                    body = validator.check_edit(state, data["move"], commit=bool(data.get("apply")))
+                    if data.get("apply") and session_id is not None:
+                        validation_sessions.save(session_id, session)
+                elif "edits" in data:
+                    body = {"results": [validator.check_edit(state, edit) for edit in data["edits"]]}
+                else:
+                    conflicts = validator.validate(state)
+                    errors = [c for c in conflicts if c["severity"] == "error"]
+                    body = {
+                        "valid": len(errors) == 0,
+                        "conflicts": conflicts,
+                        "message": "Validation completed" if len(conflicts) == 0 else "Conflicts found"
+                    }
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if session_id is not None:
+            body["sessionId"] = session_id
+        body["elapsedMs"] = round((time.perf_counter() - start_time) * 1000, 3)
+        return jsonify(body)
 
     except Exception as e:
         logger.exception("Error validating timetable")
@@ -123,6 +525,14 @@ def validate_schedule():
         }), 500
 
 
+@app.route("/validate/<session_id>", methods=["DELETE"])
+def close_validation_session(session_id):
+    """Drop an indexed timetable kept for incremental validation"""
+    if not validation_sessions.delete(session_id):
+        return jsonify({"error": "Validation session not found"}), 404
+    return jsonify({"sessionId": session_id, "closed": True})
+
+
 @app.route("/optimize", methods=["POST"])
 def optimize_schedule():
     """Optimize an existing timetable"""
@@ -131,10 +541,9 @@ def optimize_schedule():
         if not data or "timetable" not in data:
             return jsonify({"error": "Timetable data required"}), 400
 
-        scheduler = TimetableScheduler({
-            "classes": [], "teachers": [], "subjects": []
-        })
-        optimized = scheduler.optimize_existing(data["timetable"])
+        # Ordering only: no solver (or OR-tools import) needed
+        days = resolve_config(data.get("solverOptions"))["days"]
+        optimized = sorted(data["timetable"], key=lambda x: (days.index(x['day']), x['period']))
 
         return jsonify({
             "optimizedTimetable": optimized,
@@ -164,6 +573,8 @@ def method_not_allowed(error):
 # ----------------------------
 # Run Flask App
 # ----------------------------
+# Development server, one process. In production serve with pre-forked
+# workers: gunicorn -c gunicorn.conf.py main:app
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
     host = os.environ.get("HOST", "0.0.0.0")
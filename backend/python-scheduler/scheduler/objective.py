@@ -0,0 +1,191 @@
+# objective.py
+from collections import defaultdict
+
+# Teacher rules that may be switched between hard constraints and weighted
+# penalties, with their default classification
+RULES = {
+    "teacherDailyLimit": "hard",
+    "teacherWeeklyLimit": "hard",
+    "teacherUnavailable": "hard",
+    "teacherNoConsecutive": "hard",
+}
+
+# Penalty weights; a weight of 0 leaves the goal out of the model entirely
+DEFAULT_WEIGHTS = {
+    # Soft goals
+    "preferredSlots": 3,
+    "classGaps": 2,
+    "teacherGaps": 1,
+    "classBalance": 1,
+    "teacherBalance": 0,
+    # Applied only when the matching rule is soft
+    "teacherDailyLimit": 10,
+    "teacherWeeklyLimit": 10,
+    "teacherUnavailable": 20,
+    "teacherNoConsecutive": 5,
+    # Slots changed against a previous timetable (rescheduling)
+    "changes": 10,
+}
+
+
+def resolve_objective(options=None):
+    """Validate the request's "objective" block and fill in defaults
+
+    Raises:
+        ValueError: If a rule or weight is unknown or invalid
+    """
+    options = options or {}
+    rules = dict(RULES)
+    weights = dict(DEFAULT_WEIGHTS)
+
+    for rule, kind in (options.get("rules") or {}).items():
+        if rule not in RULES:
+            raise ValueError(f"Unknown rule: {rule}")
+        if kind not in ("hard", "soft"):
+            raise ValueError(f"Rule {rule} must be 'hard' or 'soft'")
+        rules[rule] = kind
+
+    for name, weight in (options.get("weights") or {}).items():
+        if name not in DEFAULT_WEIGHTS:
+            raise ValueError(f"Unknown objective weight: {name}")
+        if not isinstance(weight, (int, float)) or isinstance(weight, bool) or weight < 0:
+            raise ValueError(f"Weight {name} must be a non-negative number")
+        # CP-SAT objectives need integer coefficients
+        weights[name] = int(round(weight))
+
+    return {"rules": rules, "weights": weights}
+
+
+def _busy_literals(scheduler, slots, prefix):
+    """One 0/1 variable per (entity, day, period) equal to the occupancy sum"""
+    busy = {}
+    for key, literals in slots.items():
+        if len(literals) == 1:
+            busy[key] = literals[0]
+        else:
+            var = scheduler.model.NewBoolVar(f"{prefix}_busy_{'_'.join(str(k) for k in key)}")
+            scheduler.model.Add(var == sum(literals))
+            busy[key] = var
+    return busy
+
+
+def _add_gap_penalties(scheduler, busy, entities, group, allowed_break=0):
+    """Idle holes inside each entity-day, counted as lesson blocks beyond the first
+
+    A block starts wherever busy[p] - busy[p-1] is positive, so
+    holes = starts - used, used meaning the day has a lesson. All
+    constraints are plain linear inequalities, which keeps the LP
+    relaxation strong; first/last-period variables with reified bounds
+    stalled the search on realistic payloads. Starts and used are bounded
+    from both sides, so the penalty is exact for any solution, not only an
+    optimal one. Holes of up to allowed_break periods are not counted: a
+    block then only starts after that many idle periods plus one.
+    """
+    num_periods = len(scheduler.periods)
+    for entity in entities:
+        for day_idx in range(len(scheduler.days)):
+            day_busy = [busy.get((entity, day_idx, p), 0) for p in range(num_periods)]
+            lessons = [var for var in day_busy if not isinstance(var, int)]
+            if len(lessons) < 2:
+                continue
+            starts = []
+            for period_idx in range(num_periods):
+                previous = day_busy[max(0, period_idx - allowed_break - 1):period_idx]
+                if isinstance(day_busy[period_idx], int):
+                    continue
+                start = scheduler.model.NewBoolVar(f"{group}_start_{entity}_{day_idx}_{period_idx}")
+                scheduler.model.Add(start >= day_busy[period_idx] - sum(previous))
+                scheduler.model.Add(start <= day_busy[period_idx])
+                for before in previous:
+                    if not isinstance(before, int):
+                        scheduler.model.Add(start <= 1 - before)
+                starts.append(start)
+            used = scheduler.model.NewBoolVar(f"{group}_used_{entity}_{day_idx}")
+            scheduler.model.Add(used <= sum(lessons))
+            for lesson in lessons:
+                scheduler.model.Add(used >= lesson)
+            scheduler.add_penalty(group, sum(starts) - used)
+
+
+def _add_balance_penalties(scheduler, busy, entities, group):
+    """Spread between the busiest and the lightest day of each entity"""
+    num_periods = len(scheduler.periods)
+    for entity in entities:
+        loads = []
+        for day_idx in range(len(scheduler.days)):
+            day_busy = [busy[(entity, day_idx, p)] for p in range(num_periods) if (entity, day_idx, p) in busy]
+            if day_busy:
+                loads.append(sum(day_busy))
+        if len(loads) < 2:
+            continue
+        high = scheduler.model.NewIntVar(0, num_periods, f"{group}_max_{entity}")
+        low = scheduler.model.NewIntVar(0, num_periods, f"{group}_min_{entity}")
+        for load in loads:
+            scheduler.model.Add(high >= load)
+            scheduler.model.Add(low <= load)
+        scheduler.add_penalty(group, high - low)
+
+
+def add_preferred_slot_penalties(scheduler, teacher_slots):
+    """Penalize teaching outside a teacher's preferred slots"""
+    if not scheduler.objective['weights']["preferredSlots"]:
+        return
+    for teacher in scheduler.data.get('teachers', []):
+        preferred = {
+            (scheduler._day_index(slot['day']), slot['period'] - 1)
+            for slot in teacher.get('preferredSlots', [])
+        }
+        if not preferred:
+            continue
+        teacher_idx = scheduler.teacher_to_index[teacher['id']]
+        for day_idx in range(len(scheduler.days)):
+            for period_idx in range(len(scheduler.periods)):
+                if (day_idx, period_idx) not in preferred:
+                    for literal in teacher_slots.get((teacher_idx, day_idx, period_idx), []):
+                        scheduler.add_penalty("preferredSlots", literal)
+
+
+def add_soft_goals(scheduler, is_sub, teacher_slots):
+    """Add penalty terms for the gap and balance goals with a positive weight
+
+    These depend only on the payload structure; preferred slots are added
+    per request by add_preferred_slot_penalties.
+    """
+    weights = scheduler.objective['weights']
+
+    need_class_busy = weights["classGaps"] or weights["classBalance"]
+    need_teacher_busy = weights["teacherGaps"] or weights["teacherBalance"]
+
+    if need_class_busy:
+        class_slots = defaultdict(list)
+        for (class_idx, day_idx, period_idx, _), var in is_sub.items():
+            class_slots[(class_idx, day_idx, period_idx)].append(var)
+        class_busy = _busy_literals(scheduler, class_slots, "class")
+        class_entities = range(len(scheduler.class_ids))
+        if weights["classGaps"]:
+            _add_gap_penalties(scheduler, class_busy, class_entities, "classGaps")
+        if weights["classBalance"]:
+            _add_balance_penalties(scheduler, class_busy, class_entities, "classBalance")
+
+    if need_teacher_busy:
+        teacher_busy = _busy_literals(scheduler, teacher_slots, "teacher")
+        teacher_entities = range(len(scheduler.teacher_ids))
+        if weights["teacherGaps"]:
+            # With back-to-back lessons forbidden, the one-period break between
+            # two lessons is required, not a gap
+            allowed_break = 1 if scheduler._rule_is_hard("teacherNoConsecutive") else 0
+            _add_gap_penalties(scheduler, teacher_busy, teacher_entities, "teacherGaps", allowed_break)
+        if weights["teacherBalance"]:
+            _add_balance_penalties(scheduler, teacher_busy, teacher_entities, "teacherBalance")
+
+
+def penalty_breakdown(scheduler, solver):
+    """Per-group penalty, weight and weighted contribution after a solve"""
+    terms = {}
+    total = 0
+    for group, expressions in scheduler.penalties.items():
+        weight = scheduler.objective['weights'][group]
+        penalty = int(sum(solver.Value(expr) for expr in expressions))
+        terms[group] = {"weight": weight, "penalty": penalty, "weighted": weight * penalty}
+        total += weight * penalty
+    return {"total": total, "rules": scheduler.objective['rules'], "terms": terms}
@@ -1,16 +1,75 @@
 from ortools.sat.python import cp_model
 from collections import defaultdict
+import threading
 import time
 
+from feasibility import analyze_payload, explain_infeasibility
+from instrumentation import PhaseTimer, RequestProfile, merge_instrumentation, solver_run_stats
+from objective import resolve_objective, add_preferred_slot_penalties, add_soft_goals, penalty_breakdown
+from rooms import assign_rooms, capacity_thresholds, room_capacity, room_type, rooms_by_type, student_count
+from solver_config import ALL_DAYS, resolve_config, apply_to_solver
+from strengthening import add_model_strengthening
+from templates import TEMPLATES, ModelTemplate, structure_key
+from timetable_array import TimetableArray, response_values, solution_variables
+
+# An auto-mode room retry is not started with less time than this left
+MIN_RETRY_SECONDS = 0.1
+
+
+class ScheduleSolutionCallback(cp_model.CpSolverSolutionCallback):
+    """Report every improved solution found during the search"""
+
+    def __init__(self, scheduler, timetable, on_solution, start_time):
+        super().__init__()
+        self.scheduler = scheduler
+        self.timetable = timetable
+        self.on_solution = on_solution
+        self.start_time = start_time
+        self.solution_count = 0
+        self.best_objective = None
+
+    def on_solution_callback(self):
+        # A later phase starts again from the reported timetable; only
+        # solutions that improve on it are streamed
+        objective = self.ObjectiveValue()
+        if self.best_objective is not None and objective >= self.best_objective:
+            return
+        if self._emit(self, objective, self.BestObjectiveBound()) is False:
+            self.StopSearch()
+
+    def report(self, solver, objective):
+        """Report the solution of a search that ran without this callback
+
+        The bound is unknown there and sent as None. Returns False when
+        on_solution asks to stop.
+        """
+        return self._emit(solver, objective, None)
+
+    def _emit(self, values, objective, bound):
+        self.solution_count += 1
+        self.best_objective = objective
+        return self.on_solution({
+            "solutionIndex": self.solution_count,
+            "objective": objective,
+            "bestBound": bound,
+            "wallTime": round(time.time() - self.start_time, 3),
+            "schedule": self.scheduler._extract_solution(values, self.timetable)
+        })
+
 
 class TimetableScheduler:
-    def __init__(self, data):
+    def __init__(self, data, sparse=True, config=None):
+        parse_start = time.perf_counter()
         self.data = data
         self.model = cp_model.CpModel()
-        
+        self.sparse = sparse
+
+        # Solver settings: defaults < SCHED_* env < per-request solverOptions
+        self.config = config or resolve_config(data.get('solverOptions'))
+
         # Basic parameters
-        self.days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
-        self.periods = list(range(1, 7))  # 6 periods: 1-6
+        self.days = list(self.config['days'])
+        self.periods = list(range(1, self.config['periods'] + 1))
         
         # Lookup dictionaries
         self.teachers_dict = {t['id']: t for t in data.get('teachers', [])}
@@ -31,84 +90,593 @@ class TimetableScheduler:
         # Lab subjects
         self.lab_subjects = set()
         for subject in data.get('subjects', []):
-            if subject.get('isLab', False):
+            if subject.get('isLab', False) or subject.get('type') == 'lab':
                 self.lab_subjects.add(self.subject_to_index[subject['id']])
 
-    def generate_schedule(self):
-        """Generate timetable using the proven CP-SAT approach"""
+        # Assignment index: class -> subject -> teacher, and the inverse
+        # teacher -> [(class, subject)], built once from the payload
+        self.subject_teacher, self.teacher_classes = self._build_assignment_index()
+
+        # Per-class subject domains: only subjects a class takes (or is fixed to)
+        # get is_sub variables in sparse mode; dense mode keeps every subject.
+        self.class_subjects = self._build_class_subjects()
+
+        # Rooms; in model mode per-period room capacity is a solver constraint
+        self.rooms = data.get('rooms') or []
+        self.room_constraints = bool(self.rooms) and self.config['roomAssignment'] == 'model'
+
+        # Model size report, filled in while building the model, and the
+        # symmetry-breaking / redundant constraint counts when strengthening
+        self.model_stats = {}
+        self.strengthening = None
+
+        # Whether the structural model came from a cached template ("hit")
+        # or was built and stored as one ("stored"); None when not cached
+        self.template = None
+
+        # (class, day, period, subject) coordinates and model indices of the
+        # subject variables, so solutions are read from the response vector
+        self.solution_variables = None
+
+        # Warm start: previous (class, day, period) -> subject assignment,
+        # classes pinned to it and whether to minimize changes against it
+        self.previous_assignment = {}
+        self.frozen_classes = set()
+        self.minimize_changes = False
+        self.previous_complete = False
+
+        # Hard/soft rule classification and penalty weights, plus the
+        # penalty expressions collected per group while building the model
+        self.objective = resolve_objective(data.get('objective'))
+        self.penalties = defaultdict(list)
+
+        # Explain mode: every named constraint group is guarded by an
+        # assumption literal so an infeasible core can be extracted
+        self.explain = False
+        self.assumptions = {}
+
+        # Pre-solve analysis findings
+        self.feasibility_issues = []
+
+        # Wall-clock time the first feasible timetable was found
+        self.first_solution_at = None
+
+        # Active solver, so a search can be stopped from another thread
+        self.solver = None
+        self.stop_requested = threading.Event()
+
+        # Per-phase timings, model size per constraint family, CP-SAT
+        # statistics per search and the opt-in request profile
+        self.timer = PhaseTimer(self.model)
+        self.timer.phases["parse"] = time.perf_counter() - parse_start
+        self.solver_runs = []
+        self.profile = RequestProfile(data.get('profile'))
+
+    def _build_assignment_index(self):
+        """Index which teacher takes each (class, subject) and vice versa"""
+        subject_teacher = {}
+        teacher_classes = defaultdict(list)
+
+        for class_id in self.class_ids:
+            assignments = subject_teacher.setdefault(class_id, {})
+            for subject_info in self.classes_dict[class_id].get('subjects', []):
+                subject_id = subject_info['subjectId']
+                if subject_id in assignments:
+                    # The first listed teacher wins, as before
+                    continue
+                teacher_id = subject_info['teacherId']
+                assignments[subject_id] = teacher_id
+                teacher_classes[teacher_id].append((class_id, subject_id))
+
+        return subject_teacher, teacher_classes
+
+    def _build_class_subjects(self):
+        """Build the subject index domain for each class index"""
+        if not self.sparse:
+            all_subjects = list(range(len(self.subject_ids)))
+            return {class_idx: all_subjects for class_idx in range(len(self.class_ids))}
+
+        domains = defaultdict(set)
+        for class_idx, class_id in enumerate(self.class_ids):
+            for subject_id in self.subject_teacher[class_id]:
+                if subject_id in self.subject_to_index:
+                    domains[class_idx].add(self.subject_to_index[subject_id])
+
+        for slot in self.data.get('fixedSlots', []):
+            if slot.get('subjectId') in self.subject_to_index and slot['classId'] in self.class_to_index:
+                domains[self.class_to_index[slot['classId']]].add(self.subject_to_index[slot['subjectId']])
+
+        return {class_idx: sorted(domains[class_idx]) for class_idx in range(len(self.class_ids))}
+
+    def generate_schedule(self, on_solution=None):
+        """Generate timetable using the proven CP-SAT approach
+
+        If on_solution is given it is called with every improved solution
+        (objective, wall time and extracted schedule); returning False from
+        it stops the search early and keeps the best solution so far.
+        """
         start_time = time.time()
+        self.profile.start()
+        try:
+            result = self._generate(on_solution, start_time)
+        finally:
+            if self.profile.enabled:
+                profile_summary = self.profile.finish()
+        self._add_instrumentation(result['statistics'], start_time)
+        if self.profile.enabled:
+            result['statistics']['profile'] = profile_summary
+        return result
+
+    def _generate(self, on_solution, start_time):
+        rejected = self._analyze(start_time)
+        if rejected:
+            return rejected
 
         # Create main variables and constraints
-        timetable, is_teacher = self._create_variables_and_constraints()
-        
-        # Solve model
-        solver = cp_model.CpSolver()
-        solver.parameters.max_time_in_seconds = 30.0
-        solver.parameters.num_search_workers = 8
+        timetable, teacher_slots = self._create_variables_and_constraints()
+        self._record_model_stats(timetable, time.time() - start_time)
 
-        status = solver.Solve(self.model)
+        callback = None
+        if on_solution is not None:
+            callback = ScheduleSolutionCallback(self, timetable, on_solution, start_time)
+        status, solver = self._solve(callback)
         end_time = time.time()
 
         if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
-            schedule = self._extract_solution(solver, timetable)
-            return {
+            with self.timer.phase("extract"):
+                solution = self._solution_array(solver, timetable)
+                schedule = solution.to_items()
+            with self.timer.phase("statistics"):
+                statistics = self._generate_statistics(solver, schedule, end_time - start_time, solution)
+                statistics["feasibility"] = {"issues": self.feasibility_issues}
+                statistics["objective"] = penalty_breakdown(self, solver)
+                statistics["timeToFirstSolution"] = round(self.first_solution_at - start_time, 3)
+            return self.with_rooms({
                 "message": "Schedule generated successfully",
                 "schedule": schedule,
-                "statistics": self._generate_statistics(solver, schedule, end_time - start_time),
+                "statistics": statistics,
                 "status": "optimal" if status == cp_model.OPTIMAL else "feasible"
-            }
+            }, start_time, on_solution)
         else:
+            statistics = {
+                "solveTime": end_time - start_time,
+                "model": self.model_stats,
+                "solverConfig": self.config,
+                "feasibility": {"issues": self.feasibility_issues}
+            }
+            message = "Failed to generate feasible schedule"
+            if status == cp_model.INFEASIBLE and not self.stop_requested.is_set():
+                with self.timer.phase("explain"):
+                    conflicts = explain_infeasibility(self)
+                if conflicts:
+                    statistics["feasibility"]["conflictingConstraints"] = conflicts
+                    message = "Constraints conflict: " + "; ".join(c["message"] for c in conflicts)
             return {
-                "message": "Failed to generate feasible schedule",
+                "message": message,
                 "schedule": [],
-                "statistics": {"solveTime": end_time - start_time},
+                "statistics": statistics,
                 "status": "infeasible"
             }
 
+    def _analyze(self, start_time):
+        """Cheap counting checks before any model is built
+
+        Returns the infeasible result for input that cannot be scheduled,
+        None otherwise.
+        """
+        with self.timer.phase("analyze"):
+            self.feasibility_issues = analyze_payload(self)
+        errors = [issue for issue in self.feasibility_issues if issue['severity'] == 'error']
+        if not errors:
+            return None
+        return {
+            "message": f"Input is infeasible: {errors[0]['message']}",
+            "schedule": [],
+            "statistics": {
+                "solveTime": time.time() - start_time,
+                "solverConfig": self.config,
+                "feasibility": {"issues": self.feasibility_issues}
+            },
+            "status": "infeasible"
+        }
+
+    def _add_instrumentation(self, statistics, start_time):
+        """Numeric timings, model size per family and CP-SAT search statistics"""
+        instrumentation = dict(self.timer.to_dict(), solverRuns=self.solver_runs)
+        if "phases" in statistics:
+            # Result of a nested solve (auto room mode retry): count both
+            instrumentation = merge_instrumentation([instrumentation, statistics])
+        statistics.update(instrumentation)
+        statistics["solveSeconds"] = round(time.time() - start_time, 4)
+
+    def _solve(self, callback=None):
+        """Solve the model, returning (status, solver)
+
+        With soft goals the search runs in two phases: a pure feasibility
+        solve, whose complete solution then hints the weighted objective
+        solve for the rest of the time limit. Searching the objective from
+        scratch often fails to find any timetable at all on large payloads.
+        The feasibility solution is streamed to the callback as soon as it
+        is found. If the objective phase ends without a solution it is
+        kept. A complete warm start replaces the feasibility
+        search when the model accepts it; its solution then already has the
+        objective minimized around the timetable, hints the objective phase
+        without keeping dominated values (which stops OR-tools 9.7 from
+        following a complete hint) and is kept unless the search improves
+        on it.
+
+        The objective phase keeps presolve from dropping dominated values
+        so the hint stays feasible, and runs at least two workers: a single
+        sequential worker in OR-tools 9.7 does not follow the hint.
+        """
+        deadline = time.time() + self.config['timeLimit']
+        if not self.penalties:
+            # Without an objective the search ends at the first solution
+            status, solver, _ = self._run_first("solve", deadline, callback)
+            self.first_solution_at = time.time()
+            return status, solver
+
+        status, solver, from_draft = self._run_first("solveFeasibility", deadline, None)
+        remaining = deadline - time.time()
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            return status, solver
+        self.first_solution_at = time.time()
+        # The first timetable is streamed now, not only once the objective
+        # phase improves on it
+        if callback is not None and callback.report(solver, solver.Value(self._objective_expression())) is False:
+            return cp_model.FEASIBLE, solver
+        if remaining <= 0 or self.stop_requested.is_set():
+            return cp_model.FEASIBLE, solver
+
+        # Hint every variable with the feasible solution, then optimize
+        proto = self.model.Proto()
+        proto.ClearField('solution_hint')
+        proto.solution_hint.vars.extend(range(len(proto.variables)))
+        proto.solution_hint.values.extend(solver.ResponseProto().solution)
+        self.model.Minimize(self._objective_expression())
+
+        improved_status, improved = self._run_solver(
+            "solveObjective", remaining, callback, num_workers=max(2, self.config['numWorkers']), keep_hint=not from_draft
+        )
+        if improved_status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            if not (from_draft and improved.ObjectiveValue() > solver.ObjectiveValue()):
+                return improved_status, improved
+        return cp_model.FEASIBLE, solver
+
+    def _run_first(self, phase, deadline, callback):
+        """First search, starting from a complete warm start if there is one
+
+        Returns (status, solver, from_draft), from_draft telling whether
+        the solution is the warm start's.
+        """
+        if self.previous_complete:
+            status, solver = self._run_solver(
+                "solveFromDraft", deadline - time.time(), callback, model=self._hinted_model()
+            )
+            if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                return status, solver, True
+            # The model rejects the warm start timetable: search from scratch
+        status, solver = self._run_solver(phase, max(0.0, deadline - time.time()), callback)
+        return status, solver, False
+
+    def _hinted_model(self):
+        """Copy of the model with every hinted variable fixed to its hint
+
+        With soft goals the copy minimizes the objective, so the penalty
+        variables come out tight and the solution can hint the objective
+        phase as it is.
+        """
+        model = cp_model.CpModel()
+        proto = model.Proto()
+        proto.CopyFrom(self.model.Proto())
+        for index, value in zip(proto.solution_hint.vars, proto.solution_hint.values):
+            proto.variables[index].domain[:] = [value, value]
+        if self.penalties:
+            model.Minimize(self._objective_expression())
+        return model
+
+    def _objective_expression(self):
+        return sum(
+            self.objective['weights'][group] * sum(expressions)
+            for group, expressions in self.penalties.items()
+        )
+
+    def _run_solver(self, phase, time_limit, callback, num_workers=None, keep_hint=False, model=None):
+        """Run one CP-SAT search as a timed phase, returning (status, solver)
+
+        model replaces the scheduler's model for this search; it must have
+        the same variables.
+        """
+        solver = cp_model.CpSolver()
+        apply_to_solver(self.config, solver)
+        self.profile.attach(solver)
+        solver.parameters.max_time_in_seconds = time_limit
+        if num_workers is not None:
+            solver.parameters.num_search_workers = num_workers
+        if keep_hint:
+            solver.parameters.keep_all_feasible_solutions_in_presolve = True
+
+        if self.stop_requested.is_set():
+            return cp_model.UNKNOWN, solver
+        self.solver = solver
+        with self.timer.phase(phase):
+            if callback is not None:
+                status = solver.Solve(model or self.model, callback)
+            else:
+                status = solver.Solve(model or self.model)
+        self.solver = None
+        self.solver_runs.append(solver_run_stats(
+            phase, solver, solver.StatusName(status), self.model.Proto().HasField('objective')
+        ))
+        return status, solver
+
     def _create_variables_and_constraints(self):
-        """Create variables and constraints using the proven approach"""
+        """Create variables and constraints using the proven approach
+
+        The structural part of the model depends only on the classes,
+        subjects, teachers and rules of the payload, so it is cloned from a
+        cached template when an earlier request had the same structure;
+        request-specific constraints are then added on top.
+        """
+        key = None
+        structure = None
+        if TEMPLATES.enabled and not self.explain:
+            key = structure_key(self)
+            template = TEMPLATES.get(key)
+            if template is not None:
+                structure = template.apply(self)
+                self.template = "hit"
+
+        if structure is None:
+            structure = self._add_structure()
+            if key is not None:
+                TEMPLATES.put(key, ModelTemplate.capture(self, *structure))
+                self.template = "stored"
+
+        is_sub, lab_starts, teacher_slots = structure
+        self._add_request_constraints(is_sub, lab_starts, teacher_slots)
+        return is_sub, teacher_slots
+
+    def _add_structure(self):
+        """Variables and constraints fixed by the payload structure
+
+        Returns (is_sub, lab_starts, teacher_slots).
+        """
         num_classes = len(self.class_ids)
         num_days = len(self.days)
         num_periods = len(self.periods)
-        num_subjects = len(self.subject_ids)
         num_teachers = len(self.teacher_ids)
 
         # Main timetable variable: subject index per class/day/period
-        timetable = {}
         is_sub = {}
         
         # Create boolean variables for subject assignments
-        for class_idx in range(num_classes):
-            class_id = self.class_ids[class_idx]
-            for day_idx in range(num_days):
-                for period_idx in range(num_periods):
-                    # Create boolean variables for each possible subject
-                    for subject_idx in range(num_subjects):
-                        is_sub[(class_idx, day_idx, period_idx, subject_idx)] = self.model.NewBoolVar(
-                            f"is_sub_C{class_id}_D{day_idx}_P{period_idx}_S{subject_idx}"
-                        )
-                    # Exactly one subject per slot
-                    self.model.Add(
-                        sum(is_sub[(class_idx, day_idx, period_idx, subject_idx)] 
-                            for subject_idx in range(num_subjects)) == 1
-                    )
-
-        # Add fixed placements constraints
-        self._add_fixed_placements(is_sub)
+        with self.timer.phase("subjectVariables"):
+            self._add_subject_variables(is_sub, num_classes, num_days, num_periods)
 
         # Link subject counts per class
-        self._add_subject_count_constraints(is_sub)
+        with self.timer.phase("subjectCounts"):
+            self._add_subject_count_constraints(is_sub)
+
+        # Add subject sequencing constraints; labs are placed as pairs
+        with self.timer.phase("subjectSequencing"):
+            lab_starts = self._add_subject_sequencing_constraints(is_sub, num_classes, num_days, num_periods)
 
-        # Teacher variables and constraints
-        teacher_var, is_teacher = self._add_teacher_constraints(is_sub, num_classes, num_days, num_periods, num_teachers)
+        # Teacher occupancy per slot and per two-period window
+        with self.timer.phase("teacherOccupancy"):
+            teacher_slots, teacher_windows = self._add_teacher_constraints(
+                is_sub, lab_starts, num_classes, num_days, num_periods, num_teachers
+            )
 
         # Add teacher-specific constraints
-        self._add_teacher_specific_constraints(is_teacher, teacher_var, num_classes, num_days, num_periods, num_teachers)
+        with self.timer.phase("teacherRules"):
+            self._add_teacher_specific_constraints(teacher_slots, teacher_windows, num_days, num_periods, num_teachers)
 
-        # Add subject sequencing constraints
-        self._add_subject_sequencing_constraints(is_sub, num_classes, num_days, num_periods)
+        # Weighted soft goals (gaps, daily balance)
+        if not self.explain:
+            with self.timer.phase("softGoals"):
+                add_soft_goals(self, is_sub, teacher_slots)
 
-        return is_sub, is_teacher
+        return is_sub, lab_starts, teacher_slots
+
+    def _add_request_constraints(self, is_sub, lab_starts, teacher_slots):
+        """Constraints from the request's fixed slots, availability, rooms and history"""
+        # Add fixed placements constraints
+        with self.timer.phase("fixedPlacements"):
+            self._add_fixed_placements(is_sub)
+
+        # Teacher unavailable slots
+        with self.timer.phase("teacherAvailability"):
+            self._add_teacher_availability(teacher_slots)
+
+        # Per-period room capacity (model mode only)
+        if self.room_constraints:
+            with self.timer.phase("roomCapacity"):
+                self._add_room_capacity_constraints(is_sub)
+
+        # Optional symmetry breaking and redundant constraints
+        if self.config['strengthen'] and not self.explain:
+            with self.timer.phase("strengthening"):
+                self.strengthening = add_model_strengthening(self, is_sub, lab_starts, teacher_slots)
+
+        # Teaching outside preferred slots
+        if not self.explain:
+            with self.timer.phase("preferredSlots"):
+                add_preferred_slot_penalties(self, teacher_slots)
+
+        # Hints, pins and change penalties from a previous timetable
+        with self.timer.phase("warmStart"):
+            self._add_warm_start(is_sub)
+
+    def _add_subject_variables(self, is_sub, num_classes, num_days, num_periods):
+        """One BoolVar per (class, day, period, subject in the class domain)"""
+        for class_idx in range(num_classes):
+            class_id = self.class_ids[class_idx]
+            domain = self.class_subjects[class_idx]
+            if not domain:
+                continue
+            for day_idx in range(num_days):
+                for period_idx in range(num_periods):
+                    # Create boolean variables for each subject in the class domain
+                    for subject_idx in domain:
+                        is_sub[(class_idx, day_idx, period_idx, subject_idx)] = self.model.NewBoolVar(
+                            f"is_sub_C{class_id}_D{day_idx}_P{period_idx}_S{subject_idx}"
+                        )
+                    slot_vars = [is_sub[(class_idx, day_idx, period_idx, subject_idx)] for subject_idx in domain]
+                    if self.sparse:
+                        # At most one subject per slot; empty slots are free periods
+                        self.model.AddAtMostOne(slot_vars)
+                    else:
+                        # Exactly one subject per slot
+                        self.model.Add(sum(slot_vars) == 1)
+
+    def _add_room_capacity_constraints(self, is_sub):
+        """Keep every period's lessons within the rooms able to host them
+
+        For each room type and class size threshold, lessons with at least
+        that many students may not outnumber rooms with at least that many
+        seats; together these are Hall's condition, so the room stage can
+        then place every lesson of every period. Lab pairs are not kept in
+        one room by the model: the room stage keeps a pair together only
+        where that still places every lesson.
+        """
+        grouped = rooms_by_type(self.rooms)
+        lessons = defaultdict(list)
+        for (class_idx, day_idx, period_idx, subject_idx), var in is_sub.items():
+            kind = room_type(self, self.subject_ids[subject_idx])
+            size = student_count(self, self.class_ids[class_idx])
+            lessons[(kind, day_idx, period_idx)].append((size, var))
+
+        for kind, thresholds in capacity_thresholds(self).items():
+            capacities = [room_capacity(room) for room in grouped.get(kind, [])]
+            for threshold in thresholds:
+                available = sum(1 for capacity in capacities if capacity >= threshold)
+                for day_idx in range(len(self.days)):
+                    for period_idx in range(len(self.periods)):
+                        literals = [var for size, var in lessons[(kind, day_idx, period_idx)] if size >= threshold]
+                        if len(literals) > available:
+                            self._guarded(self.model.Add(sum(literals) <= available), ("roomCapacity", kind))
+
+    def with_rooms(self, result, start_time, on_solution=None):
+        """Assign rooms to a solved timetable and add the room statistics
+
+        In auto mode a timetable that leaves lessons without a room is
+        solved again with room capacity in the model, within what is left of
+        config["timeLimit"] since start_time; the first result is kept if
+        that fails or no time is left.
+        """
+        if not self.rooms or result['status'] not in ("optimal", "feasible"):
+            return result
+
+        with self.timer.phase("rooms"):
+            room_stats = assign_rooms(self, result['schedule'], self.rooms)
+        room_stats['mode'] = "model" if self.room_constraints else "stage"
+        remaining = self.config['timeLimit'] - (time.time() - start_time)
+        if (room_stats['unassigned'] and self.config['roomAssignment'] == 'auto' and not self.room_constraints
+                and remaining >= MIN_RETRY_SECONDS):
+            retry = type(self)(self.data, sparse=self.sparse,
+                               config=dict(self.config, roomAssignment='model', timeLimit=remaining))
+            retry.previous_assignment = self.previous_assignment
+            retry.frozen_classes = self.frozen_classes
+            retry.minimize_changes = self.minimize_changes
+            retry.previous_complete = self.previous_complete
+            retry.stop_requested = self.stop_requested
+            retried = retry.generate_schedule(on_solution)
+            if retried['status'] in ("optimal", "feasible"):
+                return retried
+
+        result['statistics']['rooms'] = room_stats
+        return result
+
+    def warm_start(self, previous_schedule, frozen_class_ids=(), minimize_changes=False, complete=False):
+        """Start from a previous timetable
+
+        Every is_sub variable is hinted with its previous value, classes in
+        frozen_class_ids keep their previous timetable exactly, and with
+        minimize_changes the objective counts slots that differ from it.
+        With complete the previous timetable is expected to meet every hard
+        rule as it is (a heuristic draft), so the first search only fills in
+        the other variables around it. Entries for unknown classes, days,
+        periods or subjects are ignored.
+        """
+        self.previous_assignment = {}
+        for item in previous_schedule:
+            class_idx = self.class_to_index.get(item.get('classId'))
+            day_idx = self._day_index(item.get('day'))
+            subject_idx = self.subject_to_index.get(item.get('subjectId'))
+            period_idx = item.get('period', 0) - 1
+            if class_idx is None or day_idx is None or subject_idx is None:
+                continue
+            if not 0 <= period_idx < len(self.periods):
+                continue
+            self.previous_assignment[(class_idx, day_idx, period_idx)] = subject_idx
+
+        self.frozen_classes = {self.class_to_index[c] for c in frozen_class_ids if c in self.class_to_index}
+        self.minimize_changes = minimize_changes
+        self.previous_complete = complete
+
+    def _add_warm_start(self, is_sub):
+        """Add solution hints, frozen classes and the change penalty"""
+        if not self.previous_assignment:
+            return
+
+        for (class_idx, day_idx, period_idx, subject_idx), var in is_sub.items():
+            previous = self.previous_assignment.get((class_idx, day_idx, period_idx))
+            value = 1 if previous == subject_idx else 0
+            self.model.AddHint(var, value)
+            if class_idx in self.frozen_classes:
+                self.model.Add(var == value)
+            elif self.minimize_changes and value == 1:
+                # Penalize dropping a previous assignment
+                self.add_penalty("changes", 1 - var)
+
+    def add_penalty(self, group, expression):
+        """Add a linear penalty to an objective group with a positive weight"""
+        if self.objective['weights'].get(group):
+            self.penalties[group].append(expression)
+
+    def _rule_is_hard(self, rule):
+        return self.objective['rules'][rule] == 'hard'
+
+    def _teacher_daily_limit(self, teacher):
+        """Daily period limit: maxHoursPerDay as sent by Node, else maxPeriodsPerDay"""
+        return teacher.get('maxHoursPerDay', teacher.get('maxPeriodsPerDay', 4))
+
+    def _guarded(self, constraint, key):
+        """In explain mode, make a constraint conditional on its group's assumption"""
+        if self.explain:
+            if key not in self.assumptions:
+                self.assumptions[key] = self.model.NewBoolVar("assume_" + "_".join(str(k) for k in key))
+            constraint.OnlyEnforceIf(self.assumptions[key])
+        return constraint
+
+    def _add_guarded_at_most_one(self, literals, key):
+        """AddAtMostOne, or an enforceable linear form in explain mode"""
+        if self.explain:
+            return self._guarded(self.model.Add(sum(literals) <= 1), key)
+        return self.model.AddAtMostOne(literals)
+
+    def stop_search(self):
+        """Ask a running solve to stop; safe to call from another thread"""
+        self.stop_requested.set()
+        solver = self.solver
+        if solver is not None:
+            solver.StopSearch()
+
+    def _record_model_stats(self, is_sub, build_time):
+        """Record model size and build time for the statistics block"""
+        proto = self.model.Proto()
+        self.model_stats = {
+            "sparse": self.sparse,
+            "subjectVariables": len(is_sub),
+            "variables": len(proto.variables),
+            "constraints": len(proto.constraints),
+            "buildTime": round(build_time, 4)
+        }
+        if self.strengthening is not None:
+            self.model_stats["strengthening"] = self.strengthening
+        if self.template is not None:
+            self.model_stats["template"] = self.template
 
     def _add_fixed_placements(self, is_sub):
         """Add fixed placement constraints"""
@@ -123,12 +691,15 @@ class TimetableScheduler:
             
             if subject_id:
                 class_idx = self.class_to_index[class_id]
-                day_idx = self.day_to_index[day]
+                day_idx = self._day_index(day)
                 period_idx = period - 1  # Convert to 0-based
                 subject_idx = self.subject_to_index[subject_id]
                 
                 # Add constraint: this slot must have this subject
-                self.model.Add(is_sub[(class_idx, day_idx, period_idx, subject_idx)] == 1)
+                self._guarded(
+                    self.model.Add(is_sub[(class_idx, day_idx, period_idx, subject_idx)] == 1),
+                    ("fixedSlot", class_id, day_idx, period)
+                )
                 fixed_placements.append((class_idx, day_idx, period_idx, subject_idx))
 
     def _add_subject_count_constraints(self, is_sub):
@@ -153,230 +724,216 @@ class TimetableScheduler:
                         occurrences.append(is_sub[(class_idx, day_idx, period_idx, subject_idx)])
                 
                 # Add constraint: total hours must match requirement
-                self.model.Add(sum(occurrences) == hours_needed)
-
-    def _add_teacher_constraints(self, is_sub, num_classes, num_days, num_periods, num_teachers):
-        """Add teacher-related variables and constraints"""
-        teacher_var = {}
-        is_teacher = {}
-        
-        # Create teacher variables per slot
-        for class_idx in range(num_classes):
-            class_id = self.class_ids[class_idx]
-            for day_idx in range(num_days):
-                for period_idx in range(num_periods):
-                    # Create integer variable for teacher
-                    teacher_var[(class_idx, day_idx, period_idx)] = self.model.NewIntVar(
-                        0, num_teachers-1, f"teacher_C{class_id}_D{day_idx}_P{period_idx}"
-                    )
-                    
-                    # Link teacher variable to subject assignment
-                    teacher_expr = []
-                    for subject_idx in range(len(self.subject_ids)):
-                        subject_id = self.subject_ids[subject_idx]
-                        # Find teacher for this subject in this class
-                        teacher_id = self._get_teacher_for_subject(class_id, subject_id)
-                        if teacher_id is not None:
-                            teacher_idx = self.teacher_to_index[teacher_id]
-                            teacher_expr.append(teacher_idx * is_sub[(class_idx, day_idx, period_idx, subject_idx)])
-                    
-                    if teacher_expr:
-                        self.model.Add(sum(teacher_expr) == teacher_var[(class_idx, day_idx, period_idx)])
-
-        # Create boolean variables for teacher assignments
-        for teacher_idx in range(num_teachers):
-            teacher_id = self.teacher_ids[teacher_idx]
-            for class_idx in range(num_classes):
-                class_id = self.class_ids[class_idx]
+                self._guarded(self.model.Add(sum(occurrences) == hours_needed), ("classHours", class_id, subject_id))
+
+    def _add_teacher_constraints(self, is_sub, lab_starts, num_classes, num_days, num_periods, num_teachers):
+        """Collect teacher occupancy literals per slot directly from is_sub"""
+        # The teacher of each (class, subject) is fixed by the payload, so a
+        # teacher is busy at (day, period) exactly when one of their is_sub
+        # literals is true. No per-slot teacher variables are needed.
+        teacher_slots = defaultdict(list)
+
+        # Lessons starting at (teacher, day, period): theory lessons are one
+        # period long, a lab pair is a single two-period lesson
+        theory_starts = defaultdict(list)
+        pair_starts = defaultdict(list)
+
+        for teacher_id, assignments in self.teacher_classes.items():
+            if teacher_id not in self.teacher_to_index:
+                continue
+            teacher_idx = self.teacher_to_index[teacher_id]
+            for class_id, subject_id in assignments:
+                class_idx = self.class_to_index[class_id]
+                subject_idx = self.subject_to_index[subject_id]
                 for day_idx in range(num_days):
                     for period_idx in range(num_periods):
-                        is_teacher[(teacher_idx, class_idx, day_idx, period_idx)] = self.model.NewBoolVar(
-                            f"is_teacher_{teacher_id}_C{class_id}_D{day_idx}_P{period_idx}"
-                        )
-                        # Link: teacher_var == teacher_idx <-> boolean is true
-                        self.model.Add(teacher_var[(class_idx, day_idx, period_idx)] == teacher_idx).OnlyEnforceIf(
-                            is_teacher[(teacher_idx, class_idx, day_idx, period_idx)]
-                        )
-                        self.model.Add(teacher_var[(class_idx, day_idx, period_idx)] != teacher_idx).OnlyEnforceIf(
-                            is_teacher[(teacher_idx, class_idx, day_idx, period_idx)].Not()
-                        )
+                        key = (class_idx, day_idx, period_idx, subject_idx)
+                        teacher_slots[(teacher_idx, day_idx, period_idx)].append(is_sub[key])
+                        if subject_idx not in self.lab_subjects:
+                            theory_starts[(teacher_idx, day_idx, period_idx)].append(is_sub[key])
+                        elif key in lab_starts:
+                            pair_starts[(teacher_idx, day_idx, period_idx)].append(lab_starts[key])
+
+        # Lessons touching the window (period, period + 1): theory lessons in
+        # either period and lab pairs starting one period before up to period + 1
+        teacher_windows = {}
+        for teacher_idx in range(num_teachers):
+            for day_idx in range(num_days):
+                for period_idx in range(max(num_periods - 1, 1)):
+                    window = []
+                    for p in range(period_idx, min(period_idx + 2, num_periods)):
+                        window.extend(theory_starts.get((teacher_idx, day_idx, p), []))
+                    for p in range(period_idx - 1, period_idx + 2):
+                        window.extend(pair_starts.get((teacher_idx, day_idx, p), []))
+                    if window:
+                        teacher_windows[(teacher_idx, day_idx, period_idx)] = window
 
-        return teacher_var, is_teacher
+        return teacher_slots, teacher_windows
 
-    def _add_teacher_specific_constraints(self, is_teacher, teacher_var, num_classes, num_days, num_periods, num_teachers):
-        """Add teacher availability and workload constraints"""
-        
-        # Teacher max periods per day
+    def _add_teacher_specific_constraints(self, teacher_slots, teacher_windows, num_days, num_periods, num_teachers):
+        """Add teacher workload and consecutive-period constraints"""
+
+        # Teacher max periods per day and per week
         for teacher_idx in range(num_teachers):
             teacher_id = self.teacher_ids[teacher_idx]
             teacher_data = self.teachers_dict[teacher_id]
-            max_periods_per_day = teacher_data.get('maxPeriodsPerDay', 4)
-            
+            max_periods_per_day = self._teacher_daily_limit(teacher_data)
+            max_periods_per_week = teacher_data.get('maxHoursPerWeek')
+
+            weekly_teaching = []
             for day_idx in range(num_days):
                 daily_teaching = []
-                for class_idx in range(num_classes):
-                    for period_idx in range(num_periods):
-                        daily_teaching.append(is_teacher[(teacher_idx, class_idx, day_idx, period_idx)])
-                
-                self.model.Add(sum(daily_teaching) <= max_periods_per_day)
-
-        # Teacher availability constraints
+                for period_idx in range(num_periods):
+                    daily_teaching.extend(teacher_slots.get((teacher_idx, day_idx, period_idx), []))
+                weekly_teaching.extend(daily_teaching)
+
+                if len(daily_teaching) > max_periods_per_day:
+                    self._add_limit(daily_teaching, max_periods_per_day, "teacherDailyLimit", teacher_id)
+
+            if max_periods_per_week is not None and len(weekly_teaching) > max_periods_per_week:
+                self._add_limit(weekly_teaching, max_periods_per_week, "teacherWeeklyLimit", teacher_id)
+
+        # No consecutive periods for teachers; a window of two periods holds at
+        # most one lesson (a lab pair counts as one), which also rules out
+        # double booking within a period
+        if self._rule_is_hard("teacherNoConsecutive"):
+            for (teacher_idx, day_idx, period_idx), window in teacher_windows.items():
+                if len(window) > 1:
+                    self._add_guarded_at_most_one(window, ("teacherNoConsecutive", self.teacher_ids[teacher_idx]))
+            return
+
+        # Soft: double booking stays forbidden, back-to-back lessons are penalized
+        for (teacher_idx, day_idx, period_idx), literals in teacher_slots.items():
+            if len(literals) > 1:
+                self.model.AddAtMostOne(literals)
+        for (teacher_idx, day_idx, period_idx), window in teacher_windows.items():
+            if len(window) > 1:
+                excess = self.model.NewBoolVar(f"consecutive_T{teacher_idx}_D{day_idx}_P{period_idx}")
+                self.model.Add(sum(window) <= 1 + excess)
+                self.add_penalty("teacherNoConsecutive", excess)
+
+    def _add_teacher_availability(self, teacher_slots):
+        """Keep teachers out of their unavailable slots, or penalize it when the rule is soft"""
         for teacher in self.data.get('teachers', []):
             teacher_idx = self.teacher_to_index[teacher['id']]
             for slot in teacher.get('unavailableSlots', []):
-                day_idx = self.day_to_index[slot['day']]
+                day_idx = self._day_index(slot['day'])
                 period_idx = slot['period'] - 1
-                
-                # Teacher cannot teach in this slot
-                for class_idx in range(num_classes):
-                    self.model.Add(is_teacher[(teacher_idx, class_idx, day_idx, period_idx)] == 0)
+                if day_idx is None:
+                    continue
 
-        # No consecutive periods for teachers
-        for teacher_idx in range(num_teachers):
-            for day_idx in range(num_days):
-                for period_idx in range(num_periods - 1):
-                    current_period = sum(is_teacher[(teacher_idx, c, day_idx, period_idx)] for c in range(num_classes))
-                    next_period = sum(is_teacher[(teacher_idx, c, day_idx, period_idx + 1)] for c in range(num_classes))
-                    self.model.Add(current_period + next_period <= 1)
+                # Teacher cannot teach in this slot
+                for literal in teacher_slots.get((teacher_idx, day_idx, period_idx), []):
+                    if self._rule_is_hard("teacherUnavailable"):
+                        self._guarded(self.model.Add(literal == 0), ("teacherUnavailable", teacher['id']))
+                    else:
+                        self.add_penalty("teacherUnavailable", literal)
+
+    def _add_limit(self, literals, limit, rule, teacher_id):
+        """sum(literals) <= limit, or a penalty on the excess when the rule is soft"""
+        if self._rule_is_hard(rule):
+            self._guarded(self.model.Add(sum(literals) <= limit), (rule, teacher_id))
+            return
+        excess = self.model.NewIntVar(0, len(literals), f"excess_{rule}_{teacher_id}")
+        self.model.Add(sum(literals) <= limit + excess)
+        self.add_penalty(rule, excess)
+
+    def _day_index(self, day):
+        """Map a day name or 1-based day number to a day index, None if off-grid"""
+        if isinstance(day, int):
+            day = ALL_DAYS[day - 1] if 1 <= day <= len(ALL_DAYS) else None
+        return self.day_to_index.get(day)
 
     def _add_subject_sequencing_constraints(self, is_sub, num_classes, num_days, num_periods):
-        """Add subject sequencing constraints including lab pairs"""
+        """Add subject sequencing constraints including lab pairs
+
+        Returns the lab pair start literals keyed like is_sub: a pair
+        starting at period p covers periods p and p + 1.
+        """
         
         # No consecutive same subject (except labs)
         for class_idx in range(num_classes):
+            class_id = self.class_ids[class_idx]
             for day_idx in range(num_days):
                 for period_idx in range(num_periods - 1):
-                    for subject_idx in range(len(self.subject_ids)):
+                    for subject_idx in self.class_subjects[class_idx]:
                         if subject_idx not in self.lab_subjects:
                             # Regular subjects cannot be consecutive
-                            self.model.Add(
-                                is_sub[(class_idx, day_idx, period_idx, subject_idx)] + 
-                                is_sub[(class_idx, day_idx, period_idx + 1, subject_idx)] <= 1
+                            self._guarded(
+                                self.model.Add(
+                                    is_sub[(class_idx, day_idx, period_idx, subject_idx)] +
+                                    is_sub[(class_idx, day_idx, period_idx + 1, subject_idx)] <= 1
+                                ),
+                                ("subjectSpacing", class_id, self.subject_ids[subject_idx])
                             )
 
-        # Lab must be scheduled as consecutive pairs
+        # Lab must be scheduled as consecutive pairs: every lab period is
+        # covered by exactly one pair starting there or one period earlier
+        lab_starts = {}
         for class_idx in range(num_classes):
+            class_id = self.class_ids[class_idx]
+            class_labs = [s for s in self.class_subjects[class_idx] if s in self.lab_subjects]
             for day_idx in range(num_days):
-                for period_idx in range(num_periods):
-                    for subject_idx in self.lab_subjects:
-                        lab_present = is_sub[(class_idx, day_idx, period_idx, subject_idx)]
-                        
-                        # Cannot have lab in last period
-                        if period_idx == num_periods - 1:
-                            self.model.Add(lab_present == 0)
-                        else:
-                            # If lab is present, next period must be same lab
-                            self.model.Add(
-                                is_sub[(class_idx, day_idx, period_idx + 1, subject_idx)] == 1
-                            ).OnlyEnforceIf(lab_present)
-                        
-                        # Prevent three consecutive labs
-                        if period_idx > 0 and period_idx < num_periods - 1:
-                            self.model.Add(
-                                is_sub[(class_idx, day_idx, period_idx - 1, subject_idx)] +
-                                is_sub[(class_idx, day_idx, period_idx, subject_idx)] +
-                                is_sub[(class_idx, day_idx, period_idx + 1, subject_idx)] <= 2
-                            )
+                for subject_idx in class_labs:
+                    starts = []
+                    for period_idx in range(num_periods - 1):
+                        start = self.model.NewBoolVar(f"lab_start_C{class_id}_D{day_idx}_P{period_idx}_S{subject_idx}")
+                        lab_starts[(class_idx, day_idx, period_idx, subject_idx)] = start
+                        starts.append(start)
+
+                    for period_idx in range(num_periods):
+                        covering = starts[max(period_idx - 1, 0):period_idx + 1]
+                        self.model.Add(is_sub[(class_idx, day_idx, period_idx, subject_idx)] == sum(covering))
+
+                    # Prevent three consecutive labs (no back-to-back pairs)
+                    for period_idx in range(1, num_periods - 1):
+                        self.model.Add(
+                            is_sub[(class_idx, day_idx, period_idx - 1, subject_idx)] +
+                            is_sub[(class_idx, day_idx, period_idx, subject_idx)] +
+                            is_sub[(class_idx, day_idx, period_idx + 1, subject_idx)] <= 2
+                        )
+
+        return lab_starts
 
     def _get_teacher_for_subject(self, class_id, subject_id):
         """Get teacher assigned to teach a subject in a class"""
-        class_data = self.classes_dict[class_id]
-        for subject_info in class_data.get('subjects', []):
-            if subject_info['subjectId'] == subject_id:
-                return subject_info['teacherId']
-        return None
+        return self.subject_teacher.get(class_id, {}).get(subject_id)
 
     def _extract_solution(self, solver, timetable):
         """Extract the solution from solver"""
-        schedule = []
-        num_classes = len(self.class_ids)
-        num_days = len(self.days)
-        num_periods = len(self.periods)
-        
-        for class_idx in range(num_classes):
-            class_id = self.class_ids[class_idx]
-            for day_idx in range(num_days):
-                day = self.days[day_idx]
-                for period_idx in range(num_periods):
-                    period = self.periods[period_idx]
-                    
-                    # Find which subject is assigned to this slot
-                    for subject_idx in range(len(self.subject_ids)):
-                        if solver.Value(timetable[(class_idx, day_idx, period_idx, subject_idx)]) == 1:
-                            subject_id = self.subject_ids[subject_idx]
-                            teacher_id = self._get_teacher_for_subject(class_id, subject_id)
-                            
-                            schedule.append({
-                                "classId": class_id,
-                                "day": day,
-                                "period": period,
-                                "subjectId": subject_id,
-                                "teacherId": teacher_id
-                            })
-                            break
-        
-        return schedule
+        return self._solution_array(solver, timetable).to_items()
 
-    def _generate_statistics(self, solver, schedule, solve_time):
+    def _solution_array(self, solver, timetable):
+        """Array-backed timetable of the solver's current solution"""
+        if self.solution_variables is None:
+            self.solution_variables = solution_variables(timetable)
+        return TimetableArray.from_solution(self, response_values(solver), self.solution_variables)
+
+    def _generate_statistics(self, solver, schedule, solve_time, solution=None):
         """Generate schedule statistics"""
         total_possible_slots = len(self.days) * len(self.periods) * len(self.class_ids)
+        if solution is None:
+            solution = TimetableArray.from_items(schedule)
 
-        teacher_hours = defaultdict(int)
-        class_hours = defaultdict(int)
-        subject_hours = defaultdict(int)
-        
-        for item in schedule:
-            teacher_hours[item['teacherId']] += 1
-            class_hours[item['classId']] += 1
-            subject_hours[item['subjectId']] += 1
-
-        conflicts = self._find_conflicts(schedule)
+        conflicts = solution.conflicts()
 
         return {
             "totalPossibleSlots": total_possible_slots,
             "scheduledSlots": len(schedule),
             "utilizationRate": f"{(len(schedule) / total_possible_slots * 100):.1f}%",
-            "teacherWorkload": dict(teacher_hours),
-            "classUtilization": dict(class_hours),
-            "subjectDistribution": dict(subject_hours),
+            "teacherWorkload": solution.counts("teacher"),
+            "classUtilization": solution.counts("class"),
+            "subjectDistribution": solution.counts("subject"),
             "conflicts": len(conflicts),
             "solveTime": f"{solve_time:.2f} seconds",
-            "conflictDetails": conflicts
+            "conflictDetails": conflicts,
+            "model": self.model_stats,
+            "solverConfig": self.config
         }
 
     def _find_conflicts(self, schedule):
         """Detect conflicts in the schedule"""
-        conflicts = []
-
-        teacher_slots = defaultdict(set)
-        class_slots = defaultdict(set)
-        
-        for item in schedule:
-            # Teacher conflict check
-            teacher_key = (item['teacherId'], item['day'], item['period'])
-            if teacher_key in teacher_slots:
-                conflicts.append({
-                    "type": "teacher_double_booking",
-                    "teacherId": item['teacherId'],
-                    "day": item['day'],
-                    "period": item['period'],
-                    "message": f"Teacher {item['teacherId']} double-booked at {item['day']} period {item['period']}"
-                })
-            teacher_slots[teacher_key].add(item['classId'])
-
-            # Class conflict check
-            class_key = (item['classId'], item['day'], item['period'])
-            if class_key in class_slots:
-                conflicts.append({
-                    "type": "class_double_booking",
-                    "classId": item['classId'],
-                    "day": item['day'],
-                    "period": item['period'],
-                    "message": f"Class {item['classId']} has overlapping subjects at {item['day']} period {item['period']}"
-                })
-            class_slots[class_key].add(item['subjectId'])
-
-        return conflicts
+        return TimetableArray.from_items(schedule).conflicts()
 
     def validate_timetable(self, timetable):
         """Validate external timetable"""
@@ -0,0 +1,155 @@
+# portfolio.py
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from optimizer import TimetableScheduler
+from solver_config import resolve_config
+from templates import TEMPLATES
+
+logger = logging.getLogger("timetable-scheduler")
+
+# Set by whichever member settles the search; every other member then stops
+_stop_event = None
+
+
+def _init_member(stop_event):
+    global _stop_event
+    _stop_event = stop_event
+
+
+def member_config(config, member, deadline):
+    """Complete config one member runs with: the shared settings plus its own
+
+    Members solve the whole model, so decomposition is off, and their time
+    limit ends at the shared deadline.
+    """
+    resolved = resolve_config(dict(config, portfolio=0, decompose=False, **member))
+    resolved["timeLimit"] = max(0.1, deadline - time.time())
+    return resolved
+
+
+def _solve_member(data, config, member, deadline):
+    """Solve the payload with one member's settings (runs in a pool worker)
+
+    Returns (result, reason, templates); reason says why this member
+    settled the search ("optimal", "target" or "infeasible"), is "stopped"
+    when another member settled it first and None when the time limit ran
+    out. templates are the model templates the member stored.
+    """
+    if _stop_event.is_set():
+        return None, None, []
+
+    scheduler = TimetableScheduler(data, config=member_config(config, member, deadline))
+    target = config["targetObjective"]
+    reached = []
+
+    def on_solution(progress):
+        if target is not None and progress["objective"] <= target:
+            reached.append(progress["objective"])
+            return False
+        return not _stop_event.is_set()
+
+    # Stop this member's search as soon as another member settles it
+    finished = threading.Event()
+
+    def watch():
+        while not finished.is_set():
+            if _stop_event.wait(0.05):
+                scheduler.stop_search()
+                return
+
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    try:
+        result = scheduler.generate_schedule(on_solution)
+    finally:
+        finished.set()
+
+    reason = None
+    if reached:
+        reason = "target"
+    elif result["status"] == "optimal":
+        reason = "optimal"
+    elif result["status"] == "infeasible" and not scheduler.stop_requested.is_set():
+        runs = result["statistics"].get("solverRuns") or []
+        # Proved infeasible (or rejected before solving), not out of time
+        if not runs or runs[-1]["status"] == "INFEASIBLE":
+            reason = "infeasible"
+    if reason is not None:
+        _stop_event.set()
+    elif scheduler.stop_requested.is_set():
+        reason = "stopped"
+    return result, reason, TEMPLATES.take_captured()
+
+
+def _rank(entry):
+    """Sort key: optimal before feasible, then lower objective, then faster"""
+    result = entry["result"]
+    objective = (result["statistics"].get("objective") or {}).get("total") or 0
+    return (result["status"] != "optimal", objective, result["statistics"].get("solveSeconds", 0))
+
+
+def solve_portfolio(data, config):
+    """Race differently parameterized solves of one payload and keep the best
+
+    Every member of config["portfolio"] solves the full model in its own
+    process with the shared time limit. The first member to prove
+    optimality or infeasibility, or to reach config["targetObjective"],
+    stops all the others. The best timetable is returned with a portfolio
+    block naming the winning member settings and listing every member's
+    outcome.
+    """
+    members = config["portfolio"]
+    start_time = time.time()
+    deadline = start_time + config["timeLimit"]
+    shared = dict(config, numWorkers=max(1, config["numWorkers"] // len(members)))
+
+    stop_event = multiprocessing.Event()
+    logger.info("Solving with a portfolio of %d configurations", len(members))
+    with ProcessPoolExecutor(max_workers=len(members), initializer=_init_member, initargs=(stop_event,)) as pool:
+        futures = [pool.submit(_solve_member, data, shared, member, deadline) for member in members]
+        outcomes = [future.result() for future in futures]
+    for _, _, templates in outcomes:
+        TEMPLATES.adopt(templates)
+
+    entries = []
+    for index, (member, (result, reason, _)) in enumerate(zip(members, outcomes)):
+        summary = {"index": index, "settings": member, "status": "skipped"}
+        if result is not None:
+            statistics = result["statistics"]
+            summary.update({
+                "status": result["status"],
+                "objective": (statistics.get("objective") or {}).get("total"),
+                "timeToFirstSolution": statistics.get("timeToFirstSolution"),
+                "solveSeconds": statistics.get("solveSeconds"),
+            })
+            if reason is not None:
+                summary["outcome"] = reason
+        entries.append({"summary": summary, "result": result, "reason": reason})
+
+    solved = [entry for entry in entries if entry["result"] and entry["result"]["status"] in ("optimal", "feasible")]
+    if solved:
+        winner = min(solved, key=_rank)
+    else:
+        # Prefer a member that proved infeasibility: its message explains why
+        ran = [entry for entry in entries if entry["result"] is not None]
+        winner = next((entry for entry in ran if entry["reason"] == "infeasible"), ran[0])
+
+    settled = next((entry["reason"] for entry in entries if entry["reason"] not in (None, "stopped")), "timeLimit")
+    result = winner["result"]
+    result["statistics"]["portfolio"] = {
+        "winner": winner["summary"]["index"],
+        "winnerSettings": winner["summary"]["settings"],
+        "stopReason": settled,
+        "solveSeconds": round(time.time() - start_time, 4),
+        "members": [entry["summary"] for entry in entries],
+    }
+    logger.info(
+        "Portfolio winner %d of %d %s: %s, objective %s, stopped by %s",
+        winner["summary"]["index"], len(members), winner["summary"]["settings"],
+        result["status"], winner["summary"].get("objective"), settled
+    )
+    return result
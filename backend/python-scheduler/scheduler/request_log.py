@@ -0,0 +1,149 @@
+# request_log.py
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import time
+import uuid
+
+logger = logging.getLogger("timetable-scheduler")
+
+# Captured payloads go to their own logger so they never reach the console
+capture_logger = logging.getLogger("timetable-scheduler.requests")
+capture_logger.propagate = False
+
+
+def payload_summary(data):
+    """Counts describing a payload, cheap enough to log on every request"""
+    return {
+        field: len(data.get(field) or [])
+        for field in ("classes", "teachers", "subjects", "rooms", "fixedSlots")
+    }
+
+
+class _CaptureFormatter(logging.Formatter):
+    """One JSON line per captured request; runs on the listener thread"""
+
+    def format(self, record):
+        entry = dict(record.capture)
+        raw = entry.pop("raw", None)
+        if raw is not None:
+            entry["payload"] = json.loads(raw)
+        return json.dumps(entry, separators=(",", ":"))
+
+
+def worker_path(path, pid=None):
+    """The file one process writes: logs/requests.jsonl -> logs/requests-<pid>.jsonl"""
+    root, ext = os.path.splitext(path)
+    return f"{root}-{pid or os.getpid()}{ext}"
+
+
+class RequestLog:
+    """Sampled, size-capped capture of request payloads to a rotating file
+
+    Every request gets an id and a one-line summary at INFO. The raw request
+    body is captured for a sample_rate fraction of requests when it is at
+    most max_bytes long; with the capture logger at DEBUG every payload is
+    captured in full. Captured bodies are the bytes Flask already read, so
+    nothing is serialized on the request thread: the record is queued and a
+    listener thread decodes it and appends it to the rotating JSON-lines
+    file that replay.py reads. Each process writes and rotates its own
+    worker_path(path), so gunicorn workers never rotate a file another one
+    still appends to; read_captures merges them.
+    """
+
+    def __init__(self, path, sample_rate=0.0, max_bytes=1048576,
+                 rotate_bytes=10485760, backups=5, level=logging.INFO):
+        self.path = worker_path(path)
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.listener = None
+        self.queue_handler = None
+        capture_logger.setLevel(level)
+
+        if sample_rate <= 0 and level > logging.DEBUG:
+            return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        records = queue.Queue(-1)
+        handler = logging.handlers.RotatingFileHandler(self.path, maxBytes=rotate_bytes, backupCount=backups)
+        handler.setFormatter(_CaptureFormatter())
+        self.queue_handler = logging.handlers.QueueHandler(records)
+        capture_logger.addHandler(self.queue_handler)
+        self.listener = logging.handlers.QueueListener(records, handler)
+        self.listener.start()
+
+    def capture(self, endpoint, data, raw=None):
+        """Log a request summary and maybe queue its payload; returns the request id"""
+        request_id = uuid.uuid4().hex[:12]
+        summary = payload_summary(data)
+        size = len(raw) if raw is not None else None
+        logger.info("Request %s on /%s: %s, %s bytes", request_id, endpoint, summary, size)
+
+        if self.listener is None or raw is None:
+            return request_id
+        full = capture_logger.isEnabledFor(logging.DEBUG)
+        if not full and (size > self.max_bytes or random.random() >= self.sample_rate):
+            return request_id
+
+        capture_logger.log(logging.DEBUG if full else logging.INFO, "request %s", request_id, extra={
+            "capture": {
+                "id": request_id,
+                "endpoint": endpoint,
+                "receivedAt": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "bytes": size,
+                "summary": summary,
+                "raw": raw,
+            }
+        })
+        return request_id
+
+    def close(self):
+        if self.queue_handler is not None:
+            capture_logger.removeHandler(self.queue_handler)
+            self.queue_handler = None
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+
+def _read_rotated(path):
+    """Entries of one log file and its rotated backups, oldest first"""
+    paths = [path]
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        paths.append(f"{path}.{index}")
+        index += 1
+
+    entries = []
+    for file_path in reversed(paths):
+        if not os.path.exists(file_path):
+            continue
+        with open(file_path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entries.append(json.loads(line))
+    return entries
+
+
+def read_captures(path):
+    """Captured requests of every process logging to path, oldest first
+
+    Merges each worker_path(path) file, their rotated backups and path
+    itself by receivedAt; entries of the same second keep file order.
+    """
+    directory = os.path.dirname(path) or "."
+    root, ext = os.path.splitext(os.path.basename(path))
+    pattern = re.compile(re.escape(root) + r"-\d+" + re.escape(ext) + "$")
+    names = sorted(name for name in os.listdir(directory) if pattern.match(name)) if os.path.isdir(directory) else []
+
+    entries = _read_rotated(path)
+    for name in names:
+        entries.extend(_read_rotated(os.path.join(directory, name)))
+    entries.sort(key=lambda entry: entry["receivedAt"])
+    return entries
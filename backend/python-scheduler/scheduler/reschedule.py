@@ -0,0 +1,156 @@
+# reschedule.py
+import logging
+import time
+from collections import Counter
+
+from optimizer import TimetableScheduler
+
+logger = logging.getLogger("timetable-scheduler")
+
+# A wider attempt is not started with less time than this left
+MIN_ATTEMPT_SECONDS = 0.1
+
+
+def normalize_previous_timetable(previous):
+    """Flatten a previous timetable into {classId, day, period, subjectId} items
+
+    Accepts the optimizer's own schedule items as well as TimetableCell
+    documents ({class, timetable: [{day, period, subject, teacher}]}).
+    """
+    items = []
+    for entry in previous or []:
+        if 'timetable' in entry:
+            class_id = str(entry.get('class') or entry.get('classId'))
+            for cell in entry['timetable']:
+                if not cell.get('subject'):
+                    continue
+                items.append({
+                    "classId": class_id,
+                    "day": cell['day'],
+                    "period": cell['period'],
+                    "subjectId": str(cell['subject']),
+                    "teacherId": str(cell['teacher']) if cell.get('teacher') else None
+                })
+        elif entry.get('subjectId'):
+            items.append(entry)
+    return items
+
+
+def stale_classes(scheduler, previous):
+    """Class IDs whose previous timetable no longer satisfies the payload
+
+    A class is stale when a lesson is off the grid, its subject has another
+    teacher (or none) now, its teacher is unavailable then, a fixed slot is
+    not met or its weekly hours changed.
+    """
+    unavailable = set()
+    for teacher in scheduler.data.get('teachers', []):
+        for slot in teacher.get('unavailableSlots', []):
+            unavailable.add((teacher['id'], scheduler._day_index(slot['day']), slot['period']))
+
+    fixed = {}
+    for slot in scheduler.data.get('fixedSlots', []):
+        if slot.get('subjectId'):
+            fixed[(slot['classId'], scheduler._day_index(slot['day']), slot['period'])] = slot['subjectId']
+
+    placed = {}
+    counts = Counter()
+    stale = set()
+    for item in previous:
+        class_id = item['classId']
+        if class_id not in scheduler.classes_dict:
+            continue
+        day_idx = scheduler._day_index(item['day'])
+        teacher_id = scheduler._get_teacher_for_subject(class_id, item['subjectId'])
+        if (day_idx is None or item['period'] not in scheduler.periods
+                or teacher_id is None
+                or (item.get('teacherId') and item['teacherId'] != teacher_id)
+                or (teacher_id, day_idx, item['period']) in unavailable):
+            stale.add(class_id)
+        placed[(class_id, day_idx, item['period'])] = item['subjectId']
+        counts[(class_id, item['subjectId'])] += 1
+
+    for (class_id, day_idx, period), subject_id in fixed.items():
+        if placed.get((class_id, day_idx, period)) != subject_id:
+            stale.add(class_id)
+
+    for class_obj in scheduler.data.get('classes', []):
+        for subject_info in class_obj.get('subjects', []):
+            if counts[(class_obj['id'], subject_info['subjectId'])] != subject_info.get('hoursPerWeek', 1):
+                stale.add(class_obj['id'])
+
+    return stale
+
+
+def teacher_neighbours(scheduler, class_ids):
+    """Classes sharing at least one teacher with the given classes"""
+    neighbours = set(class_ids)
+    for class_id in class_ids:
+        for teacher_id in scheduler.subject_teacher.get(class_id, {}).values():
+            neighbours.update(c for c, _ in scheduler.teacher_classes.get(teacher_id, []))
+    return neighbours
+
+
+def count_changes(schedule, previous):
+    """Number of (class, day, period) slots whose subject differs from before"""
+    before = {(i['classId'], i['day'], i['period']): i['subjectId'] for i in previous}
+    after = {(i['classId'], i['day'], i['period']): i['subjectId'] for i in schedule}
+    return sum(1 for key in set(before) | set(after) if before.get(key) != after.get(key))
+
+
+def reschedule(data):
+    """Repair a previous timetable after a change, freeing as little as possible
+
+    Classes affected by the change (listed in "changes", taught by a changed
+    teacher, or whose previous timetable breaks the new payload) are freed
+    and everything else stays pinned. If that neighbourhood is infeasible it
+    grows to classes sharing a teacher, and finally to a full warm-started
+    solve. Every attempt is hinted with the previous timetable. The attempts
+    share config["timeLimit"]: each gets what the earlier ones left, and no
+    wider attempt starts once it is spent.
+    """
+    start_time = time.time()
+    previous = normalize_previous_timetable(data.get('previousTimetable'))
+    changes = data.get('changes') or {}
+    minimize_changes = data.get('minimizeChanges', True)
+
+    scheduler = TimetableScheduler(data)
+    all_classes = set(scheduler.class_ids)
+    changed_teachers = set(changes.get('teacherIds', []))
+
+    freed = set(changes.get('classIds', [])) & all_classes
+    for teacher_id in changed_teachers:
+        freed.update(c for c, _ in scheduler.teacher_classes.get(teacher_id, []))
+    freed |= stale_classes(scheduler, previous)
+
+    # Neighbourhoods to try, smallest first, without repeats
+    scopes = []
+    for scope_name, scope in (("affected", freed),
+                              ("neighbours", teacher_neighbours(scheduler, freed)),
+                              ("full", all_classes)):
+        if not scopes or scope != scopes[-1][1]:
+            scopes.append((scope_name, scope))
+
+    attempts = []
+    result = None
+    deadline = start_time + scheduler.config['timeLimit']
+    for scope_name, scope in scopes:
+        remaining = deadline - time.time()
+        if result is not None and remaining < MIN_ATTEMPT_SECONDS:
+            logger.info("Reschedule time limit reached before attempt %s", scope_name)
+            break
+        attempt = TimetableScheduler(data, config=dict(scheduler.config, timeLimit=max(MIN_ATTEMPT_SECONDS, remaining)))
+        attempt.warm_start(previous, frozen_class_ids=all_classes - scope, minimize_changes=minimize_changes)
+        result = attempt.generate_schedule()
+        attempts.append({"scope": scope_name, "freedClasses": len(scope), "status": result['status']})
+        logger.info("Reschedule attempt %s (%d classes freed): %s", scope_name, len(scope), result['status'])
+        if result['status'] in ("optimal", "feasible"):
+            break
+
+    result['statistics']['reschedule'] = {
+        "attempts": attempts,
+        "freedClassIds": sorted(freed),
+        "changedSlots": count_changes(result['schedule'], previous) if result['schedule'] else None,
+        "totalTime": round(time.time() - start_time, 3)
+    }
+    return result
@@ -0,0 +1,159 @@
+# rooms.py
+import logging
+from collections import defaultdict
+
+logger = logging.getLogger("timetable-scheduler")
+
+def room_type(scheduler, subject_id):
+    """Room type a subject needs: lab subjects go to lab rooms"""
+    return "lab" if scheduler.subject_to_index.get(subject_id) in scheduler.lab_subjects else "classroom"
+
+
+def room_capacity(room):
+    """Seats in a room; rooms without a capacity fit any class"""
+    capacity = room.get('capacity')
+    return float('inf') if capacity is None else capacity
+
+
+def student_count(scheduler, class_id):
+    return scheduler.classes_dict.get(class_id, {}).get('studentCount') or 0
+
+
+def rooms_by_type(rooms):
+    """Map room type -> rooms sorted by capacity, smallest first"""
+    grouped = defaultdict(list)
+    for room in rooms:
+        grouped[room.get('type', 'classroom')].append(room)
+    return {kind: sorted(group, key=room_capacity) for kind, group in grouped.items()}
+
+
+def capacity_thresholds(scheduler):
+    """Per room type, the distinct student counts of classes needing that type
+
+    With rooms of one type nested by capacity, a period's lessons fit the
+    rooms exactly when, for every threshold c, the lessons with at least c
+    students do not outnumber the rooms with at least c seats (Hall's
+    condition). These are the thresholds the model mode constrains.
+    """
+    thresholds = defaultdict(set)
+    for class_idx, class_id in enumerate(scheduler.class_ids):
+        for subject_idx in scheduler.class_subjects[class_idx]:
+            kind = room_type(scheduler, scheduler.subject_ids[subject_idx])
+            thresholds[kind].add(student_count(scheduler, class_id))
+    return {kind: sorted(counts) for kind, counts in thresholds.items()}
+
+
+def _match(scheduler, lessons, rooms):
+    """Largest class first into the smallest free room that fits
+
+    The rooms a lesson fits are nested by capacity, and for that structure
+    this greedy is a maximum bipartite matching that also wastes the fewest
+    seats. Returns {lesson index: room}.
+    """
+    free = list(rooms)
+    matched = {}
+    order = sorted(range(len(lessons)), key=lambda idx: student_count(scheduler, lessons[idx]['classId']), reverse=True)
+    for idx in order:
+        size = student_count(scheduler, lessons[idx]['classId'])
+        room = next((r for r in free if room_capacity(r) >= size), None)
+        if room is not None:
+            free.remove(room)
+            matched[idx] = room
+    return matched
+
+
+def _match_keeping(scheduler, lessons, rooms, preferred):
+    """A maximum matching that keeps as many preferred rooms as it can
+
+    preferred maps lesson index -> room (a lab pair's first-period room).
+    Each preference is kept only if the other lessons can still be matched
+    as fully as without any, so continuity never costs a lesson its room.
+    """
+    if not preferred:
+        return _match(scheduler, lessons, rooms), 0
+    best = len(_match(scheduler, lessons, rooms))
+    kept = {}
+    for idx, room in preferred.items():
+        trial = {**kept, idx: room}
+        used = {r['id'] for r in trial.values()}
+        rest = [i for i in range(len(lessons)) if i not in trial]
+        matched = _match(scheduler, [lessons[i] for i in rest], [r for r in rooms if r['id'] not in used])
+        if len(trial) + len(matched) == best:
+            kept = trial
+
+    used = {r['id'] for r in kept.values()}
+    rest = [i for i in range(len(lessons)) if i not in kept]
+    matched = _match(scheduler, [lessons[i] for i in rest], [r for r in rooms if r['id'] not in used])
+    assignment = dict(kept)
+    assignment.update((rest[i], room) for i, room in matched.items())
+    return assignment, len(kept)
+
+
+def assign_rooms(scheduler, schedule, rooms):
+    """Give every lesson of a fixed timetable a room (second stage)
+
+    Works period by period with a maximum matching of lessons to rooms of
+    their type (see _match), so no general assignment solve is needed. The
+    second period of a lab pair keeps its first room when that still lets
+    every other lesson of the period be placed; otherwise it moves
+    ("labRoomChanges" counts those).
+
+    Sets "roomId" on every item (None when no room was left) and returns
+    the room statistics.
+    """
+    grouped = rooms_by_type(rooms)
+    rooms_by_id = {room['id']: room for room in rooms}
+    by_slot = defaultdict(list)
+    for item in schedule:
+        by_slot[(item['day'], item['period'])].append(item)
+
+    unassigned = []
+    wasted_seats = 0
+    lab_room_changes = 0
+    for day in scheduler.days:
+        continuing = {}
+        for period in scheduler.periods:
+            pending = defaultdict(list)
+            preferred = defaultdict(dict)
+            for item in by_slot.get((day, period), []):
+                kind = room_type(scheduler, item['subjectId'])
+                previous = continuing.get(item['classId'])
+                if previous and previous['subjectId'] == item['subjectId'] and previous['roomId'] is not None:
+                    # Second period of a lab pair: same room if possible
+                    preferred[kind][len(pending[kind])] = rooms_by_id[previous['roomId']]
+                pending[kind].append(item)
+
+            continuing = {}
+            for kind, lessons in pending.items():
+                assignment, kept = _match_keeping(scheduler, lessons, grouped.get(kind, []), preferred[kind])
+                lab_room_changes += len(preferred[kind]) - kept
+                for idx, item in enumerate(lessons):
+                    room = assignment.get(idx)
+                    if room is None:
+                        item['roomId'] = None
+                        unassigned.append(item)
+                        continue
+                    item['roomId'] = room['id']
+                    if room.get('capacity') is not None:
+                        wasted_seats += room['capacity'] - student_count(scheduler, item['classId'])
+                    if kind == "lab" and idx not in preferred[kind]:
+                        continuing[item['classId']] = item
+
+    if unassigned:
+        logger.warning("No room available for %d lessons", len(unassigned))
+
+    usage = defaultdict(int)
+    for item in schedule:
+        if item.get('roomId') is not None:
+            usage[item['roomId']] += 1
+
+    return {
+        "assigned": sum(usage.values()),
+        "unassigned": [
+            {key: item[key] for key in ("classId", "day", "period", "subjectId")}
+            for item in unassigned
+        ],
+        "wastedSeats": wasted_seats,
+        "labRoomChanges": lab_room_changes,
+        "roomUsage": dict(usage)
+    }
@@ -0,0 +1,224 @@
+# scenarios.py
+import copy
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from decomposition import solve_schedule
+from optimizer import TimetableScheduler
+from reschedule import reschedule
+from solver_config import resolve_config
+from templates import TEMPLATES
+
+logger = logging.getLogger("timetable-scheduler")
+
+# What a scenario's "delta" may change in the base payload
+DELTA_OPERATIONS = ("unavailableSlots", "hoursPerWeek", "fixedSlots", "teachers", "classes", "subjects")
+
+
+def _lookup(entities, entity_id, kind):
+    if entity_id not in entities:
+        raise ValueError(f"Unknown {kind}: {entity_id}")
+    return entities[entity_id]
+
+
+def apply_delta(data, delta, periods):
+    """Payload of one scenario: the base payload with its delta applied
+
+    A delta may add teacher unavailability ("unavailableSlots", a missing
+    period meaning the whole day), set a subject's hours in one class or
+    in every class taking it ("hoursPerWeek"), add "fixedSlots", and
+    merge fields into "teachers", "classes" or "subjects" by id. Returns
+    (payload, changes), changes naming the touched teachers and classes
+    the way /reschedule expects them.
+
+    Raises:
+        ValueError: If an operation is unknown or names an unknown id
+    """
+    unknown = set(delta) - set(DELTA_OPERATIONS)
+    if unknown:
+        raise ValueError(f"Unknown delta operation(s): {', '.join(sorted(unknown))}")
+
+    payload = dict(data)
+    for field in ("classes", "teachers", "subjects", "fixedSlots"):
+        payload[field] = copy.deepcopy(data.get(field, []))
+    teachers = {teacher['id']: teacher for teacher in payload['teachers']}
+    classes = {class_obj['id']: class_obj for class_obj in payload['classes']}
+    subjects = {subject['id']: subject for subject in payload['subjects']}
+    teacher_ids = set()
+    class_ids = set()
+
+    for slot in delta.get('unavailableSlots', []):
+        teacher = _lookup(teachers, slot.get('teacherId'), "teacher")
+        slot_periods = [slot['period']] if slot.get('period') is not None else periods
+        teacher['unavailableSlots'] = list(teacher.get('unavailableSlots', [])) + [
+            {"day": slot['day'], "period": period} for period in slot_periods
+        ]
+        teacher_ids.add(teacher['id'])
+
+    for entry in delta.get('hoursPerWeek', []):
+        _lookup(subjects, entry.get('subjectId'), "subject")
+        targets = [_lookup(classes, entry['classId'], "class")] if entry.get('classId') else payload['classes']
+        matched = False
+        for class_obj in targets:
+            for subject_info in class_obj.get('subjects', []):
+                if subject_info['subjectId'] == entry['subjectId']:
+                    subject_info['hoursPerWeek'] = entry['hoursPerWeek']
+                    class_ids.add(class_obj['id'])
+                    matched = True
+        if not matched:
+            raise ValueError(f"No class takes subject {entry['subjectId']}")
+
+    for slot in delta.get('fixedSlots', []):
+        _lookup(classes, slot.get('classId'), "class")
+        payload['fixedSlots'].append(slot)
+        class_ids.add(slot['classId'])
+
+    for patch in delta.get('teachers', []):
+        _lookup(teachers, patch.get('id'), "teacher").update(patch)
+        teacher_ids.add(patch['id'])
+    for patch in delta.get('classes', []):
+        _lookup(classes, patch.get('id'), "class").update(patch)
+        class_ids.add(patch['id'])
+    for patch in delta.get('subjects', []):
+        _lookup(subjects, patch.get('id'), "subject").update(patch)
+        class_ids.update(class_obj['id'] for class_obj in payload['classes']
+                         if any(s['subjectId'] == patch['id'] for s in class_obj.get('subjects', [])))
+
+    return payload, {"teacherIds": sorted(teacher_ids), "classIds": sorted(class_ids)}
+
+
+def comparable_objective(result):
+    """Objective total without the change penalty, so scenarios compare with the base"""
+    objective = result['statistics'].get('objective')
+    if not objective:
+        return None
+    return objective['total'] - objective['terms'].get('changes', {}).get('weighted', 0)
+
+
+def changed_class_ids(schedule, base):
+    """Classes with at least one slot whose subject differs from the base timetable"""
+    before = {(i['classId'], i['day'], i['period']): i['subjectId'] for i in base}
+    after = {(i['classId'], i['day'], i['period']): i['subjectId'] for i in schedule}
+    return sorted({key[0] for key in set(before) | set(after) if before.get(key) != after.get(key)})
+
+
+def summarize(result, seconds):
+    feasible = result['status'] in ("optimal", "feasible")
+    return {
+        "status": result['status'],
+        "feasible": feasible,
+        "message": result['message'],
+        "objective": comparable_objective(result) if feasible else None,
+        "solveSeconds": round(seconds, 3),
+        "timetable": result['schedule'] if feasible else [],
+    }
+
+
+def _solve_variant(payload):
+    """Repair the base timetable for one scenario (runs in a pool worker)
+
+    Returns the result, its wall time and the model templates stored.
+    """
+    start = time.time()
+    result = reschedule(payload)
+    return result, time.time() - start, TEMPLATES.take_captured()
+
+
+def solve_scenarios(data):
+    """Solve a base payload once and every what-if scenario against its timetable
+
+    Each entry of data["scenarios"] is {"name", "delta"}. The base is
+    solved first (or, with a "previousTimetable", repaired the way
+    /reschedule does). Every scenario then repairs the base timetable,
+    freeing only the classes its delta touches, so a variant costs a small
+    neighbourhood solve of at most config["scenarioTimeLimit"] seconds
+    rather than a full one. Variants run concurrently in processes forked
+    after the base solve; when the base was solved as one model (not
+    decomposed) they start from its structural model template.
+
+    The base is bounded like a /schedule or /reschedule call, and each
+    round of poolSize variants by min(timeLimit, scenarioTimeLimit); so
+    the whole call takes about baseSeconds plus statistics["scenarioBudget"],
+    plus model building. Returns the base summary and one comparison per
+    scenario.
+
+    Raises:
+        ValueError: If a scenario delta is invalid
+    """
+    start_time = time.time()
+    base_data = {key: value for key, value in data.items() if key != 'scenarios'}
+    config = resolve_config(base_data.get('solverOptions'))
+    periods = TimetableScheduler(base_data, config=config).periods
+
+    # Invalid deltas are reported before anything is solved
+    variants = []
+    for index, scenario in enumerate(data['scenarios']):
+        try:
+            payload, changes = apply_delta(base_data, scenario.get('delta') or {}, periods)
+        except KeyError as e:
+            raise ValueError(f"Missing field {e} in the delta of scenario {index + 1}")
+        variants.append((scenario.get('name') or f"scenario {index + 1}", payload, changes))
+
+    if base_data.get('previousTimetable'):
+        base_result = reschedule(base_data)
+    else:
+        base_result = solve_schedule(base_data)
+    base_seconds = time.time() - start_time
+    base = summarize(base_result, base_seconds)
+    logger.info("Scenario base solved in %.2fs: %s", base_seconds, base['status'])
+
+    statistics = {"baseSeconds": round(base_seconds, 3)}
+    if not base['feasible']:
+        return {
+            "status": base_result['status'],
+            "message": "Base timetable could not be solved; no scenario was run",
+            "base": base,
+            "scenarios": [],
+            "statistics": dict(statistics, totalTime=round(time.time() - start_time, 3)),
+        }
+
+    pool_size = min(len(variants), config['numWorkers'])
+    solver_options = dict(base_data.get('solverOptions') or {})
+    # Share the CPU budget between concurrently running scenarios; each
+    # repair gets the shorter scenario time limit
+    solver_options['numWorkers'] = max(1, config['numWorkers'] // pool_size)
+    solver_options['timeLimit'] = min(config['timeLimit'], config['scenarioTimeLimit'])
+    rounds = -(-len(variants) // pool_size)
+    statistics['scenarioBudget'] = round(rounds * solver_options['timeLimit'], 3)
+    payloads = [
+        dict(payload, previousTimetable=base['timetable'], changes=changes, solverOptions=solver_options)
+        for _, payload, changes in variants
+    ]
+    logger.info("Solving %d scenarios with %d processes", len(payloads), pool_size)
+    scenario_start = time.time()
+    if pool_size == 1:
+        outcomes = [_solve_variant(payload) for payload in payloads]
+    else:
+        with ProcessPoolExecutor(max_workers=pool_size) as pool:
+            outcomes = list(pool.map(_solve_variant, payloads))
+        for _, _, templates in outcomes:
+            TEMPLATES.adopt(templates)
+
+    scenarios = []
+    for (name, _, changes), (result, seconds, _) in zip(variants, outcomes):
+        summary = dict(summarize(result, seconds), name=name, changes=changes)
+        if summary['feasible']:
+            summary['objectiveDelta'] = (summary['objective'] - base['objective']
+                                         if summary['objective'] is not None and base['objective'] is not None
+                                         else None)
+            summary['changedSlots'] = result['statistics']['reschedule']['changedSlots']
+            summary['changedClassIds'] = changed_class_ids(summary['timetable'], base['timetable'])
+        summary['attempts'] = result['statistics'].get('reschedule', {}).get('attempts', [])
+        scenarios.append(summary)
+
+    statistics.update(scenarioSeconds=round(time.time() - scenario_start, 3), poolSize=pool_size,
+                      totalTime=round(time.time() - start_time, 3))
+    feasible = sum(1 for summary in scenarios if summary['feasible'])
+    return {
+        "status": base_result['status'],
+        "message": f"Base solved; {feasible} of {len(scenarios)} scenarios feasible",
+        "base": base,
+        "scenarios": scenarios,
+        "statistics": statistics,
+    }
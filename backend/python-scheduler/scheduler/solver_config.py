@@ -0,0 +1,268 @@
+# solver_config.py
+import math
+import os
+
+ALL_DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# How rooms are handled when the payload lists any:
+#   stage - assign rooms after the timetable is fixed
+#   model - add room capacity constraints to the CP-SAT model, then assign
+#   auto  - stage first; re-solve in model mode if some lesson got no room
+ROOM_MODES = ("stage", "model", "auto")
+
+# Settings a request may override under "solverOptions", with the
+# environment variable that supplies the service-wide default
+ENV_VARS = {
+    "timeLimit": "SCHED_TIME_LIMIT",
+    "numWorkers": "SCHED_WORKERS",
+    "randomSeed": "SCHED_RANDOM_SEED",
+    "days": "SCHED_DAYS",
+    "periods": "SCHED_PERIODS",
+    "relativeGap": "SCHED_RELATIVE_GAP",
+    "absoluteGap": "SCHED_ABSOLUTE_GAP",
+    "decompose": "SCHED_DECOMPOSE",
+    "roomAssignment": "SCHED_ROOM_ASSIGNMENT",
+    "strengthen": "SCHED_STRENGTHEN",
+    "searchBranching": "SCHED_SEARCH_BRANCHING",
+    "linearizationLevel": "SCHED_LINEARIZATION_LEVEL",
+    "portfolio": "SCHED_PORTFOLIO",
+    "targetObjective": "SCHED_TARGET_OBJECTIVE",
+    "engine": "SCHED_ENGINE",
+    "heuristicTime": "SCHED_HEURISTIC_TIME",
+    "lnsStepTime": "SCHED_LNS_STEP_TIME",
+    "scenarioTimeLimit": "SCHED_SCENARIO_TIME_LIMIT",
+    "explainTimeLimit": "SCHED_EXPLAIN_TIME_LIMIT",
+}
+
+# Options converted with float(); they must also be finite
+FLOAT_OPTIONS = ("timeLimit", "heuristicTime", "lnsStepTime", "scenarioTimeLimit", "explainTimeLimit",
+                 "relativeGap", "absoluteGap", "targetObjective")
+
+# Timetable engines: CP-SAT, the greedy + local search heuristic alone, the
+# heuristic draft used as the CP-SAT solution hint, or the draft improved
+# by large neighborhood search
+ENGINES = ("cpsat", "heuristic", "hybrid", "lns")
+
+# CP-SAT search strategies a request may pick by name
+SEARCH_BRANCHINGS = (
+    "AUTOMATIC_SEARCH", "FIXED_SEARCH", "PORTFOLIO_SEARCH", "LP_SEARCH",
+    "PSEUDO_COST_SEARCH", "PORTFOLIO_WITH_QUICK_RESTART_SEARCH", "HINT_SEARCH",
+)
+
+# Settings a portfolio member may change; every other setting is shared
+PORTFOLIO_KEYS = ("randomSeed", "searchBranching", "linearizationLevel", "strengthen")
+
+# Members used when the portfolio is given as a count, first N taken.
+# Seeds are offsets from the configured randomSeed.
+PORTFOLIO_MEMBERS = [
+    {},
+    {"randomSeed": 1, "searchBranching": "PORTFOLIO_WITH_QUICK_RESTART_SEARCH"},
+    {"randomSeed": 2, "linearizationLevel": 2},
+    {"randomSeed": 3, "linearizationLevel": 0},
+    {"randomSeed": 4, "searchBranching": "PSEUDO_COST_SEARCH"},
+    {"randomSeed": 5, "searchBranching": "LP_SEARCH", "linearizationLevel": 2},
+    {"randomSeed": 6, "strengthen": True},
+    {"randomSeed": 7, "searchBranching": "FIXED_SEARCH"},
+]
+
+
+def available_cpus():
+    """CPUs this process may actually use, honouring affinity and cgroup quotas"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    # cgroup v2 quota, e.g. "400000 100000" for a 4-core pod
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+
+    return cpus
+
+
+def default_config():
+    """Built-in defaults used when neither the request nor the env set a value"""
+    return {
+        "timeLimit": 30.0,
+        "numWorkers": available_cpus(),
+        "randomSeed": 0,
+        "days": 6,
+        "periods": 6,
+        "relativeGap": None,
+        "absoluteGap": None,
+        "decompose": True,
+        "roomAssignment": "auto",
+        "strengthen": False,
+        "searchBranching": None,
+        "linearizationLevel": None,
+        "portfolio": [],
+        "targetObjective": None,
+        "engine": "cpsat",
+        "heuristicTime": 0.5,
+        "lnsStepTime": 2.0,
+        "scenarioTimeLimit": 5.0,
+        "explainTimeLimit": 10.0,
+    }
+
+
+def env_config(environ=None):
+    """Settings supplied through SCHED_* environment variables"""
+    environ = os.environ if environ is None else environ
+    return {key: environ[var] for key, var in ENV_VARS.items() if environ.get(var, "") != ""}
+
+
+def resolve_config(overrides=None, environ=None):
+    """Merge defaults, environment and per-request overrides into a validated config
+
+    Raises:
+        ValueError: If a setting is unknown or out of range
+    """
+    overrides = overrides or {}
+    unknown = set(overrides) - set(ENV_VARS)
+    if unknown:
+        raise ValueError(f"Unknown solver option(s): {', '.join(sorted(unknown))}")
+
+    config = default_config()
+    config.update(env_config(environ))
+    config.update({key: value for key, value in overrides.items() if value is not None})
+
+    try:
+        config["timeLimit"] = float(config["timeLimit"])
+        config["heuristicTime"] = float(config["heuristicTime"])
+        config["lnsStepTime"] = float(config["lnsStepTime"])
+        config["scenarioTimeLimit"] = float(config["scenarioTimeLimit"])
+        config["explainTimeLimit"] = float(config["explainTimeLimit"])
+        config["numWorkers"] = int(config["numWorkers"])
+        config["randomSeed"] = int(config["randomSeed"])
+        config["periods"] = int(config["periods"])
+        for key in ("relativeGap", "absoluteGap", "targetObjective"):
+            if config[key] is not None:
+                config[key] = float(config[key])
+        if config["linearizationLevel"] is not None:
+            config["linearizationLevel"] = int(config["linearizationLevel"])
+    except (TypeError, ValueError):
+        raise ValueError("Solver options must be numeric")
+    # float() accepts "nan" and "inf", which no time limit or gap can be
+    for key in FLOAT_OPTIONS:
+        if config[key] is not None and not math.isfinite(config[key]):
+            raise ValueError(f"{key} must be a finite number")
+
+    config["days"] = _resolve_days(config["days"])
+    config["decompose"] = _resolve_bool(config["decompose"], "decompose")
+    config["strengthen"] = _resolve_bool(config["strengthen"], "strengthen")
+    config["portfolio"] = _resolve_portfolio(config["portfolio"], config["randomSeed"])
+    if config["searchBranching"] is not None and config["searchBranching"] not in SEARCH_BRANCHINGS:
+        raise ValueError(f"searchBranching must be one of {', '.join(SEARCH_BRANCHINGS)}")
+    if config["linearizationLevel"] is not None and not 0 <= config["linearizationLevel"] <= 2:
+        raise ValueError("linearizationLevel must be 0, 1 or 2")
+    if config["engine"] not in ENGINES:
+        raise ValueError(f"engine must be one of {', '.join(ENGINES)}")
+    if config["roomAssignment"] not in ROOM_MODES:
+        raise ValueError(f"roomAssignment must be one of {', '.join(ROOM_MODES)}")
+
+    if config["timeLimit"] <= 0:
+        raise ValueError("timeLimit must be positive")
+    if config["heuristicTime"] < 0:
+        raise ValueError("heuristicTime must not be negative")
+    if config["lnsStepTime"] <= 0:
+        raise ValueError("lnsStepTime must be positive")
+    if config["scenarioTimeLimit"] <= 0:
+        raise ValueError("scenarioTimeLimit must be positive")
+    if config["explainTimeLimit"] < 0:
+        raise ValueError("explainTimeLimit must not be negative")
+    if config["numWorkers"] < 1:
+        raise ValueError("numWorkers must be at least 1")
+    if config["periods"] < 1:
+        raise ValueError("periods must be at least 1")
+    for key in ("relativeGap", "absoluteGap"):
+        if config[key] is not None and config[key] < 0:
+            raise ValueError(f"{key} must not be negative")
+
+    # Members are checked as the complete config each one runs with
+    for member in config["portfolio"]:
+        resolve_config(dict(config, portfolio=0, **member), environ)
+
+    return config
+
+
+def _resolve_bool(value, name):
+    """Accept booleans and the usual true/false strings from the environment"""
+    if isinstance(value, bool):
+        return value
+    if str(value).strip().lower() in ("1", "true", "yes", "on"):
+        return True
+    if str(value).strip().lower() in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(f"{name} must be true or false")
+
+
+def _resolve_portfolio(portfolio, random_seed):
+    """Accept a member count or an explicit list of member settings
+
+    A count takes the first members of PORTFOLIO_MEMBERS, with seeds offset
+    from the configured randomSeed; 0 or 1 turns the portfolio off. Returns
+    the list of member settings, empty when off.
+    """
+    if isinstance(portfolio, list):
+        members = []
+        for member in portfolio:
+            if not isinstance(member, dict):
+                raise ValueError("portfolio members must be objects")
+            unknown = set(member) - set(PORTFOLIO_KEYS)
+            if unknown:
+                raise ValueError(f"Unknown portfolio setting(s): {', '.join(sorted(unknown))}")
+            members.append(dict(member))
+        return members if len(members) > 1 else []
+
+    try:
+        count = int(portfolio)
+    except (TypeError, ValueError):
+        raise ValueError("portfolio must be a member count or a list of member settings")
+    if not 0 <= count <= len(PORTFOLIO_MEMBERS):
+        raise ValueError(f"portfolio must be between 0 and {len(PORTFOLIO_MEMBERS)}")
+    if count <= 1:
+        return []
+    return [
+        dict(member, randomSeed=random_seed + member.get("randomSeed", 0))
+        for member in PORTFOLIO_MEMBERS[:count]
+    ]
+
+
+def _resolve_days(days):
+    """Accept a day count (first N weekdays) or an explicit list of day names"""
+    if isinstance(days, str) and not days.strip().isdigit():
+        days = [day.strip() for day in days.split(",") if day.strip()]
+    if isinstance(days, list):
+        unknown = [day for day in days if day not in ALL_DAYS]
+        if unknown or not days:
+            raise ValueError(f"days must be a non-empty list of {', '.join(ALL_DAYS)}")
+        return list(days)
+
+    try:
+        count = int(days)
+    except (TypeError, ValueError):
+        raise ValueError("days must be a number or a list of day names")
+    if not 1 <= count <= len(ALL_DAYS):
+        raise ValueError(f"days must be between 1 and {len(ALL_DAYS)}")
+    return ALL_DAYS[:count]
+
+
+def apply_to_solver(config, solver):
+    """Copy the resolved config onto CP-SAT solver parameters"""
+    solver.parameters.max_time_in_seconds = config["timeLimit"]
+    solver.parameters.num_search_workers = config["numWorkers"]
+    solver.parameters.random_seed = config["randomSeed"]
+    if config["relativeGap"] is not None:
+        solver.parameters.relative_gap_limit = config["relativeGap"]
+    if config["absoluteGap"] is not None:
+        solver.parameters.absolute_gap_limit = config["absoluteGap"]
+    if config["searchBranching"] is not None:
+        branching = type(solver.parameters).SearchBranching
+        solver.parameters.search_branching = branching.Value(config["searchBranching"])
+    if config["linearizationLevel"] is not None:
+        solver.parameters.linearization_level = config["linearizationLevel"]
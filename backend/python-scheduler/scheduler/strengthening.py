@@ -0,0 +1,244 @@
+# strengthening.py
+import logging
+import math
+from collections import defaultdict
+
+from rooms import student_count
+
+logger = logging.getLogger("timetable-scheduler")
+
+# Lab periods of one class and subject within a day: runs of exactly two
+# (a pair) separated by at least one other period. States: 0 outside a
+# pair, 1 inside the first period of a pair, 2 just after a full pair.
+LAB_PAIR_TRANSITIONS = [
+    (0, 0, 0), (0, 1, 1),
+    (1, 1, 2),
+    (2, 0, 0),
+]
+LAB_PAIR_FINAL_STATES = [0, 2]
+
+
+def add_model_strengthening(scheduler, is_sub, lab_starts, teacher_slots):
+    """Add symmetry-breaking and redundant constraints that keep feasibility
+
+    Symmetry breaking (skipped when a previous timetable is pinned or
+    hinted, since that singles out one of the symmetric solutions):
+
+    - days whose payload data (fixed slots, teacher unavailable and
+      preferred slots) is the same are interchangeable, and so are the
+      periods of a day read backwards when that day has no such data;
+    - classes with the same subjects, teachers, hours and size and no fixed
+      slot are interchangeable.
+
+    One reference class orders both: each data-free day is oriented so its
+    reference timetable is lexicographically no larger than the reverse,
+    interchangeable days are sorted by their reference timetables, and
+    interchangeable classes are sorted by the slot of their first lesson in
+    one subject they all take. Any solution
+    can be turned into one meeting all three by reversing days, then
+    permuting days, then permuting classes, so no timetable is lost up to
+    symmetry.
+
+    Redundant constraints, implied by the model but stated directly so
+    propagation and the LP relaxation see them: weekly lessons per class
+    and per teacher, per-day caps for theory subjects, lab pair counts and
+    an automaton for the pair pattern of every lab day.
+
+    Returns counts for the model statistics.
+    """
+    stats = {"classGroups": 0, "dayGroups": 0, "reversibleDays": 0, "impliedConstraints": 0}
+    _add_implied_constraints(scheduler, is_sub, lab_starts, teacher_slots, stats)
+    if not scheduler.previous_assignment:
+        _add_symmetry_breaking(scheduler, is_sub, stats)
+    return stats
+
+
+def _add_implied_constraints(scheduler, is_sub, lab_starts, teacher_slots, stats):
+    model = scheduler.model
+    num_days = len(scheduler.days)
+    num_periods = len(scheduler.periods)
+    theory_per_day = math.ceil(num_periods / 2)
+    hours = _class_hours(scheduler)
+
+    # Weekly lessons per class and per teacher equal the hours they are
+    # given (summed over listed subjects only: dense or fixed-only subjects
+    # have no hour requirement)
+    class_totals = defaultdict(int)
+    for (class_idx, _), count in hours.items():
+        class_totals[class_idx] += count
+    class_lessons = defaultdict(list)
+    for (class_idx, day_idx, period_idx, subject_idx), var in is_sub.items():
+        if (class_idx, subject_idx) in hours:
+            class_lessons[class_idx].append(var)
+    for class_idx, literals in class_lessons.items():
+        model.Add(sum(literals) == class_totals[class_idx])
+        stats["impliedConstraints"] += 1
+
+    teacher_totals = defaultdict(int)
+    for (class_idx, subject_idx), count in hours.items():
+        teacher_id = scheduler._get_teacher_for_subject(
+            scheduler.class_ids[class_idx], scheduler.subject_ids[subject_idx]
+        )
+        if teacher_id in scheduler.teacher_to_index:
+            teacher_totals[scheduler.teacher_to_index[teacher_id]] += count
+    teacher_week = defaultdict(list)
+    for (teacher_idx, _, _), literals in teacher_slots.items():
+        teacher_week[teacher_idx].extend(literals)
+    for teacher_idx, literals in teacher_week.items():
+        model.Add(sum(literals) == teacher_totals[teacher_idx])
+        stats["impliedConstraints"] += 1
+
+    for (class_idx, subject_idx), count in hours.items():
+        if subject_idx in scheduler.lab_subjects:
+            starts = [lab_starts[(class_idx, day_idx, period_idx, subject_idx)]
+                      for day_idx in range(num_days) for period_idx in range(num_periods - 1)]
+            if count % 2 == 0 and starts:
+                model.Add(sum(starts) == count // 2)
+                stats["impliedConstraints"] += 1
+            for day_idx in range(num_days):
+                sequence = [is_sub[(class_idx, day_idx, period_idx, subject_idx)] for period_idx in range(num_periods)]
+                model.AddAutomaton(sequence, 0, LAB_PAIR_FINAL_STATES, LAB_PAIR_TRANSITIONS)
+                stats["impliedConstraints"] += 1
+        elif count > theory_per_day:
+            # Theory lessons never sit back to back, so at most every other period
+            for day_idx in range(num_days):
+                model.Add(sum(is_sub[(class_idx, day_idx, period_idx, subject_idx)]
+                              for period_idx in range(num_periods)) <= theory_per_day)
+                stats["impliedConstraints"] += 1
+
+
+def _class_hours(scheduler):
+    """(class index, subject index) -> weekly hours, first listing wins"""
+    hours = {}
+    for class_idx, class_id in enumerate(scheduler.class_ids):
+        for subject_info in scheduler.classes_dict[class_id].get('subjects', []):
+            subject_idx = scheduler.subject_to_index.get(subject_info['subjectId'])
+            if subject_idx is not None:
+                hours.setdefault((class_idx, subject_idx), subject_info.get('hoursPerWeek', 1))
+    return hours
+
+
+def _day_signatures(scheduler):
+    """Payload data attached to each day; days with equal signatures are interchangeable"""
+    signatures = defaultdict(set)
+    for slot in scheduler.data.get('fixedSlots', []):
+        day_idx = scheduler._day_index(slot['day'])
+        if day_idx is not None:
+            signatures[day_idx].add(("fixed", slot['classId'], slot['period'], slot.get('subjectId')))
+    for teacher in scheduler.data.get('teachers', []):
+        for field in ('unavailableSlots', 'preferredSlots'):
+            for slot in teacher.get(field, []):
+                day_idx = scheduler._day_index(slot['day'])
+                if day_idx is not None:
+                    signatures[day_idx].add((field, teacher['id'], slot['period']))
+    return [frozenset(signatures[day_idx]) for day_idx in range(len(scheduler.days))]
+
+
+def _class_groups(scheduler):
+    """Groups of two or more interchangeable class indices"""
+    fixed_classes = {slot['classId'] for slot in scheduler.data.get('fixedSlots', [])}
+    hours = _class_hours(scheduler)
+    groups = defaultdict(list)
+    for class_idx, class_id in enumerate(scheduler.class_ids):
+        if class_id in fixed_classes or not scheduler.class_subjects[class_idx]:
+            continue
+        key = (
+            tuple(sorted(
+                (subject_id, teacher_id, hours.get((class_idx, scheduler.subject_to_index.get(subject_id)), 0))
+                for subject_id, teacher_id in scheduler.subject_teacher[class_id].items()
+            )),
+            tuple(scheduler.class_subjects[class_idx]),
+            student_count(scheduler, class_id),
+        )
+        groups[key].append(class_idx)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def _add_symmetry_breaking(scheduler, is_sub, stats):
+    num_days = len(scheduler.days)
+    num_periods = len(scheduler.periods)
+    class_groups = _class_groups(scheduler)
+    grouped = {class_idx for group in class_groups for class_idx in group}
+
+    # Reference class: outside every class group, or taken out of one
+    reference = next(
+        (class_idx for class_idx in range(len(scheduler.class_ids))
+         if class_idx not in grouped and scheduler.class_subjects[class_idx]),
+        None
+    )
+    if reference is None and class_groups:
+        reference = class_groups[0].pop(0)
+        class_groups = [group for group in class_groups if len(group) > 1]
+
+    values = {}
+
+    def slot_value(class_idx, day_idx, period_idx):
+        """Subject index + 1 taught in a slot, 0 for a free period"""
+        key = (class_idx, day_idx, period_idx)
+        if key not in values:
+            domain = scheduler.class_subjects[class_idx]
+            var = scheduler.model.NewIntVar(0, len(scheduler.subject_ids), f"slot_value_C{class_idx}_D{day_idx}_P{period_idx}")
+            scheduler.model.Add(var == sum((subject_idx + 1) * is_sub[key + (subject_idx,)] for subject_idx in domain))
+            values[key] = var
+        return values[key]
+
+    if reference is not None:
+        signatures = _day_signatures(scheduler)
+        for day_idx in range(num_days):
+            if not signatures[day_idx] and num_periods > 1:
+                day = [slot_value(reference, day_idx, p) for p in range(num_periods)]
+                half = num_periods // 2
+                _add_lex_less_equal(scheduler.model, day[:half], day[::-1][:half], f"reverse_D{day_idx}")
+                stats["reversibleDays"] += 1
+
+        day_groups = defaultdict(list)
+        for day_idx, signature in enumerate(signatures):
+            day_groups[signature].append(day_idx)
+        for days in day_groups.values():
+            if len(days) < 2:
+                continue
+            stats["dayGroups"] += 1
+            for first, second in zip(days, days[1:]):
+                _add_lex_less_equal(
+                    scheduler.model,
+                    [slot_value(reference, first, p) for p in range(num_periods)],
+                    [slot_value(reference, second, p) for p in range(num_periods)],
+                    f"days_{first}_{second}"
+                )
+
+    hours = _class_hours(scheduler)
+    for group in class_groups:
+        # Sections are ordered by their first lesson of one subject, a plain
+        # clause per slot instead of a lexicographic order over the week
+        subject_idx = next((s for s in scheduler.class_subjects[group[0]] if hours.get((group[0], s), 0) > 0), None)
+        if subject_idx is None:
+            continue
+        stats["classGroups"] += 1
+        slots = [(d, p) for d in range(num_days) for p in range(num_periods)]
+        for first, second in zip(group, group[1:]):
+            for position, (day_idx, period_idx) in enumerate(slots):
+                earlier = [is_sub[(first, d, p, subject_idx)] for d, p in slots[:position + 1]]
+                scheduler.model.AddBoolOr(earlier + [is_sub[(second, day_idx, period_idx, subject_idx)].Not()])
+
+
+def _add_lex_less_equal(model, xs, ys, name):
+    """xs <= ys lexicographically
+
+    prefix[i] is true exactly when xs and ys agree on the first i entries;
+    wherever it is true the next entry of xs may not exceed that of ys.
+    """
+    prefix = None
+    for idx, (x, y) in enumerate(zip(xs, ys)):
+        constraint = model.Add(x <= y)
+        if prefix is not None:
+            constraint.OnlyEnforceIf(prefix)
+        if idx == len(xs) - 1:
+            break
+        equal = model.NewBoolVar(f"lex_{name}_{idx}")
+        model.Add(x == y).OnlyEnforceIf(equal)
+        if prefix is not None:
+            model.AddImplication(equal, prefix)
+            model.Add(x != y).OnlyEnforceIf([prefix, equal.Not()])
+        else:
+            model.Add(x != y).OnlyEnforceIf(equal.Not())
+        prefix = equal
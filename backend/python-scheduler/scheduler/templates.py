@@ -0,0 +1,256 @@
+# templates.py
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from timetable_array import solution_variables
+
+logger = logging.getLogger("timetable-scheduler")
+
+# Structural models kept per process; 0 turns template reuse off
+TEMPLATE_CACHE_SIZE = int(os.environ.get("SCHED_TEMPLATE_CACHE_SIZE", 8))
+
+# Timer phases whose model growth a template stands in for
+STRUCTURE_PHASES = ("subjectVariables", "subjectCounts", "subjectSequencing",
+                    "teacherOccupancy", "teacherRules", "softGoals")
+
+# Rules whose hard/soft choice changes the structural constraints
+STRUCTURE_RULES = ("teacherDailyLimit", "teacherWeeklyLimit", "teacherNoConsecutive")
+
+
+def structure_key(scheduler):
+    """Hash of everything the structural part of a scheduler's model depends on
+
+    Fixed slots, unavailable and preferred slots, rooms and previous
+    timetables only add request constraints on top, so requests differing
+    in just those share a key. Fixed slots that widen a class's subject
+    domain change the variables and are covered through the domains.
+    """
+    teachers = scheduler.teachers_dict
+    structure = {
+        "sparse": scheduler.sparse,
+        "days": scheduler.days,
+        "periods": len(scheduler.periods),
+        "classes": [
+            [class_id, [
+                [info['subjectId'], info['teacherId'], info.get('hoursPerWeek', 1)]
+                for info in scheduler.classes_dict[class_id].get('subjects', [])
+            ]]
+            for class_id in scheduler.class_ids
+        ],
+        "domains": [scheduler.class_subjects[class_idx] for class_idx in range(len(scheduler.class_ids))],
+        "subjects": scheduler.subject_ids,
+        "labs": sorted(scheduler.lab_subjects),
+        "teachers": [
+            [teacher_id, scheduler._teacher_daily_limit(teachers[teacher_id]), teachers[teacher_id].get('maxHoursPerWeek')]
+            for teacher_id in scheduler.teacher_ids
+        ],
+        "rules": [scheduler.objective['rules'][rule] for rule in STRUCTURE_RULES],
+        # Penalty groups are only collected (and goals only built) when weighted
+        "weighted": sorted(group for group, weight in scheduler.objective['weights'].items() if weight),
+    }
+    encoded = json.dumps(structure, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class VariableMap(Mapping):
+    """Keys mapped to model variables of a cloned template, wrapped on first use
+
+    indices holds a proto index per key, or a tuple of them for keys that
+    map to a list of literals (teacher_slots).
+    """
+
+    def __init__(self, variable, indices):
+        self._variable = variable
+        self._indices = indices
+
+    def __getitem__(self, key):
+        index = self._indices[key]
+        if isinstance(index, tuple):
+            return [self._variable(i) for i in index]
+        return self._variable(index)
+
+    def __contains__(self, key):
+        return key in self._indices
+
+    def __iter__(self):
+        return iter(self._indices)
+
+    def __len__(self):
+        return len(self._indices)
+
+
+class ModelTemplate:
+    """Serialized structural model plus what is needed to add to a clone of it"""
+
+    def __init__(self, proto, is_sub, lab_starts, teacher_slots, penalties, model_size, build_seconds, variables):
+        self.proto = proto
+        self.is_sub = is_sub
+        self.lab_starts = lab_starts
+        self.teacher_slots = teacher_slots
+        self.penalties = penalties
+        self.model_size = model_size
+        self.build_seconds = build_seconds
+        self.solution_variables = variables
+
+    @classmethod
+    def capture(cls, scheduler, is_sub, lab_starts, teacher_slots):
+        """Template of a scheduler's model right after its structural part was built"""
+        from ortools.sat.python import cp_model
+
+        penalties = {}
+        for group, expressions in scheduler.penalties.items():
+            terms = []
+            for expression in expressions:
+                if isinstance(expression, int):
+                    terms.append(((), (), expression))
+                    continue
+                if isinstance(expression, cp_model.IntVar):
+                    terms.append(((expression.Index(),), (1,), 0))
+                    continue
+                coefficients, constant = expression.GetIntegerVarValueMap()
+                terms.append((
+                    tuple(var.Index() for var in coefficients),
+                    tuple(coefficients.values()),
+                    constant
+                ))
+            penalties[group] = terms
+
+        variables = solution_variables(is_sub)
+        for array in variables:
+            # Shared by every scheduler cloned from the template
+            array.setflags(write=False)
+
+        timer = scheduler.timer
+        return cls(
+            proto=scheduler.model.Proto().SerializeToString(),
+            is_sub={key: var.Index() for key, var in is_sub.items()},
+            lab_starts={key: var.Index() for key, var in lab_starts.items()},
+            teacher_slots={key: tuple(var.Index() for var in literals) for key, literals in teacher_slots.items()},
+            penalties=penalties,
+            model_size={name: dict(timer.model_size[name]) for name in STRUCTURE_PHASES if name in timer.model_size},
+            build_seconds=sum(timer.phases.get(name, 0.0) for name in STRUCTURE_PHASES),
+            variables=variables,
+        )
+
+    def apply(self, scheduler):
+        """Load the structural model into a fresh scheduler
+
+        Returns (is_sub, lab_starts, teacher_slots) as read-only mappings
+        onto the cloned model's variables.
+        """
+        from ortools.sat.python import cp_model
+
+        start = time.perf_counter()
+        model = scheduler.model
+        model.Proto().ParseFromString(self.proto)
+
+        wrapped = {}
+
+        def variable(index):
+            var = wrapped.get(index)
+            if var is None:
+                var = wrapped[index] = model.GetIntVarFromProtoIndex(index)
+            return var
+
+        def expression(indices, coefficients, constant):
+            if len(indices) == 1 and coefficients[0] == 1 and constant == 0:
+                return variable(indices[0])
+            return cp_model.LinearExpr.WeightedSum([variable(i) for i in indices], coefficients) + constant
+
+        for group, terms in self.penalties.items():
+            scheduler.penalties[group] = [expression(*term) for term in terms]
+        scheduler.solution_variables = self.solution_variables
+        scheduler.timer.model_size.update(copy.deepcopy(self.model_size))
+        scheduler.timer.phases["template"] = time.perf_counter() - start
+        return (
+            VariableMap(variable, self.is_sub),
+            VariableMap(variable, self.lab_starts),
+            VariableMap(variable, self.teacher_slots),
+        )
+
+
+class ModelTemplateCache:
+    """LRU of structural model templates keyed by structure_key
+
+    Solves often run in short-lived child processes (jobs, components,
+    portfolio members). A child hands the templates it stored back with
+    take_captured, and the parent keeps them with adopt, so the next child
+    forked from the parent starts with them.
+    """
+
+    def __init__(self, max_entries=TEMPLATE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        # Key -> pid of the process that stored or adopted it, not yet taken
+        self.captured = {}
+        self.lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "adopted": 0, "evictions": 0}
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, key):
+        with self.lock:
+            template = self.entries.get(key)
+            if template is None:
+                self.counters["misses"] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return template
+
+    def put(self, key, template):
+        with self.lock:
+            self._store(key, template)
+            self.counters["stores"] += 1
+
+    def adopt(self, templates):
+        """Keep templates a child process stored (from its take_captured)"""
+        if not self.enabled:
+            return
+        with self.lock:
+            for key, template in templates:
+                for array in template.solution_variables:
+                    array.setflags(write=False)
+                self._store(key, template)
+                self.counters["adopted"] += 1
+
+    def take_captured(self):
+        """(key, template) pairs this process stored since the last call"""
+        pid = os.getpid()
+        with self.lock:
+            taken = [(key, self.entries[key]) for key, owner in self.captured.items()
+                     if owner == pid and key in self.entries]
+            self.captured.clear()
+        return taken
+
+    def _store(self, key, template):
+        """Insert and evict down to max_entries (lock held)"""
+        self.entries[key] = template
+        self.entries.move_to_end(key)
+        self.captured[key] = os.getpid()
+        while len(self.entries) > self.max_entries:
+            evicted, _ = self.entries.popitem(last=False)
+            self.captured.pop(evicted, None)
+            self.counters["evictions"] += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.captured.clear()
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, entries=len(self.entries))
+
+
+# Shared by every scheduler in this process
+TEMPLATES = ModelTemplateCache()
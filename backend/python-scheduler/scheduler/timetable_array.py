@@ -0,0 +1,240 @@
+# timetable_array.py
+import numpy as np
+
+MISSING = -1
+
+
+class Interner:
+    """Dense integer codes for IDs, in first-seen order"""
+
+    def __init__(self, values=()):
+        self.values = []
+        self.codes = {}
+        for value in values:
+            self.code(value)
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def encode(self, values):
+        return np.fromiter((self.code(value) for value in values), dtype=np.int64)
+
+    def __len__(self):
+        return len(self.values)
+
+
+def solution_variables(is_sub):
+    """Coordinates and model indices of every subject variable, in creation order
+
+    Returns (coords, indices): coords is an (N, 4) array of (class, day,
+    period, subject) indices and indices holds each variable's position in
+    the model, so a solver response vector can be read with one fancy index.
+    """
+    coords = np.array(list(is_sub.keys()), dtype=np.int64).reshape(-1, 4)
+    indices = np.fromiter((var.Index() for var in is_sub.values()), dtype=np.int64, count=len(is_sub))
+    return coords, indices
+
+
+def response_values(solver):
+    """All variable values of the current solution as an int array"""
+    response = solver.Response() if hasattr(solver, "Response") else solver.ResponseProto()
+    return np.array(response.solution, dtype=np.int64)
+
+
+class TimetableArray:
+    """A timetable as parallel integer arrays, one entry per lesson
+
+    Each lesson holds interned class, day, period, subject, teacher and room
+    codes (MISSING where the lesson has none). Usage counts, per-slot
+    conflicts and the byClass/byTeacher/byRoom views are computed with
+    bincount/unique/argsort passes over these arrays instead of rescanning
+    dicts per entity. items keeps the original dicts when the array was
+    built from a list of lessons so views can return them unchanged.
+    """
+
+    FIELDS = ("class", "day", "period", "subject", "teacher", "room")
+    ITEM_KEYS = {"class": "classId", "day": "day", "period": "period",
+                 "subject": "subjectId", "teacher": "teacherId", "room": "roomId"}
+
+    def __init__(self, codes, interners, items=None):
+        self.codes = codes
+        self.interners = interners
+        self.items = items
+
+    @classmethod
+    def from_solution(cls, scheduler, values, variables):
+        """Lessons of a solver solution, in class/day/period order"""
+        coords, indices = variables
+        lessons = coords[values[indices] == 1]
+        class_idx, day_idx, period_idx, subject_idx = lessons.T
+
+        teachers = Interner(scheduler.teacher_ids)
+        teacher_of = np.full((len(scheduler.class_ids), len(scheduler.subject_ids)), MISSING, dtype=np.int64)
+        for class_pos, class_id in enumerate(scheduler.class_ids):
+            for subject_id, teacher_id in scheduler.subject_teacher.get(class_id, {}).items():
+                subject_pos = scheduler.subject_to_index.get(subject_id)
+                if subject_pos is not None:
+                    teacher_of[class_pos, subject_pos] = teachers.code(teacher_id)
+        teacher_idx = teacher_of[class_idx, subject_idx]
+        if (teacher_idx == MISSING).any():
+            # Subjects a class is fixed to without a teacher, as before
+            teacher_idx = np.where(teacher_idx == MISSING, teachers.code(None), teacher_idx)
+
+        codes = {
+            "class": class_idx, "day": day_idx, "period": period_idx, "subject": subject_idx,
+            "teacher": teacher_idx, "room": np.full(len(lessons), MISSING, dtype=np.int64),
+        }
+        interners = {
+            "class": Interner(scheduler.class_ids), "day": Interner(scheduler.days),
+            "period": Interner(scheduler.periods), "subject": Interner(scheduler.subject_ids),
+            "teacher": teachers, "room": Interner(),
+        }
+        return cls(codes, interners)
+
+    @classmethod
+    def from_items(cls, items, known=None):
+        """Intern a list of lesson dicts; known pre-seeds interners per field"""
+        known = known or {}
+        interners = {field: Interner(known.get(field, ())) for field in cls.FIELDS}
+        codes = {}
+        for field in cls.FIELDS:
+            key = cls.ITEM_KEYS[field]
+            interner = interners[field]
+            if field in ("class", "day", "period"):
+                codes[field] = interner.encode(item[key] for item in items)
+            elif field == "room":
+                # Lessons without a room are not interned
+                codes[field] = np.fromiter(
+                    (MISSING if item.get(key) is None else interner.code(item[key]) for item in items),
+                    dtype=np.int64, count=len(items)
+                )
+            else:
+                codes[field] = interner.encode(item.get(key) for item in items)
+        return cls(codes, interners, items=items)
+
+    def __len__(self):
+        return len(self.codes["class"])
+
+    def to_items(self):
+        """Lesson dicts in the /schedule response format"""
+        columns = [self.decode(field) for field in ("class", "day", "period", "subject", "teacher")]
+        items = [
+            {"classId": class_id, "day": day, "period": period, "subjectId": subject_id, "teacherId": teacher_id}
+            for class_id, day, period, subject_id, teacher_id in zip(*columns)
+        ]
+        rooms = self.codes["room"]
+        if (rooms != MISSING).any():
+            for item, room_id in zip(items, self.decode("room")):
+                item["roomId"] = room_id
+        return items
+
+    def decode(self, field):
+        values = self.interners[field].values
+        return [values[code] if code != MISSING else None for code in self.codes[field].tolist()]
+
+    def counts(self, field):
+        """Lessons per ID of a field, for IDs with at least one lesson"""
+        codes = self.codes[field]
+        codes = codes[codes != MISSING]
+        totals = np.bincount(codes, minlength=len(self.interners[field]))
+        values = self.interners[field].values
+        return {values[code]: int(totals[code]) for code in np.flatnonzero(totals).tolist()}
+
+    def usage(self, field, ids):
+        """Lessons per ID for every given ID, zero included"""
+        counts = self.counts(field)
+        return {entity_id: counts.get(entity_id, 0) for entity_id in ids}
+
+    def grid(self, field="subject"):
+        """Dense (class, day, period) array of a field's codes; MISSING where free"""
+        shape = (len(self.interners["class"]), len(self.interners["day"]), len(self.interners["period"]))
+        grid = np.full(shape, MISSING, dtype=np.int64)
+        grid[self.codes["class"], self.codes["day"], self.codes["period"]] = self.codes[field]
+        return grid
+
+    def slot_usage(self):
+        """(day, period) array of scheduled lessons"""
+        num_periods = len(self.interners["period"])
+        slots = self.codes["day"] * num_periods + self.codes["period"]
+        return np.bincount(slots, minlength=len(self.interners["day"]) * num_periods).reshape(-1, num_periods)
+
+    def double_bookings(self, field):
+        """Lessons whose (field, day, period) slot was already taken by an earlier lesson
+
+        Returns (positions, first_positions): the repeated lessons in order
+        and, for each, the lesson that took the slot first.
+        """
+        codes = self.codes[field]
+        num_days, num_periods = len(self.interners["day"]), len(self.interners["period"])
+        keys = (codes * num_days + self.codes["day"]) * num_periods + self.codes["period"]
+        keys = np.where(codes == MISSING, MISSING, keys)
+
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        positions = np.flatnonzero((first[inverse] != np.arange(len(keys))) & (keys != MISSING))
+        return positions, first[inverse[positions]]
+
+    def conflicts(self):
+        """Teacher, class and room double bookings, in lesson order"""
+        found = []
+        for order, (field, conflict_type) in enumerate((
+            ("teacher", "teacher_double_booking"),
+            ("class", "class_double_booking"),
+            ("room", "room_double_booking"),
+        )):
+            positions, _ = self.double_bookings(field)
+            found.extend((position, order, field, conflict_type) for position in positions.tolist())
+        found.sort()
+
+        values = {field: self.interners[field].values for field in self.FIELDS}
+        conflicts = []
+        for position, _, field, conflict_type in found:
+            entity_id = values[field][self.codes[field][position]]
+            day = values["day"][self.codes["day"][position]]
+            period = values["period"][self.codes["period"][position]]
+            conflict = {"type": conflict_type, self.ITEM_KEYS[field]: entity_id, "day": day, "period": period}
+            if field == "class":
+                conflict["message"] = f"Class {entity_id} has overlapping subjects at {day} period {period}"
+            else:
+                conflict["message"] = f"{field.capitalize()} {entity_id} double-booked at {day} period {period}"
+            conflicts.append(conflict)
+        return conflicts
+
+    def groups(self, field):
+        """Lesson positions grouped by a field's ID, lesson order kept within a group"""
+        codes = self.codes[field]
+        present = np.flatnonzero(codes != MISSING)
+        order = present[np.argsort(codes[present], kind="stable")]
+        sorted_codes = codes[order]
+        boundaries = np.flatnonzero(np.diff(sorted_codes)) + 1
+        values = self.interners[field].values
+        return {
+            values[group_codes[0]]: positions
+            for positions, group_codes in zip(np.split(order, boundaries), np.split(sorted_codes, boundaries))
+            if len(positions)
+        }
+
+    def views(self):
+        """The byClass (per day), byTeacher and byRoom views of the lessons"""
+        items = self.items if self.items is not None else self.to_items()
+        day_values = self.interners["day"].values
+        by_class = {}
+        for class_id, positions in self.groups("class").items():
+            days = {}
+            for position in positions.tolist():
+                days.setdefault(day_values[self.codes["day"][position]], []).append(items[position])
+            by_class[class_id] = days
+        return {
+            "byClass": by_class,
+            "byTeacher": {
+                teacher_id: [items[position] for position in positions.tolist()]
+                for teacher_id, positions in self.groups("teacher").items()
+            },
+            "byRoom": {
+                room_id: [items[position] for position in positions.tolist()]
+                for room_id, positions in self.groups("room").items()
+            },
+        }
@@ -1,6 +1,8 @@
 import logging
 from typing import List, Dict, Any
 
+from timetable_array import TimetableArray
+
 logger = logging.getLogger(__name__)
 
 def validate_input_data(classes: List[Dict], teachers: List[Dict], 
@@ -102,47 +104,15 @@ def format_solution(timetable: List[Dict]) -> Dict[str, Any]:
     Returns:
         Formatted timetable organized by class and day
     """
-    formatted = {
-        'byClass': {},
-        'byTeacher': {},
-        'byRoom': {},
+    views = TimetableArray.from_items(timetable).views()
+    return {
+        **views,
         'summary': {
             'totalSlots': len(timetable),
             'fixedSlots': sum(1 for slot in timetable if slot.get('fixed', False)),
             'scheduledSlots': sum(1 for slot in timetable if slot.get('subjectId'))
         }
     }
-    
-    # Organize by class
-    for slot in timetable:
-        class_id = slot['classId']
-        day = slot['day']
-        
-        if class_id not in formatted['byClass']:
-            formatted['byClass'][class_id] = {}
-        
-        if day not in formatted['byClass'][class_id]:
-            formatted['byClass'][class_id][day] = []
-        
-        formatted['byClass'][class_id][day].append(slot)
-    
-    # Organize by teacher
-    for slot in timetable:
-        if 'teacherId' in slot:
-            teacher_id = slot['teacherId']
-            if teacher_id not in formatted['byTeacher']:
-                formatted['byTeacher'][teacher_id] = []
-            formatted['byTeacher'][teacher_id].append(slot)
-    
-    # Organize by room
-    for slot in timetable:
-        if 'roomId' in slot:
-            room_id = slot['roomId']
-            if room_id not in formatted['byRoom']:
-                formatted['byRoom'][room_id] = []
-            formatted['byRoom'][room_id].append(slot)
-    
-    return formatted
 
 def calculate_statistics(timetable: List[Dict], classes: List[Dict], 
                         teachers: List[Dict], rooms: List[Dict]) -> Dict[str, Any]:
@@ -158,38 +128,30 @@ def calculate_statistics(timetable: List[Dict], classes: List[Dict],
     Returns:
         Statistics dictionary
     """
+    class_ids = [class_obj['id'] for class_obj in classes]
+    teacher_ids = [teacher['id'] for teacher in teachers]
+    room_ids = [room['id'] for room in rooms]
+    solution = TimetableArray.from_items(
+        timetable, known={'class': class_ids, 'teacher': teacher_ids, 'room': room_ids}
+    )
+
     stats = {
-        'classUsage': {},
-        'teacherUsage': {},
-        'roomUsage': {},
+        'classUsage': solution.usage('class', class_ids),
+        'teacherUsage': solution.usage('teacher', teacher_ids),
+        'roomUsage': solution.usage('room', room_ids),
         'periodUsage': {day: {period: 0 for period in range(8)} for day in range(5)},
         'totalSlots': len(timetable)
     }
     
-    # Calculate class usage
-    for class_obj in classes:
-        class_id = class_obj['id']
-        class_slots = [s for s in timetable if s['classId'] == class_id]
-        stats['classUsage'][class_id] = len(class_slots)
-    
-    # Calculate teacher usage
-    for teacher in teachers:
-        teacher_id = teacher['id']
-        teacher_slots = [s for s in timetable if s.get('teacherId') == teacher_id]
-        stats['teacherUsage'][teacher_id] = len(teacher_slots)
-    
-    # Calculate room usage
-    for room in rooms:
-        room_id = room['id']
-        room_slots = [s for s in timetable if s.get('roomId') == room_id]
-        stats['roomUsage'][room_id] = len(room_slots)
-    
-    # Calculate period usage
-    for slot in timetable:
-        day = slot['day']
-        period = slot['period']
+    # Calculate period usage from the (day, period) lesson counts
+    slot_usage = solution.slot_usage()
+    days = solution.interners['day'].values
+    periods = solution.interners['period'].values
+    for day_code, period_code in zip(*slot_usage.nonzero()):
+        day = days[day_code]
+        period = periods[period_code]
         if day in stats['periodUsage'] and period in stats['periodUsage'][day]:
-            stats['periodUsage'][day][period] += 1
+            stats['periodUsage'][day][period] += int(slot_usage[day_code, period_code])
     
     return stats
 
@@ -203,38 +165,23 @@ def check_conflicts(timetable: List[Dict]) -> List[Dict]:
     Returns:
         List of conflicts found
     """
+    solution = TimetableArray.from_items(timetable)
     conflicts = []
     
-    # Check for teacher double bookings
-    teacher_assignments = {}
-    for slot in timetable:
-        if 'teacherId' in slot and slot['teacherId']:
-            key = (slot['teacherId'], slot['day'], slot['period'])
-            if key in teacher_assignments:
-                conflicts.append({
-                    'type': 'teacher_double_booking',
-                    'teacherId': slot['teacherId'],
-                    'day': slot['day'],
-                    'period': slot['period'],
-                    'conflictingClasses': [teacher_assignments[key], slot['classId']]
-                })
-            else:
-                teacher_assignments[key] = slot['classId']
-    
-    # Check for room double bookings
-    room_assignments = {}
-    for slot in timetable:
-        if 'roomId' in slot and slot['roomId']:
-            key = (slot['roomId'], slot['day'], slot['period'])
-            if key in room_assignments:
-                conflicts.append({
-                    'type': 'room_double_booking',
-                    'roomId': slot['roomId'],
-                    'day': slot['day'],
-                    'period': slot['period'],
-                    'conflictingClasses': [room_assignments[key], slot['classId']]
-                })
-            else:
-                room_assignments[key] = slot['classId']
-    
-    return conflicts
\ No newline at end of file
+    # Teacher, then room double bookings; lessons without one are skipped
+    for field, key, conflict_type in (('teacher', 'teacherId', 'teacher_double_booking'),
+                                      ('room', 'roomId', 'room_double_booking')):
+        positions, first_positions = solution.double_bookings(field)
+        for position, first in zip(positions.tolist(), first_positions.tolist()):
+            slot = timetable[position]
+            if not slot.get(key):
+                continue
+            conflicts.append({
+                'type': conflict_type,
+                key: slot[key],
+                'day': slot['day'],
+                'period': slot['period'],
+                'conflictingClasses': [timetable[first]['classId'], slot['classId']]
+            })
+    
+    return conflicts
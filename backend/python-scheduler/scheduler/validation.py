@@ -0,0 +1,626 @@
+# validation.py
+import fcntl
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+
+from objective import resolve_objective
+from rooms import room_capacity, room_type, student_count
+from solver_config import ALL_DAYS, resolve_config
+
+logger = logging.getLogger("timetable-scheduler")
+
+SESSION_ID = re.compile(r"[0-9a-f]{32}")
+# Request fields that are not part of the payload a session is validated against
+SESSION_REQUEST_FIELDS = ("timetable", "move", "edits", "session", "sessionId", "apply")
+
+ERROR = "error"
+WARNING = "warning"
+
+
+def _day_name(day):
+    """Day names pass through; 1-based day numbers map to names"""
+    if isinstance(day, int) and 1 <= day <= len(ALL_DAYS):
+        return ALL_DAYS[day - 1]
+    return day
+
+
+def _conflict(conflict_type, severity, message, day=None, period=None, **ids):
+    conflict = {"type": conflict_type, **ids, "day": day, "period": period,
+                "severity": severity, "message": message}
+    return conflict
+
+
+def _conflict_key(conflict):
+    return tuple(sorted((key, str(value)) for key, value in conflict.items()))
+
+
+class TimetableValidator:
+    """Check timetables against the optimizer's hard constraints without CP-SAT
+
+    Payload indexes (the teacher of each class subject, teacher limits and
+    unavailable slots, lab subjects, fixed slots, rooms) are built once.
+    Every rule is scoped to a class-day, teacher-day, teacher week, room-day
+    or class, so checking an edit only re-evaluates the scopes its lessons
+    touch. With only a timetable (no classes/teachers/subjects) just the
+    double bookings are checked, as /validate always did.
+    """
+
+    def __init__(self, data):
+        self.config = resolve_config(data.get('solverOptions'))
+        self.objective = resolve_objective(data.get('objective'))
+        self.days = list(self.config['days'])
+        self.day_order = {day: idx for idx, day in enumerate(ALL_DAYS)}
+        self.num_periods = self.config['periods']
+        self.check_hours = bool(data.get('checkHours'))
+
+        self.classes_dict = {c['id']: c for c in data.get('classes', [])}
+        self.teachers_dict = {t['id']: t for t in data.get('teachers', [])}
+        self.subject_to_index = {s['id']: idx for idx, s in enumerate(data.get('subjects', []))}
+        self.lab_subjects = {
+            self.subject_to_index[s['id']] for s in data.get('subjects', [])
+            if s.get('isLab', False) or s.get('type') == 'lab'
+        }
+        self.has_payload = bool(self.classes_dict or self.teachers_dict or self.subject_to_index)
+
+        # Class -> subject -> teacher (first listed wins, as in the optimizer)
+        self.subject_teacher = {}
+        self.hours = {}
+        for class_id, class_data in self.classes_dict.items():
+            assignments = self.subject_teacher.setdefault(class_id, {})
+            for subject_info in class_data.get('subjects', []):
+                if subject_info['subjectId'] not in assignments:
+                    assignments[subject_info['subjectId']] = subject_info['teacherId']
+                    self.hours[(class_id, subject_info['subjectId'])] = subject_info.get('hoursPerWeek', 1)
+
+        self.unavailable = {
+            (teacher_id, _day_name(slot['day']), slot['period'])
+            for teacher_id, teacher in self.teachers_dict.items()
+            for slot in teacher.get('unavailableSlots', [])
+        }
+
+        self.fixed = defaultdict(list)
+        for slot in data.get('fixedSlots', []):
+            if slot.get('subjectId'):
+                self.fixed[(slot['classId'], _day_name(slot['day']))].append((slot['period'], slot['subjectId']))
+
+        self.rooms = {room['id']: room for room in data.get('rooms') or []}
+
+    def _severity(self, rule):
+        return ERROR if self.objective['rules'][rule] == 'hard' else WARNING
+
+    def _is_lab(self, subject_id):
+        return self.subject_to_index.get(subject_id) in self.lab_subjects
+
+    def _daily_limit(self, teacher):
+        return teacher.get('maxHoursPerDay', teacher.get('maxPeriodsPerDay', 4))
+
+    def index(self, timetable):
+        """An indexed, editable copy of a timetable"""
+        return TimetableState(self, timetable)
+
+    def validate(self, state):
+        """All conflicts of an indexed timetable"""
+        return self.check(state, state.all_scopes())
+
+    def check(self, state, scopes):
+        """Conflicts within the given scopes, sorted by day, period and type"""
+        conflicts = []
+        for scope in scopes:
+            kind = scope[0]
+            if kind == "class":
+                self._check_class_day(state, scope[1], scope[2], conflicts)
+            elif kind == "teacher":
+                self._check_teacher_day(state, scope[1], scope[2], conflicts)
+            elif kind == "week":
+                self._check_teacher_week(state, scope[1], conflicts)
+            elif kind == "room":
+                self._check_room_day(state, scope[1], scope[2], conflicts)
+            elif kind == "hours":
+                self._check_hours(state, scope[1], conflicts)
+        conflicts.sort(key=lambda c: (self.day_order.get(c["day"], len(ALL_DAYS)), str(c["day"]),
+                                      c["period"] or 0, c["type"]))
+        return conflicts
+
+    def check_edit(self, state, edit, commit=False):
+        """Check one candidate edit; the timetable is left unchanged unless commit
+
+        Returns the conflicts in every scope the edit touches afterwards, the
+        ones it introduced, and whether it leaves no hard conflict there.
+        """
+        undo, scopes = state.apply(edit)
+        state.revert(undo)
+        before = {_conflict_key(c) for c in self.check(state, scopes)}
+        undo, _ = state.apply(edit)
+        after = self.check(state, scopes)
+        if not commit:
+            state.revert(undo)
+        return {
+            "valid": not any(c["severity"] == ERROR for c in after),
+            "conflicts": after,
+            "introduced": [c for c in after if _conflict_key(c) not in before],
+        }
+
+    # ----- scoped rules -----
+
+    def _check_class_day(self, state, class_id, day, conflicts):
+        periods = state.class_days.get((class_id, day), {})
+        class_data = self.classes_dict.get(class_id)
+
+        for period, items in periods.items():
+            for _ in items[1:]:
+                conflicts.append(_conflict(
+                    "class_double_booking", ERROR,
+                    f"Class {class_id} has overlapping subjects at {day} period {period}",
+                    day, period, classId=class_id
+                ))
+            if self.has_payload and (day not in self.days or not 1 <= period <= self.num_periods):
+                conflicts.append(_conflict(
+                    "off_grid", ERROR, f"Class {class_id} has a lesson outside the timetable at {day} period {period}",
+                    day, period, classId=class_id
+                ))
+            for item in items:
+                self._check_lesson(class_id, class_data, item, conflicts)
+
+        if not self.subject_to_index:
+            return
+
+        subjects_at = {period: {item.get('subjectId') for item in items} for period, items in periods.items()}
+        lab_periods = defaultdict(list)
+        for period in sorted(subjects_at):
+            for subject_id in subjects_at[period]:
+                if self._is_lab(subject_id):
+                    lab_periods[subject_id].append(period)
+                elif subject_id in subjects_at.get(period + 1, ()):
+                    conflicts.append(_conflict(
+                        "consecutive_subject", ERROR,
+                        f"Subject {subject_id} is in consecutive periods for class {class_id} on {day}",
+                        day, period + 1, classId=class_id, subjectId=subject_id
+                    ))
+
+        # Labs come as pairs of two consecutive periods
+        for subject_id, lab_run in lab_periods.items():
+            start = 0
+            for idx in range(1, len(lab_run) + 1):
+                if idx == len(lab_run) or lab_run[idx] != lab_run[idx - 1] + 1:
+                    length = idx - start
+                    if length != 2:
+                        conflicts.append(_conflict(
+                            "lab_not_paired", ERROR,
+                            f"Lab {subject_id} for class {class_id} runs {length} period(s) from {day} "
+                            f"period {lab_run[start]}; labs are scheduled in pairs",
+                            day, lab_run[start], classId=class_id, subjectId=subject_id
+                        ))
+                    start = idx
+
+        for period, subject_id in self.fixed.get((class_id, day), []):
+            if subject_id not in subjects_at.get(period, ()):
+                conflicts.append(_conflict(
+                    "fixed_slot_violation", ERROR,
+                    f"Class {class_id} is fixed to {subject_id} at {day} period {period}",
+                    day, period, classId=class_id, subjectId=subject_id
+                ))
+
+    def _check_lesson(self, class_id, class_data, item, conflicts):
+        """The lesson's teacher and room match the payload"""
+        day, period, subject_id = item['day'], item['period'], item.get('subjectId')
+        if class_data is not None:
+            expected = self.subject_teacher[class_id].get(subject_id)
+            fixed_here = (period, subject_id) in self.fixed.get((class_id, day), [])
+            if expected is None and not fixed_here:
+                conflicts.append(_conflict(
+                    "invalid_assignment", ERROR, f"Class {class_id} does not take subject {subject_id}",
+                    day, period, classId=class_id, subjectId=subject_id
+                ))
+            elif expected is not None and item.get('teacherId') != expected:
+                conflicts.append(_conflict(
+                    "invalid_assignment", ERROR,
+                    f"Subject {subject_id} in class {class_id} is taught by {expected}, not {item.get('teacherId')}",
+                    day, period, classId=class_id, subjectId=subject_id
+                ))
+
+        room_id = item.get('roomId')
+        if room_id is None or not self.rooms:
+            return
+        room = self.rooms.get(room_id)
+        if room is None:
+            message = f"Room {room_id} does not exist"
+        elif room.get('type', 'classroom') != room_type(self, subject_id):
+            message = f"Room {room_id} is not a {room_type(self, subject_id)} room"
+        elif room_capacity(room) < student_count(self, class_id):
+            message = f"Room {room_id} seats {room['capacity']}, class {class_id} has {student_count(self, class_id)} students"
+        else:
+            return
+        conflicts.append(_conflict("room_unsuitable", ERROR, message, day, period, classId=class_id, roomId=room_id))
+
+    def _check_teacher_day(self, state, teacher_id, day, conflicts):
+        periods = state.teacher_days.get((teacher_id, day), {})
+        teacher = self.teachers_dict.get(teacher_id)
+
+        for period, items in periods.items():
+            for _ in items[1:]:
+                conflicts.append(_conflict(
+                    "teacher_double_booking", ERROR,
+                    f"Teacher {teacher_id} double-booked at {day} period {period}",
+                    day, period, teacherId=teacher_id
+                ))
+            if (teacher_id, day, period) in self.unavailable:
+                conflicts.append(_conflict(
+                    "teacher_unavailable", self._severity("teacherUnavailable"),
+                    f"Teacher {teacher_id} is unavailable at {day} period {period}",
+                    day, period, teacherId=teacher_id
+                ))
+
+        if teacher is None:
+            return
+
+        taught = sum(len(items) for items in periods.values())
+        limit = self._daily_limit(teacher)
+        if taught > limit:
+            conflicts.append(_conflict(
+                "teacher_daily_limit", self._severity("teacherDailyLimit"),
+                f"Teacher {teacher_id} teaches {taught} periods on {day}, limit {limit}",
+                day, None, teacherId=teacher_id
+            ))
+
+        # Back-to-back lessons; both periods of one lab pair are one lesson
+        for period, items in periods.items():
+            for item in items:
+                for following in periods.get(period + 1, ()):
+                    same_pair = (following['classId'] == item['classId']
+                                 and following.get('subjectId') == item.get('subjectId')
+                                 and self._is_lab(item.get('subjectId')))
+                    if not same_pair:
+                        conflicts.append(_conflict(
+                            "teacher_consecutive", self._severity("teacherNoConsecutive"),
+                            f"Teacher {teacher_id} teaches consecutive periods {period} and {period + 1} on {day}",
+                            day, period + 1, teacherId=teacher_id
+                        ))
+
+    def _check_teacher_week(self, state, teacher_id, conflicts):
+        teacher = self.teachers_dict.get(teacher_id)
+        limit = teacher.get('maxHoursPerWeek') if teacher else None
+        taught = state.teacher_week.get(teacher_id, 0)
+        if limit is not None and taught > limit:
+            conflicts.append(_conflict(
+                "teacher_weekly_limit", self._severity("teacherWeeklyLimit"),
+                f"Teacher {teacher_id} teaches {taught} periods this week, limit {limit}",
+                teacherId=teacher_id
+            ))
+
+    def _check_room_day(self, state, room_id, day, conflicts):
+        for period, items in state.room_days.get((room_id, day), {}).items():
+            for _ in items[1:]:
+                conflicts.append(_conflict(
+                    "room_double_booking", ERROR, f"Room {room_id} double-booked at {day} period {period}",
+                    day, period, roomId=room_id
+                ))
+
+    def _check_hours(self, state, class_id, conflicts):
+        for subject_id in self.subject_teacher.get(class_id, {}):
+            needed = self.hours[(class_id, subject_id)]
+            scheduled = state.class_hours.get((class_id, subject_id), 0)
+            if scheduled != needed:
+                conflicts.append(_conflict(
+                    "subject_hours", ERROR,
+                    f"Class {class_id} has {scheduled} of {needed} periods of {subject_id}",
+                    classId=class_id, subjectId=subject_id
+                ))
+
+
+class TimetableState:
+    """A timetable indexed by class-day, teacher-day, teacher and room-day"""
+
+    def __init__(self, validator, timetable):
+        self.validator = validator
+        self.class_days = defaultdict(dict)
+        self.teacher_days = defaultdict(dict)
+        self.room_days = defaultdict(dict)
+        self.teacher_week = defaultdict(int)
+        self.class_hours = defaultdict(int)
+        for item in timetable:
+            self.add(dict(item, day=_day_name(item['day'])))
+
+    def scopes(self, item):
+        scopes = {("class", item['classId'], item['day'])}
+        if item.get('teacherId') is not None:
+            scopes.add(("teacher", item['teacherId'], item['day']))
+            scopes.add(("week", item['teacherId']))
+        if item.get('roomId') is not None:
+            scopes.add(("room", item['roomId'], item['day']))
+        if self.validator.check_hours:
+            scopes.add(("hours", item['classId']))
+        return scopes
+
+    def all_scopes(self):
+        scopes = {("class",) + key for key in self.class_days}
+        scopes.update(("teacher",) + key for key in self.teacher_days)
+        scopes.update(("week", teacher_id) for teacher_id in self.teacher_week)
+        scopes.update(("room",) + key for key in self.room_days)
+        if self.validator.check_hours:
+            scopes.update(("hours", class_id) for class_id in self.validator.classes_dict)
+        return scopes
+
+    def lessons_at(self, class_id, day, period):
+        return list(self.class_days.get((class_id, day), {}).get(period, []))
+
+    def add(self, item):
+        day, period = item['day'], item['period']
+        self.class_days[(item['classId'], day)].setdefault(period, []).append(item)
+        if item.get('teacherId') is not None:
+            self.teacher_days[(item['teacherId'], day)].setdefault(period, []).append(item)
+            self.teacher_week[item['teacherId']] += 1
+        if item.get('roomId') is not None:
+            self.room_days[(item['roomId'], day)].setdefault(period, []).append(item)
+        self.class_hours[(item['classId'], item.get('subjectId'))] += 1
+
+    def remove(self, item):
+        day, period = item['day'], item['period']
+        self._discard(self.class_days, (item['classId'], day), period, item)
+        if item.get('teacherId') is not None:
+            self._discard(self.teacher_days, (item['teacherId'], day), period, item)
+            self.teacher_week[item['teacherId']] -= 1
+        if item.get('roomId') is not None:
+            self._discard(self.room_days, (item['roomId'], day), period, item)
+        self.class_hours[(item['classId'], item.get('subjectId'))] -= 1
+
+    @staticmethod
+    def _discard(index, key, period, item):
+        periods = index[key]
+        items = periods[period]
+        items.remove(item)
+        if not items:
+            del periods[period]
+        if not periods:
+            del index[key]
+
+    def apply(self, edit):
+        """Apply an edit; returns the undo log and the scopes it touched
+
+        An edit is one change or a list of changes:
+          {"move": {classId, day, period}, "to": {day, period}}  (swaps with
+              the class's lesson already at the target, if any)
+          {"add": lesson}
+          {"remove": {classId, day, period}}
+        """
+        changes = edit if isinstance(edit, list) else [edit]
+        undo = []
+        scopes = set()
+
+        def do(operation, item):
+            (self.add if operation == "add" else self.remove)(item)
+            undo.append((operation, item))
+            scopes.update(self.scopes(item))
+
+        try:
+            for change in changes:
+                if "move" in change:
+                    source, target = change["move"], change.get("to") or {}
+                    class_id = source['classId']
+                    day, period = _day_name(source['day']), source['period']
+                    to_day, to_period = _day_name(target.get('day', day)), target.get('period', period)
+                    moving = self.lessons_at(class_id, day, period)
+                    if not moving:
+                        raise ValueError(f"No lesson for class {class_id} at {day} period {period}")
+                    displaced = [] if (to_day, to_period) == (day, period) else self.lessons_at(class_id, to_day, to_period)
+                    for item in moving + displaced:
+                        do("remove", item)
+                    for item in moving:
+                        do("add", dict(item, day=to_day, period=to_period))
+                    for item in displaced:
+                        do("add", dict(item, day=day, period=period))
+                elif "add" in change:
+                    lesson = change["add"]
+                    do("add", dict(lesson, day=_day_name(lesson['day'])))
+                elif "remove" in change:
+                    slot = change["remove"]
+                    day = _day_name(slot['day'])
+                    removing = self.lessons_at(slot['classId'], day, slot['period'])
+                    if not removing:
+                        raise ValueError(f"No lesson for class {slot['classId']} at {day} period {slot['period']}")
+                    for item in removing:
+                        do("remove", item)
+                else:
+                    raise ValueError("Each change needs a move, add or remove")
+        except (KeyError, TypeError) as e:
+            self.revert(undo)
+            raise ValueError(f"Malformed change: {e}")
+        except ValueError:
+            self.revert(undo)
+            raise
+        return undo, scopes
+
+    def revert(self, undo):
+        for operation, item in reversed(undo):
+            (self.remove if operation == "add" else self.add)(item)
+
+    def timetable(self):
+        return [item for periods in self.class_days.values() for items in periods.values() for item in items]
+
+
+class _SessionLock:
+    """A session's thread lock plus an advisory file lock shared across processes
+
+    Entering it reloads the session if another process committed to it.
+    """
+
+    def __init__(self, path, refresh):
+        self.path = path
+        self.refresh = refresh
+        self.thread_lock = threading.Lock()
+        self.fd = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        try:
+            self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT)
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+            self.refresh()
+        except BaseException:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+        self.thread_lock.release()
+
+
+class ValidationSessions:
+    """Indexed timetables kept between /validate calls for incremental checks
+
+    With a directory, each session's payload and timetable are also written
+    there, so server processes sharing the directory serve each other's
+    sessions: a process indexes a session once and re-reads it only after
+    another process commits a move to it.
+    """
+
+    def __init__(self, max_entries=64, ttl_seconds=1800, directory=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def create(self, validator, state, data=None):
+        """Keep an indexed timetable; data is the payload the validator was built from"""
+        session_id = uuid.uuid4().hex
+        session = self._entry(session_id, validator, state)
+        if self.directory:
+            session["payload"] = {key: value for key, value in (data or {}).items()
+                                  if key not in SESSION_REQUEST_FIELDS}
+            self._prune_files()
+            self.save(session_id, session)
+        self._remember(session_id, session)
+        return session_id
+
+    def get(self, session_id):
+        """The session's {validator, state, lock}, or None if unknown or expired
+
+        Read validator and state only while holding the lock, which brings a
+        shared session up to date.
+        """
+        now = time.time()
+        with self.lock:
+            session = self.entries.get(session_id)
+            if session is not None and now - session["touched"] > self.ttl_seconds:
+                del self.entries[session_id]
+                session = None
+            if session is not None:
+                session["touched"] = now
+                self.entries.move_to_end(session_id)
+        if not self.directory:
+            return session
+
+        if not SESSION_ID.fullmatch(session_id):
+            return None
+        try:
+            touched = max(os.path.getmtime(self._path(session_id)), os.path.getmtime(self._path(session_id, "lock")))
+        except OSError:
+            touched = None
+        if touched is None or now - touched > self.ttl_seconds:
+            self.delete(session_id)
+            return None
+        os.utime(self._path(session_id, "lock"))
+        if session is None:
+            session = self._entry(session_id, None, None)
+            session["version"] = None
+            self._remember(session_id, session)
+        return session
+
+    def save(self, session_id, session):
+        """Write a session's timetable for the other server processes (its lock held)"""
+        if not self.directory:
+            return
+        path = self._path(session_id)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"payload": session["payload"], "timetable": session["state"].timetable()}, f)
+            os.replace(tmp_path, path)
+            open(self._path(session_id, "lock"), "a").close()
+            session["version"] = self._version(session_id)
+        except (OSError, TypeError, ValueError):
+            logger.warning("Could not save validation session %s", session_id, exc_info=True)
+
+    def delete(self, session_id):
+        with self.lock:
+            found = self.entries.pop(session_id, None) is not None
+        if self.directory and SESSION_ID.fullmatch(session_id):
+            for suffix in ("json", "lock"):
+                try:
+                    os.remove(self._path(session_id, suffix))
+                    found = True
+                except OSError:
+                    pass
+        return found
+
+    def _entry(self, session_id, validator, state):
+        if self.directory:
+            session = {"validator": validator, "state": state, "touched": time.time()}
+            session["lock"] = _SessionLock(self._path(session_id, "lock"), lambda: self._refresh(session_id, session))
+            return session
+        return {"validator": validator, "state": state, "lock": threading.Lock(), "touched": time.time()}
+
+    def _remember(self, session_id, session):
+        with self.lock:
+            self.entries[session_id] = session
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def _path(self, session_id, suffix="json"):
+        return os.path.join(self.directory, f"{session_id}.{suffix}")
+
+    def _version(self, session_id):
+        """Changes whenever a process rewrites the session file"""
+        stat = os.stat(self._path(session_id))
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _refresh(self, session_id, session):
+        """Re-index the session if another process committed to it (its lock held)"""
+        try:
+            version = self._version(session_id)
+            if version == session.get("version"):
+                return
+            with open(self._path(session_id)) as f:
+                record = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ValueError(f"Validation session {session_id} could not be loaded: {e}")
+        if session["validator"] is None:
+            session["validator"] = TimetableValidator(record["payload"])
+        session["payload"] = record["payload"]
+        session["state"] = session["validator"].index(record["timetable"])
+        session["version"] = version
+
+    def _prune_files(self):
+        """Drop sessions no process has touched within the TTL"""
+        cutoff = time.time() - self.ttl_seconds
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        touched = {}
+        for name in names:
+            session_id = name.split(".", 1)[0]
+            try:
+                mtime = os.path.getmtime(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            touched[session_id] = max(touched.get(session_id, 0), mtime)
+        for session_id, mtime in touched.items():
+            if mtime < cutoff:
+                for name in (f"{session_id}.json", f"{session_id}.lock"):
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
@@ -0,0 +1,40 @@
+# conftest.py
+import os
+import sys
+import time
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# The scheduler uses flat imports; the synthetic payload generator lives with the benchmarks
+sys.path.insert(0, os.path.join(HERE, "..", "benchmarks"))
+sys.path.insert(0, os.path.join(HERE, "..", "scheduler"))
+
+
+@pytest.fixture
+def templates():
+    """The process-wide model template cache, emptied before and after the test"""
+    from templates import TEMPLATES
+    TEMPLATES.clear()
+    yield TEMPLATES
+    TEMPLATES.clear()
+
+
+def small_payload(num_classes=4, time_limit=2, **options):
+    """A small synthetic institution that solves in well under a second"""
+    from synthetic import generate_payload
+    payload = generate_payload(num_classes, num_teachers=max(2, num_classes * 3 // 2), **options)
+    payload["solverOptions"] = {"timeLimit": time_limit}
+    return payload
+
+
+def wait_for(manager, job_id, timeout=60):
+    """Poll a JobManager until the job has finished"""
+    from jobs import FINISHED_STATES
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get(job_id)
+        if job.status in FINISHED_STATES:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} did not finish")
@@ -0,0 +1,35 @@
+# test_benchmarks.py
+from argparse import Namespace
+
+from suite import FIELDS, build_cases, measure
+from synthetic import DAYS, PERIODS, generate_payload
+
+
+def test_generator_is_deterministic_and_honours_its_options():
+    payload = generate_payload(6, num_teachers=6, lab_ratio=1.0, seed=3, departments=2,
+                               unavailability=1.0, fixed_per_class=0)
+    assert payload == generate_payload(6, num_teachers=6, lab_ratio=1.0, seed=3, departments=2,
+                                       unavailability=1.0, fixed_per_class=0)
+    assert payload != generate_payload(6, num_teachers=6, lab_ratio=1.0, seed=4, departments=2,
+                                       unavailability=1.0, fixed_per_class=0)
+    assert all(subject["isLab"] for subject in payload["subjects"])
+    assert all(len(teacher["unavailableSlots"]) == len(DAYS) * PERIODS for teacher in payload["teachers"])
+    # Departments share no teacher
+    teachers = [{s["teacherId"] for s in c["subjects"]} for c in payload["classes"]]
+    assert not (teachers[0] | teachers[2] | teachers[4]) & (teachers[1] | teachers[3] | teachers[5])
+
+    fixed = generate_payload(4, fixed_per_class=2)["fixedSlots"]
+    assert len(fixed) == 8
+    assert len({(slot["classId"], slot["day"], slot["period"]) for slot in fixed}) == 8
+
+
+def test_suite_measures_each_case_in_its_own_process():
+    args = Namespace(sizes=[3], repeats=2, lab_ratio=0.0, departments=1, unavailability=0.0,
+                     fixed_per_class=0, teachers_per_class=1.5, seed=0, time_limit=2, workers=1)
+    cases = build_cases(args)
+    assert [(case["classes"], case["repeat"], case["seed"]) for case in cases] == [(3, 0, 0), (3, 1, 1)]
+
+    row = measure(cases[0])
+    assert row["status"] in ("optimal", "feasible")
+    assert set(row) <= set(FIELDS)
+    assert row["variables"] > 0 and row["peakRssMb"] > 0 and row["timeToFirstSolution"] <= row["solveTime"]
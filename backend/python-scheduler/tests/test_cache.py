@@ -0,0 +1,54 @@
+# test_cache.py
+import copy
+
+from cache import ResultCache, payload_key
+from conftest import small_payload
+
+
+def test_key_ignores_order_and_display_fields():
+    payload = small_payload()
+    reordered = copy.deepcopy(payload)
+    reordered['classes'].reverse()
+    reordered['teachers'].reverse()
+    reordered['teachers'][0]['unavailableSlots'] = [{"day": "Monday", "period": 2}, {"day": "Monday", "period": 1}]
+    payload['teachers'][-1]['unavailableSlots'] = [{"day": "Monday", "period": 1}, {"day": "Monday", "period": 2}]
+    reordered['classes'][0]['name'] = "Renamed"
+
+    assert payload_key(reordered) == payload_key(payload)
+
+
+def test_key_keeps_the_order_of_a_class_subjects():
+    payload = small_payload()
+    subjects = payload['classes'][0]['subjects']
+    # A duplicated subject: the first entry's teacher is the one scheduled
+    subjects.append(dict(subjects[0], teacherId=payload['teachers'][-1]['id']))
+    swapped = copy.deepcopy(payload)
+    swapped['classes'][0]['subjects'][0], swapped['classes'][0]['subjects'][-1] = subjects[-1], subjects[0]
+
+    assert payload_key(swapped) != payload_key(payload)
+
+
+def test_key_changes_with_hours_and_solver_options():
+    payload = small_payload()
+    changed = copy.deepcopy(payload)
+    changed['classes'][0]['subjects'][0]['hoursPerWeek'] += 1
+    assert payload_key(changed) != payload_key(payload)
+
+    assert payload_key(dict(payload, solverOptions={"timeLimit": 3})) != payload_key(payload)
+    assert payload_key(dict(payload, solverOptions={"timeLimit": 2.0})) == payload_key(payload)
+
+
+def test_hits_misses_and_the_shared_disk_tier(tmp_path):
+    cache = ResultCache(max_entries=1, directory=str(tmp_path))
+    result = {"status": "optimal", "schedule": [{"classId": "c1"}]}
+
+    assert cache.get("a") is None
+    cache.put("a", result)
+    cache.put("b", dict(result, status="infeasible"))
+    assert cache.get("a") == result and cache.get("b") is None
+
+    # Another process sharing the directory reads it from disk
+    other = ResultCache(directory=str(tmp_path))
+    assert other.get("a") == result
+    assert other.stats()["diskHits"] == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
@@ -0,0 +1,81 @@
+# test_decomposition.py
+import time
+
+from conftest import small_payload
+from decomposition import find_components, merge_results, solve_schedule
+from synthetic import DAYS, PERIODS
+
+
+def test_find_components_splits_departments():
+    payload = small_payload(departments=2)
+    assert sorted(map(sorted, find_components(payload))) == [["cls0000", "cls0002"], ["cls0001", "cls0003"]]
+
+
+def test_infeasible_component_keeps_its_explanation():
+    payload = small_payload(departments=2)
+    payload["solverOptions"]["numWorkers"] = 2
+    teacher_id = payload["classes"][1]["subjects"][0]["teacherId"]
+    teacher = next(t for t in payload["teachers"] if t["id"] == teacher_id)
+    teacher["unavailableSlots"] = [{"day": day, "period": period}
+                                   for day in DAYS for period in range(1, PERIODS + 1)]
+
+    result = solve_schedule(payload)
+
+    assert result["status"] == "infeasible"
+    assert result["message"].startswith("Classes cls0001, cls0003: Input is infeasible")
+    errors = [issue for issue in result["statistics"]["feasibility"]["issues"] if issue["severity"] == "error"]
+    assert errors and all(issue["classIds"] == ["cls0001", "cls0003"] for issue in errors)
+    assert result["statistics"]["decomposition"]["failedComponents"] == [1]
+
+
+def test_merge_results_keeps_conflicting_constraints():
+    conflict = {"constraint": ["fixedSlot", "cls0001"], "message": "Fixed slot of cls0001 clashes"}
+    results = [
+        {"status": "feasible", "message": "ok", "schedule": [],
+         "statistics": {"feasibility": {"issues": []}}},
+        {"status": "infeasible", "message": "Constraints conflict: Fixed slot of cls0001 clashes", "schedule": [],
+         "statistics": {"feasibility": {"issues": [], "conflictingConstraints": [conflict]}}},
+    ]
+
+    result = merge_results({}, {}, [["cls0000"], ["cls0001"]], results, 1.0)
+
+    assert result["message"] == "Classes cls0001: Constraints conflict: Fixed slot of cls0001 clashes"
+    assert result["statistics"]["feasibility"]["conflictingConstraints"] == [dict(conflict, classIds=["cls0001"])]
+
+
+def test_departments_are_solved_separately_and_merged():
+    payload = small_payload(departments=2)
+    payload["solverOptions"]["numWorkers"] = 2
+
+    result = solve_schedule(payload)
+
+    assert result["status"] in ("optimal", "feasible")
+    statistics = result["statistics"]
+    assert statistics["decomposition"]["components"] == 2
+    assert [detail["classes"] for detail in statistics["decomposition"]["componentDetails"]] == [2, 2]
+    assert statistics["conflicts"] == 0
+    # Merged in the payload's class order, every lesson of every class placed
+    class_ids = [c["id"] for c in payload["classes"]]
+    assert [item["classId"] for item in result["schedule"]] == sorted(
+        (item["classId"] for item in result["schedule"]), key=class_ids.index)
+    hours = {c["id"]: sum(s["hoursPerWeek"] for s in c["subjects"]) for c in payload["classes"]}
+    assert {class_id: sum(1 for item in result["schedule"] if item["classId"] == class_id)
+            for class_id in class_ids} == hours
+
+
+def test_connected_classes_use_one_model():
+    result = solve_schedule(small_payload())
+    assert "decomposition" not in result["statistics"]
+
+
+def test_components_share_the_time_limit_when_they_outnumber_workers():
+    payload = small_payload(num_classes=8, departments=4, time_limit=2)
+    payload["solverOptions"]["numWorkers"] = 1
+
+    start = time.time()
+    result = solve_schedule(payload)
+
+    # Four rounds of one component each; before, every round took the full limit
+    assert result["statistics"]["decomposition"]["components"] == 4
+    assert time.time() - start < 2.5
+    assert result["status"] in ("optimal", "feasible")
@@ -0,0 +1,52 @@
+# test_encoding.py
+import gzip
+import json
+
+import pytest
+from werkzeug.datastructures import MIMEAccept
+
+from encoding import COLUMNAR_JSON, COLUMNAR_MSGPACK, JSON, columnar_timetable, encode_body, expand_timetable, negotiate
+
+SCHEDULE = [
+    {"classId": f"class{idx % 3}", "day": ["Monday", "Tuesday"][idx % 2], "period": idx % 6 + 1,
+     "subjectId": f"subject{idx % 5}", "teacherId": f"teacher{idx % 4}"}
+    for idx in range(200)
+]
+
+
+def test_columnar_timetable_round_trips():
+    columnar = columnar_timetable(SCHEDULE)
+
+    assert columnar["length"] == 200 and "room" not in columnar["columns"]
+    assert columnar["ids"]["class"] == ["class0", "class1", "class2"]
+    assert expand_timetable(columnar) == SCHEDULE
+
+    roomed = [dict(item, roomId="r1" if idx % 2 else None) for idx, item in enumerate(SCHEDULE)]
+    assert expand_timetable(columnar_timetable(roomed)) == roomed
+
+
+def test_json_stays_the_default():
+    assert negotiate(MIMEAccept()) == JSON
+    assert negotiate(MIMEAccept([("*/*", 1)])) == JSON
+    assert negotiate(MIMEAccept([(COLUMNAR_JSON, 1), (JSON, 0.5)])) == COLUMNAR_JSON
+
+
+def test_compact_body_is_smaller_and_decodes_back():
+    body = {"status": "success", "timetable": SCHEDULE}
+
+    payload, headers = encode_body(body, COLUMNAR_JSON, use_gzip=True)
+
+    assert headers["Content-Encoding"] == "gzip" and headers["Content-Type"] == COLUMNAR_JSON
+    decoded = json.loads(gzip.decompress(payload))
+    assert decoded["timetableFormat"] == "columnar"
+    assert expand_timetable(decoded["timetable"]) == SCHEDULE
+    assert len(payload) < len(json.dumps(body)) / 10
+
+
+def test_msgpack_encoding():
+    msgpack = pytest.importorskip("msgpack")
+    payload, headers = encode_body({"timetable": SCHEDULE[:2]}, COLUMNAR_MSGPACK, use_gzip=True)
+
+    # Too small to be worth compressing
+    assert "Content-Encoding" not in headers
+    assert expand_timetable(msgpack.unpackb(payload)["timetable"]) == SCHEDULE[:2]
@@ -0,0 +1,96 @@
+# test_feasibility.py
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import small_payload
+from feasibility import analyze_payload, explain_budget, explain_infeasibility
+from optimizer import TimetableScheduler
+from solver_config import resolve_config
+
+
+def issues_of(payload, issue_type):
+    return [issue for issue in analyze_payload(TimetableScheduler(payload)) if issue['type'] == issue_type]
+
+
+@pytest.mark.parametrize("options, budget", [
+    ({"timeLimit": 60}, 10),
+    ({"timeLimit": 4}, 2),
+    ({"timeLimit": 60, "explainTimeLimit": 3}, 3),
+    ({"timeLimit": 60, "explainTimeLimit": 0}, 0),
+])
+def test_explain_budget_follows_the_time_limit(options, budget):
+    assert explain_budget(resolve_config(options, environ={})) == budget
+
+
+def test_explanations_can_be_turned_off():
+    # With no budget the model is not even rebuilt
+    scheduler = SimpleNamespace(config=resolve_config({"explainTimeLimit": 0}, environ={}))
+    assert explain_infeasibility(scheduler) is None
+
+
+def test_explain_time_limit_is_validated():
+    with pytest.raises(ValueError, match="explainTimeLimit must not be negative"):
+        resolve_config({"explainTimeLimit": -1})
+    assert resolve_config(environ={"SCHED_EXPLAIN_TIME_LIMIT": "2"})["explainTimeLimit"] == 2
+
+
+def test_class_hours_above_the_slot_count():
+    payload = small_payload()
+    # Six days of two periods cannot hold 18 weekly lessons
+    payload["solverOptions"]["periods"] = 2
+
+    overloads = issues_of(payload, "class_overload")
+
+    assert [issue['classId'] for issue in overloads] == [c['id'] for c in payload['classes']]
+    assert all(issue['hours'] == 18 and issue['slots'] == 12 and issue['severity'] == "error"
+               for issue in overloads)
+
+
+def test_teacher_load_above_the_daily_limit_times_days():
+    payload = small_payload()
+    teacher = payload['teachers'][0]
+    teacher['maxHoursPerDay'] = 1
+
+    overloads = issues_of(payload, "teacher_overload")
+
+    # Four classes of three hours each, one period a day on six days
+    assert [(issue['teacherId'], issue['demand'], issue['capacity']) for issue in overloads] == [
+        (teacher['id'], 12, 6)]
+
+
+def test_labs_that_cannot_fit_as_pairs():
+    payload = small_payload(lab_ratio=1.0)
+    # Four periods leave room for one pair a day, six in the week
+    payload["solverOptions"]["periods"] = 4
+    subject = payload['classes'][0]['subjects'][0]
+    subject['hoursPerWeek'] = 14
+
+    issues = issues_of(payload, "lab_pairs_do_not_fit")
+
+    assert [(issue['classId'], issue['subjectId']) for issue in issues] == [
+        (payload['classes'][0]['id'], subject['subjectId'])]
+    assert "needs 7 pairs, at most 6 fit" in issues[0]['message']
+
+
+def test_fixed_slot_teacher_clash_is_explained():
+    payload = small_payload(time_limit=4)
+    teacher_classes = {}
+    for class_obj in payload['classes']:
+        for subject in class_obj['subjects']:
+            teacher_classes.setdefault(subject['teacherId'], []).append((class_obj['id'], subject['subjectId']))
+    teacher_id, lessons = next(item for item in teacher_classes.items() if len(item[1]) > 1)
+    # Two classes pinned to the same slot with the same teacher
+    payload['fixedSlots'] = [{"classId": class_id, "day": "Monday", "period": 1, "subjectId": subject_id}
+                             for class_id, subject_id in lessons[:2]]
+
+    result = TimetableScheduler(payload).generate_schedule()
+
+    assert result['status'] == "infeasible" and result['message'].startswith("Constraints conflict")
+    feasibility = result['statistics']['feasibility']
+    assert feasibility['issues'] == []
+    names = [conflict['constraint'] for conflict in feasibility['conflictingConstraints']]
+    fixed = [["fixedSlot", class_id, 0, 1] for class_id, _ in lessons[:2]]
+    assert all(name in names for name in fixed)
+    # Anything else in the core is a rule about the shared teacher
+    assert all(name[1] == teacher_id for name in names if name not in fixed)
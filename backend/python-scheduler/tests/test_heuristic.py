@@ -0,0 +1,43 @@
+# test_heuristic.py
+from conftest import small_payload
+from decomposition import solve_schedule
+from heuristic import HeuristicScheduler
+from validation import TimetableValidator
+
+
+def test_heuristic_draft_meets_every_hard_rule():
+    payload = small_payload(num_classes=40, lab_ratio=0.2, time_limit=10)
+    payload["solverOptions"].update(engine="heuristic", heuristicTime=1)
+
+    result = solve_schedule(payload)
+
+    assert result["status"] == "feasible" and result["statistics"]["engine"] == "heuristic"
+    assert result["statistics"]["solveSeconds"] < 3
+    validator = TimetableValidator(dict(payload, checkHours=True))
+    assert validator.validate(validator.index(result["schedule"])) == []
+    search = result["statistics"]["heuristic"]
+    assert search["finalObjective"] == result["statistics"]["objective"]["total"] <= search["initialObjective"]
+
+
+def test_draft_keeps_what_it_could_place():
+    payload = small_payload(time_limit=2)
+    # Two periods a day cannot fit a class's 18 weekly lessons
+    payload["solverOptions"]["periods"] = 2
+
+    scheduler = HeuristicScheduler(payload)
+    schedule, unplaced = scheduler.draft()
+
+    hours = sum(s["hoursPerWeek"] for c in payload["classes"] for s in c["subjects"])
+    assert unplaced and 0 < len(schedule) < hours
+    assert sum(lesson["periods"] for lesson in unplaced) == hours - len(schedule)
+
+
+def test_hybrid_hints_cp_sat_with_the_draft():
+    payload = small_payload(time_limit=3)
+    payload["solverOptions"].update(engine="hybrid", heuristicTime=0.5)
+
+    result = solve_schedule(payload)
+
+    assert result["status"] in ("optimal", "feasible") and result["statistics"]["engine"] == "hybrid"
+    assert result["statistics"]["heuristic"]["unplacedLessons"] == []
+    assert result["statistics"]["objective"]["total"] <= result["statistics"]["heuristic"]["finalObjective"]
@@ -0,0 +1,41 @@
+# test_instrumentation.py
+import os
+
+import instrumentation
+from conftest import small_payload
+from instrumentation import MetricsRegistry
+from optimizer import TimetableScheduler
+
+
+def test_statistics_report_phases_model_families_and_solver_runs(tmp_path, monkeypatch):
+    monkeypatch.setattr(instrumentation, "PROFILE_DIR", str(tmp_path))
+    payload = dict(small_payload(), profile=True)
+
+    statistics = TimetableScheduler(payload).generate_schedule()['statistics']
+
+    assert {"parse", "analyze", "extract", "statistics"} <= set(statistics['phases'])
+    assert all(isinstance(seconds, float) for seconds in statistics['phases'].values())
+    families = statistics['modelFamilies']
+    assert sum(size['variables'] for size in families.values()) <= statistics['model']['variables']
+    assert statistics['solverRuns'] and all(run['branches'] >= 0 for run in statistics['solverRuns'])
+    assert statistics['solveSeconds'] > 0
+    profile = statistics['profile']
+    assert os.path.dirname(profile['cprofileFile']) == str(tmp_path)
+    assert os.path.exists(profile['solverLogFile']) and profile['cprofileTop']
+
+
+def test_metrics_render_in_prometheus_text_format():
+    registry = MetricsRegistry()
+    registry.describe("requests_total", "counter", "Requests")
+    registry.describe("request_seconds", "histogram", "Request time", buckets=[1, 5])
+    registry.inc("requests_total", endpoint="schedule", status="feasible")
+    registry.inc("requests_total", endpoint="schedule", status="feasible")
+    registry.observe("request_seconds", 2.5, endpoint="schedule")
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{endpoint="schedule",status="feasible"} 2' in lines
+    assert 'request_seconds_bucket{endpoint="schedule",le="1"} 0' in lines
+    assert 'request_seconds_bucket{endpoint="schedule",le="5"} 1' in lines
+    assert 'request_seconds_count{endpoint="schedule"} 1' in lines
@@ -0,0 +1,36 @@
+# test_jobs.py
+import multiprocessing
+import os
+
+from conftest import small_payload, wait_for
+from jobs import CANCELLED, COMPLETED, JobManager, QUEUED
+
+
+def open_fds():
+    return len(os.listdir("/proc/self/fd"))
+
+
+def test_job_cancelled_before_it_starts(tmp_path, monkeypatch):
+    manager = JobManager(max_workers=1, directory=str(tmp_path))
+    wait_for(manager, manager.submit(small_payload(time_limit=1)).id)
+    fds = open_fds()
+    pipes = []
+    pipe = multiprocessing.Pipe
+    monkeypatch.setattr(multiprocessing, "Pipe", lambda *args, **kwargs: pipes.append(args) or pipe(*args, **kwargs))
+
+    # The only worker is busy with the first job while the second is cancelled
+    running = manager.submit(small_payload(time_limit=1, seed=1))
+    queued = manager.submit(small_payload(time_limit=1, seed=2))
+    assert manager.get(queued.id).status == QUEUED
+    assert manager.cancel(queued.id).status == CANCELLED
+
+    assert wait_for(manager, running.id).status == COMPLETED
+    manager.queue.join()
+    job = manager.get(queued.id)
+    assert job.status == CANCELLED and job.started_at is None and job.process is None
+    assert manager.stats()["jobs"] == {COMPLETED: 2, CANCELLED: 1}
+    # Other server processes see it cancelled too
+    assert JobManager(max_workers=0, directory=str(tmp_path)).get(queued.id).status == CANCELLED
+    # No pipe is opened for a job that never starts
+    assert len(pipes) == 1
+    assert open_fds() == fds
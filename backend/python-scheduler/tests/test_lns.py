@@ -0,0 +1,35 @@
+# test_lns.py
+from conftest import small_payload
+from lns import LNSScheduler
+from validation import TimetableValidator
+
+
+def test_lns_improves_on_the_draft_within_the_budget():
+    payload = small_payload(num_classes=12, lab_ratio=0.2, time_limit=4)
+    payload["solverOptions"].update(engine="lns", lnsStepTime=0.5, heuristicTime=0.5)
+    scheduler = LNSScheduler(payload)
+    assignments = dict(scheduler.teacher_classes)
+
+    result = scheduler.generate_schedule()
+
+    assert result["status"] in ("optimal", "feasible") and result["statistics"]["engine"] == "lns"
+    assert result["statistics"]["solveSeconds"] < 5
+    lns = result["statistics"]["lns"]
+    assert lns["iterations"] > 0
+    assert result["statistics"]["objective"]["total"] <= lns["initialObjective"]
+    validator = TimetableValidator(dict(payload, checkHours=True))
+    assert validator.validate(validator.index(result["schedule"])) == []
+    # The neighborhood index leaves the assignment index alone
+    assert scheduler.teacher_classes == assignments
+
+
+def test_neighborhoods_free_whole_days_or_whole_classes():
+    scheduler = LNSScheduler(small_payload(num_classes=8))
+    scheduler._index_neighborhoods()
+    num_days = len(scheduler.days)
+
+    day = scheduler._neighborhood("day", 0.1)
+    assert day.any(axis=0).sum() == 1 and day.sum() == round(0.1 * 8 * num_days)
+    for kind in ("teacher", "classes"):
+        free = scheduler._neighborhood(kind, 0.25)
+        assert all(row.all() or not row.any() for row in free) and free.any()
@@ -0,0 +1,40 @@
+# test_objective.py
+import pytest
+
+from decomposition import solve_schedule
+
+
+def one_day_payload(hours, unavailable=(), rules=None, engine="cpsat"):
+    """One class whose single teacher teaches `hours` lessons in a five-period day"""
+    return {
+        "classes": [{"id": "c1", "subjects": [{"subjectId": "s1", "teacherId": "t1", "hoursPerWeek": hours}]}],
+        "teachers": [{"id": "t1", "unavailableSlots": [{"day": "Monday", "period": p} for p in unavailable]}],
+        "subjects": [{"id": "s1"}],
+        "objective": {"rules": rules or {}},
+        "solverOptions": {"days": 1, "periods": 5, "timeLimit": 2, "engine": engine},
+    }
+
+
+def teacher_gaps(result):
+    assert result['status'] in ("optimal", "feasible")
+    return result['statistics']['objective']['terms']['teacherGaps']['penalty']
+
+
+@pytest.mark.parametrize("engine", ["cpsat", "heuristic"])
+def test_mandatory_break_is_not_a_teacher_gap(engine):
+    # No back-to-back lessons: 1, 3 and 5 is the only timetable
+    result = solve_schedule(one_day_payload(3, engine=engine))
+    assert sorted(item['period'] for item in result['schedule']) == [1, 3, 5]
+    assert teacher_gaps(result) == 0
+
+
+@pytest.mark.parametrize("engine", ["cpsat", "heuristic"])
+def test_longer_hole_is_a_teacher_gap(engine):
+    result = solve_schedule(one_day_payload(2, unavailable=(2, 3, 4), engine=engine))
+    assert sorted(item['period'] for item in result['schedule']) == [1, 5]
+    assert teacher_gaps(result) == 1
+
+
+def test_every_hole_counts_when_back_to_back_lessons_are_allowed():
+    payload = one_day_payload(3, unavailable=(2, 4), rules={"teacherNoConsecutive": "soft"})
+    assert teacher_gaps(solve_schedule(payload)) == 2
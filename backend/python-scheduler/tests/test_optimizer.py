@@ -0,0 +1,73 @@
+# test_optimizer.py
+from collections import Counter
+
+from conftest import small_payload
+from objective import DEFAULT_WEIGHTS
+from optimizer import TimetableScheduler
+
+
+def test_sparse_model_only_covers_each_class_subjects(templates):
+    payload = small_payload(num_classes=4)
+    schedulers = {sparse: TimetableScheduler(payload, sparse=sparse) for sparse in (True, False)}
+    results = {sparse: scheduler.generate_schedule() for sparse, scheduler in schedulers.items()}
+
+    slots = len(schedulers[True].days) * len(schedulers[True].periods)
+    taken = {c['id']: {s['subjectId'] for s in c['subjects']} for c in payload['classes']}
+    sparse, dense = results[True]['statistics']['model'], results[False]['statistics']['model']
+    assert sparse['subjectVariables'] == sum(map(len, taken.values())) * slots
+    assert dense['subjectVariables'] == len(payload['subjects']) * len(taken) * slots
+    assert sparse['variables'] < dense['variables']
+    # Sparse mode leaves unused slots free; dense mode pads every slot as before
+    hours = sum(s['hoursPerWeek'] for c in payload['classes'] for s in c['subjects'])
+    assert all(result['status'] in ("optimal", "feasible") for result in results.values())
+    assert len(results[True]['schedule']) == hours
+    assert all(item['subjectId'] in taken[item['classId']] for item in results[True]['schedule'])
+    assert len(results[False]['schedule']) == len(taken) * slots
+
+
+def test_teacher_occupancy_comes_from_the_classes_they_teach(templates):
+    payload = small_payload(num_classes=4)
+    scheduler = TimetableScheduler(dict(payload, objective={"weights": {name: 0 for name in DEFAULT_WEIGHTS}}))
+    is_sub, teacher_slots = scheduler._create_variables_and_constraints()
+
+    # One literal per (class, subject) the teacher takes and no integer
+    # teacher variable per slot
+    for (teacher_idx, _, _), literals in teacher_slots.items():
+        assignments = scheduler.teacher_classes[scheduler.teacher_ids[teacher_idx]]
+        assert len(literals) == len(assignments)
+    assert all(list(var.domain) == [0, 1] for var in scheduler.model.Proto().variables)
+
+    result = TimetableScheduler(payload).generate_schedule()
+    assert result['statistics']['conflicts'] == 0
+    slots = Counter((item['teacherId'], item['day'], item['period']) for item in result['schedule'])
+    assert max(slots.values()) == 1
+    days = Counter((teacher_id, day) for teacher_id, day, _ in slots)
+    for teacher in payload['teachers']:
+        assert all(days[(teacher['id'], day)] <= scheduler._teacher_daily_limit(teacher) for day in scheduler.days)
+
+
+def test_assignment_index_maps_both_ways():
+    payload = small_payload(num_classes=2)
+    first = payload['classes'][0]['subjects'][0]
+    # A repeated subject keeps the first listed teacher
+    payload['classes'][0]['subjects'].append(dict(first, teacherId=payload['teachers'][-1]['id']))
+    scheduler = TimetableScheduler(payload)
+
+    for class_obj in payload['classes']:
+        for subject_info in class_obj['subjects']:
+            teacher_id = scheduler._get_teacher_for_subject(class_obj['id'], subject_info['subjectId'])
+            assert (class_obj['id'], subject_info['subjectId']) in scheduler.teacher_classes[teacher_id]
+    assert scheduler._get_teacher_for_subject(payload['classes'][0]['id'], first['subjectId']) == first['teacherId']
+    assert scheduler._get_teacher_for_subject("nowhere", first['subjectId']) is None
+    assert sum(map(len, scheduler.teacher_classes.values())) == sum(len(c['subjects']) for c in payload['classes']) - 1
+
+
+def test_stop_before_the_first_search_gives_no_timetable():
+    scheduler = TimetableScheduler(small_payload())
+    scheduler.stop_search()
+
+    result = scheduler.generate_schedule()
+
+    assert result['status'] == "infeasible" and result['schedule'] == []
+    assert result['message'] == "Failed to generate feasible schedule"
+    assert result['statistics']['solverRuns'] == []
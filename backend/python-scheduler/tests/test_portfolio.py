@@ -0,0 +1,57 @@
+# test_portfolio.py
+import threading
+import time
+
+import pytest
+
+import portfolio
+from conftest import small_payload
+from decomposition import solve_schedule
+from optimizer import TimetableScheduler
+from solver_config import resolve_config
+
+
+def test_portfolio_members_resolve_from_a_count_or_a_list():
+    members = resolve_config({"portfolio": 3, "randomSeed": 10})["portfolio"]
+    assert [member["randomSeed"] for member in members] == [10, 11, 12]
+    assert resolve_config({"portfolio": 1})["portfolio"] == []
+    assert resolve_config({"portfolio": [{"randomSeed": 1}, {"strengthen": True}]})["portfolio"] == [
+        {"randomSeed": 1}, {"strengthen": True}]
+    with pytest.raises(ValueError, match="Unknown portfolio setting"):
+        resolve_config({"portfolio": [{"timeLimit": 1}, {}]})
+
+
+def test_reaching_the_target_stops_the_portfolio():
+    payload = small_payload(time_limit=20)
+    payload["solverOptions"].update(portfolio=2, numWorkers=2, targetObjective=10000)
+
+    result = solve_schedule(payload)
+
+    assert result["status"] in ("optimal", "feasible")
+    stats = result["statistics"]["portfolio"]
+    assert stats["stopReason"] == "target"
+    assert len(stats["members"]) == 2 and stats["solveSeconds"] < 20
+    winner = stats["members"][stats["winner"]]
+    assert winner["settings"] == stats["winnerSettings"]
+    assert winner["objective"] == result["statistics"]["objective"]["total"]
+
+
+def test_member_stopped_while_building_its_model(monkeypatch):
+    stop_event = threading.Event()
+    monkeypatch.setattr(portfolio, "_stop_event", stop_event)
+    build = TimetableScheduler._create_variables_and_constraints
+
+    def build_then_stop(self):
+        # Another member settles the search while this one builds its model
+        structure = build(self)
+        stop_event.set()
+        assert self.stop_requested.wait(1)
+        return structure
+
+    monkeypatch.setattr(TimetableScheduler, "_create_variables_and_constraints", build_then_stop)
+    payload = small_payload()
+    config = resolve_config(dict(payload["solverOptions"], portfolio=2))
+
+    result, reason, _ = portfolio._solve_member(payload, config, config["portfolio"][0], time.time() + 5)
+
+    assert reason == "stopped" and result["status"] == "infeasible"
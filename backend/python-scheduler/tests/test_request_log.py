@@ -0,0 +1,53 @@
+# test_request_log.py
+import json
+import logging
+from logging.handlers import QueueHandler
+
+import request_log
+from request_log import RequestLog, capture_logger, read_captures
+
+SMALL = {"classes": [{"id": "c1"}], "teachers": []}
+LARGE = {"classes": [{"id": f"c{idx}"} for idx in range(100)]}
+
+
+def capture_all(log, *payloads):
+    for payload in payloads:
+        log.capture("schedule", payload, json.dumps(payload).encode())
+    log.close()
+
+
+def test_sampled_capture_skips_oversized_payloads(tmp_path):
+    path = str(tmp_path / "requests.jsonl")
+    capture_all(RequestLog(path, sample_rate=1.0, max_bytes=200), SMALL, LARGE)
+
+    entries = read_captures(path)
+    assert [entry["payload"] for entry in entries] == [SMALL]
+    assert entries[0]["summary"]["classes"] == 1 and entries[0]["endpoint"] == "schedule"
+    # Closing detaches the log from the shared capture logger
+    assert not any(isinstance(handler, QueueHandler) for handler in capture_logger.handlers)
+
+
+def test_debug_level_captures_every_payload(tmp_path):
+    path = str(tmp_path / "requests.jsonl")
+    capture_all(RequestLog(path, max_bytes=200, level=logging.DEBUG), SMALL, LARGE)
+    assert [entry["payload"] for entry in read_captures(path)] == [SMALL, LARGE]
+
+
+def test_nothing_is_written_without_sampling(tmp_path):
+    path = tmp_path / "requests.jsonl"
+    log = RequestLog(str(path))
+    assert log.capture("schedule", SMALL, json.dumps(SMALL).encode())
+    log.close()
+    assert not path.exists()
+
+
+def test_each_worker_rotates_its_own_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "requests.jsonl")
+    for pid, payload in ((101, SMALL), (102, LARGE)):
+        monkeypatch.setattr(request_log.os, "getpid", lambda: pid)
+        capture_all(RequestLog(path, sample_rate=1.0, rotate_bytes=300), payload, payload)
+
+    names = {p.name for p in tmp_path.iterdir()}
+    assert {"requests-101.jsonl", "requests-101.jsonl.1", "requests-102.jsonl", "requests-102.jsonl.1"} <= names
+    assert "requests.jsonl" not in names
+    assert [entry["payload"] for entry in read_captures(path)] == [SMALL, SMALL, LARGE, LARGE]
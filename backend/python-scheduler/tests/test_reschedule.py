@@ -0,0 +1,96 @@
+# test_reschedule.py
+import time
+
+import reschedule
+from conftest import small_payload
+from decomposition import solve_schedule
+
+
+def test_attempts_share_the_time_limit(monkeypatch):
+    payload = small_payload(time_limit=1)
+    previous = solve_schedule(payload)['schedule']
+    limits = []
+
+    class SlowScheduler(reschedule.TimetableScheduler):
+        def generate_schedule(self):
+            limits.append(self.config['timeLimit'])
+            time.sleep(0.4)
+            return {"status": "infeasible", "message": "", "schedule": [], "statistics": {}}
+
+    monkeypatch.setattr(reschedule, "TimetableScheduler", SlowScheduler)
+    first_class = payload['classes'][0]['id']
+    result = reschedule.reschedule(dict(payload, previousTimetable=previous, changes={"classIds": [first_class]}))
+
+    attempts = result['statistics']['reschedule']['attempts']
+    assert attempts[0]['scope'] == "affected"
+    assert len(limits) == len(attempts) < 4
+    assert limits[0] <= 1 and all(later <= earlier - 0.4 for earlier, later in zip(limits, limits[1:]))
+    assert result['statistics']['reschedule']['totalTime'] < 1 + 0.4 + 0.3
+
+
+def repair(payload, previous, **data):
+    result = reschedule.reschedule(dict(payload, previousTimetable=previous, **data))
+    assert result['status'] in ("optimal", "feasible")
+    return result, result['statistics']['reschedule']
+
+
+def lessons(schedule, class_ids):
+    return sorted((i['classId'], i['day'], i['period'], i['subjectId'])
+                  for i in schedule if i['classId'] in class_ids)
+
+
+def test_reassigned_teacher_makes_the_class_stale():
+    payload = small_payload()
+    previous = solve_schedule(payload)['schedule']
+    subject = payload['classes'][0]['subjects'][0]
+    subject['teacherId'] = next(t['id'] for t in payload['teachers'] if t['id'] != subject['teacherId'])
+
+    assert reschedule.stale_classes(reschedule.TimetableScheduler(payload), previous) == {payload['classes'][0]['id']}
+
+
+def test_unavailable_teacher_frees_only_the_clashing_class():
+    payload = small_payload(num_classes=8, departments=2, time_limit=5)
+    previous = solve_schedule(payload)['schedule']
+    lesson = previous[0]
+    teacher = next(t for t in payload['teachers'] if t['id'] == lesson['teacherId'])
+    teacher['unavailableSlots'].append({"day": lesson['day'], "period": lesson['period']})
+    # Send the previous timetable as TimetableCell documents
+    cells = {}
+    for item in previous:
+        cells.setdefault(item['classId'], []).append({
+            "day": item['day'], "period": item['period'], "subject": item['subjectId'], "teacher": item['teacherId']})
+    documents = [{"class": class_id, "timetable": timetable} for class_id, timetable in cells.items()]
+
+    result, stats = repair(payload, documents)
+
+    assert stats['freedClassIds'] == [lesson['classId']]
+    assert [attempt['scope'] for attempt in stats['attempts']] == ["affected"]
+    frozen = {c['id'] for c in payload['classes']} - {lesson['classId']}
+    assert lessons(result['schedule'], frozen) == lessons(previous, frozen)
+    assert not any(i['teacherId'] == teacher['id'] and (i['day'], i['period']) == (lesson['day'], lesson['period'])
+                   for i in result['schedule'])
+    assert 0 < stats['changedSlots'] <= 6
+
+
+def test_clash_with_a_pinned_class_widens_to_teacher_neighbours():
+    payload = small_payload(num_classes=8, departments=2, time_limit=5)
+    previous = solve_schedule(payload)['schedule']
+    # Pin a class's subject to a slot where its teacher is teaching another class
+    busy = {(i['teacherId'], i['day'], i['period']): i['classId'] for i in previous}
+    class_id, subject_id, day, period = next(
+        (c['id'], s['subjectId'], day, period)
+        for c in payload['classes'] for s in c['subjects']
+        for (teacher_id, day, period), other in busy.items()
+        if teacher_id == s['teacherId'] and other != c['id'])
+    payload['fixedSlots'] = [{"classId": class_id, "day": day, "period": period, "subjectId": subject_id}]
+
+    result, stats = repair(payload, previous)
+
+    assert stats['freedClassIds'] == [class_id]
+    assert [attempt['scope'] for attempt in stats['attempts']] == ["affected", "neighbours"]
+    assert stats['attempts'][0]['status'] == "infeasible"
+    scheduler = reschedule.TimetableScheduler(payload)
+    frozen = set(scheduler.class_ids) - reschedule.teacher_neighbours(scheduler, {class_id})
+    assert frozen
+    assert lessons(result['schedule'], frozen) == lessons(previous, frozen)
+    assert (class_id, day, period, subject_id) in lessons(result['schedule'], {class_id})
@@ -0,0 +1,68 @@
+# test_rooms.py
+import copy
+import time
+from types import SimpleNamespace
+
+import optimizer
+from conftest import small_payload
+from decomposition import solve_schedule
+from rooms import assign_rooms
+
+SCHEDULER = SimpleNamespace(
+    days=["Monday", "Tuesday"],
+    periods=[1, 2],
+    subject_to_index={"lab": 0, "maths": 1},
+    lab_subjects={0},
+    classes_dict={"a": {"studentCount": 20}, "b": {"studentCount": 40}, "c": {"studentCount": 20}},
+)
+ROOMS = [{"id": "small-lab", "type": "lab", "capacity": 20}, {"id": "big-lab", "type": "lab", "capacity": 40}]
+
+
+def lesson(class_id, day, period, subject_id="lab"):
+    return {"classId": class_id, "day": day, "period": period, "subjectId": subject_id}
+
+
+def test_lab_pair_moves_when_its_room_is_needed():
+    # c starts its lab pair in the big lab, which b needs in period 2
+    schedule = [lesson("a", "Monday", 1), lesson("c", "Monday", 1),
+                lesson("c", "Monday", 2), lesson("b", "Monday", 2)]
+
+    stats = assign_rooms(SCHEDULER, schedule, ROOMS)
+
+    assert [item['roomId'] for item in schedule] == ["small-lab", "big-lab", "small-lab", "big-lab"]
+    assert stats['unassigned'] == []
+    assert stats['labRoomChanges'] == 1
+
+
+def test_lab_pair_keeps_its_room_when_possible():
+    schedule = [lesson("a", "Tuesday", 1), lesson("c", "Tuesday", 1),
+                lesson("c", "Tuesday", 2), lesson("a", "Tuesday", 2, "maths")]
+
+    stats = assign_rooms(SCHEDULER, schedule, ROOMS + [{"id": "room", "capacity": 30}])
+
+    assert [item['roomId'] for item in schedule] == ["small-lab", "big-lab", "big-lab", "room"]
+    assert stats['labRoomChanges'] == 0
+
+
+def test_auto_room_retry_gets_the_remaining_time(monkeypatch):
+    payload = small_payload(time_limit=2)
+    payload['solverOptions']['roomAssignment'] = "stage"
+    result = solve_schedule(payload)
+    # One room cannot host every lesson, so the stage leaves some unassigned
+    payload['rooms'] = [{"id": "r1", "type": "classroom"}]
+    payload['solverOptions']['roomAssignment'] = "auto"
+    scheduler = optimizer.TimetableScheduler(payload)
+
+    retries = []
+
+    def retry(self, on_solution=None):
+        retries.append(self.config['timeLimit'])
+        return {"status": "infeasible", "message": "", "schedule": [], "statistics": {}}
+
+    monkeypatch.setattr(optimizer.TimetableScheduler, "generate_schedule", retry)
+    scheduler.with_rooms(copy.deepcopy(result), time.time() - 1.5)
+    assert len(retries) == 1 and 0.4 < retries[0] <= 0.5
+
+    late = scheduler.with_rooms(copy.deepcopy(result), time.time() - 2)
+    assert len(retries) == 1
+    assert late['statistics']['rooms']['unassigned']
@@ -0,0 +1,62 @@
+# test_scenarios.py
+import re
+
+import pytest
+
+from conftest import small_payload
+from scenarios import apply_delta, solve_scenarios
+
+PERIODS = [1, 2, 3]
+
+
+def test_apply_delta_reports_touched_entities_and_leaves_the_base_alone():
+    data = small_payload()
+    teacher_id = data['teachers'][0]['id']
+    class_obj = data['classes'][0]
+    subject_id = class_obj['subjects'][0]['subjectId']
+
+    payload, changes = apply_delta(data, {
+        "unavailableSlots": [{"teacherId": teacher_id, "day": "Monday"}],
+        "hoursPerWeek": [{"classId": class_obj['id'], "subjectId": subject_id, "hoursPerWeek": 1}],
+    }, PERIODS)
+
+    assert changes == {"teacherIds": [teacher_id], "classIds": [class_obj['id']]}
+    assert payload['teachers'][0]['unavailableSlots'][-3:] == [{"day": "Monday", "period": p} for p in PERIODS]
+    assert payload['classes'][0]['subjects'][0]['hoursPerWeek'] == 1
+    assert data == small_payload()
+
+
+@pytest.mark.parametrize("delta, message", [
+    ({"rooms": []}, "Unknown delta operation(s): rooms"),
+    ({"unavailableSlots": [{"teacherId": "nobody", "day": "Monday"}]}, "Unknown teacher: nobody"),
+    ({"hoursPerWeek": [{"subjectId": "nothing", "hoursPerWeek": 2}]}, "Unknown subject: nothing"),
+    ({"fixedSlots": [{"classId": "nowhere", "day": "Monday", "period": 1}]}, "Unknown class: nowhere"),
+    ({"teachers": [{"name": "no id"}]}, "Unknown teacher: None"),
+])
+def test_apply_delta_rejects_invalid_deltas(delta, message):
+    with pytest.raises(ValueError, match=re.escape(message)):
+        apply_delta(small_payload(), delta, PERIODS)
+
+
+def test_apply_delta_rejects_hours_for_a_subject_no_class_takes():
+    data = small_payload()
+    data['subjects'].append({"id": "unused", "name": "Unused"})
+    with pytest.raises(ValueError, match="No class takes subject unused"):
+        apply_delta(data, {"hoursPerWeek": [{"subjectId": "unused", "hoursPerWeek": 2}]}, PERIODS)
+
+
+def test_scenarios_report_their_time_next_to_the_base():
+    data = small_payload(time_limit=2)
+    data['solverOptions'].update(decompose=False, scenarioTimeLimit=1, numWorkers=2)
+    data['scenarios'] = [{"name": "unchanged", "delta": {}},
+                         {"name": "day off", "delta": {"unavailableSlots": [
+                             {"teacherId": data['teachers'][0]['id'], "day": "Friday"}]}}]
+
+    result = solve_scenarios(data)
+
+    statistics = result['statistics']
+    assert [scenario['name'] for scenario in result['scenarios']] == ["unchanged", "day off"]
+    assert result['scenarios'][0]['objectiveDelta'] == 0
+    # Both variants run side by side, so the scenario phase gets one scenarioTimeLimit
+    assert statistics['poolSize'] == 2 and statistics['scenarioBudget'] == 1
+    assert statistics['baseSeconds'] + statistics['scenarioSeconds'] <= statistics['totalTime'] + 0.01
@@ -0,0 +1,25 @@
+# test_serving.py
+import os
+import subprocess
+import sys
+
+SCHEDULER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scheduler")
+
+LIGHT_REQUESTS = """
+import sys
+import main
+client = main.app.test_client()
+assert client.get("/health").status_code == 200
+response = client.post("/optimize", json={"timetable": [
+    {"classId": "c1", "day": "Tuesday", "period": 2, "subjectId": "s1"},
+    {"classId": "c1", "day": "Monday", "period": 3, "subjectId": "s2"},
+]})
+assert [item["day"] for item in response.get_json()["optimizedTimetable"]] == ["Monday", "Tuesday"]
+print("ortools" in sys.modules)
+"""
+
+
+def test_light_endpoints_do_not_import_ortools():
+    output = subprocess.run([sys.executable, "-c", LIGHT_REQUESTS], cwd=SCHEDULER_DIR,
+                            capture_output=True, text=True, check=True)
+    assert output.stdout.strip().splitlines()[-1] == "False"
@@ -0,0 +1,89 @@
+# test_shared_state.py
+import json
+import os
+import subprocess
+import sys
+
+from instrumentation import MetricsRegistry
+from validation import TimetableValidator, ValidationSessions
+
+PAYLOAD = {
+    "classes": [{"id": "c1", "subjects": [{"subjectId": "s1", "teacherId": "t1", "hoursPerWeek": 2}]}],
+    "teachers": [{"id": "t1"}],
+    "subjects": [{"id": "s1"}],
+}
+TIMETABLE = [
+    {"classId": "c1", "day": "Monday", "period": 1, "subjectId": "s1", "teacherId": "t1"},
+    {"classId": "c1", "day": "Tuesday", "period": 1, "subjectId": "s1", "teacherId": "t1"},
+]
+
+
+def lesson_slots(session):
+    with session["lock"]:
+        return sorted((item["day"], item["period"]) for item in session["state"].timetable())
+
+
+def test_sessions_are_shared_through_the_directory(tmp_path):
+    # Two stores on one directory stand in for two server processes
+    first = ValidationSessions(directory=str(tmp_path))
+    second = ValidationSessions(directory=str(tmp_path))
+    validator = TimetableValidator(PAYLOAD)
+    session_id = first.create(validator, validator.index(TIMETABLE), dict(PAYLOAD, timetable=TIMETABLE))
+
+    session = second.get(session_id)
+    assert lesson_slots(session) == [("Monday", 1), ("Tuesday", 1)]
+
+    move = {"move": {"classId": "c1", "day": "Monday", "period": 1}, "to": {"period": 3}}
+    with session["lock"]:
+        assert session["validator"].check_edit(session["state"], move, commit=True)["valid"]
+        second.save(session_id, session)
+
+    assert lesson_slots(first.get(session_id)) == [("Monday", 3), ("Tuesday", 1)]
+    assert second.delete(session_id)
+    assert first.get(session_id) is None
+
+
+def test_expired_shared_session_is_dropped(tmp_path):
+    sessions = ValidationSessions(ttl_seconds=60, directory=str(tmp_path))
+    validator = TimetableValidator(PAYLOAD)
+    session_id = sessions.create(validator, validator.index(TIMETABLE), PAYLOAD)
+    for suffix in ("json", "lock"):
+        os.utime(tmp_path / f"{session_id}.{suffix}", (0, 0))
+
+    assert ValidationSessions(ttl_seconds=60, directory=str(tmp_path)).get(session_id) is None
+    assert not os.listdir(tmp_path)
+
+
+def metrics_registry(directory):
+    registry = MetricsRegistry()
+    registry.describe("requests_total", "counter", "Requests")
+    registry.describe("jobs", "gauge", "Jobs")
+    registry.describe("seconds", "histogram", "Seconds", buckets=(1, 10))
+    registry.share(str(directory))
+    return registry
+
+
+def test_metrics_are_merged_across_processes(tmp_path):
+    first, second = metrics_registry(tmp_path), metrics_registry(tmp_path)
+    first.inc("requests_total", endpoint="schedule")
+    first.observe("seconds", 0.5)
+    first.set("jobs", 1, state="running")
+    second.inc("requests_total", 2, endpoint="schedule")
+    second.observe("seconds", 5)
+    second.set("jobs", 2, state="running")
+    second.flush()
+
+    # An exited process keeps its counters but not its gauges
+    exited = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"],
+                            capture_output=True, text=True, check=True)
+    with open(tmp_path / "exited.json", "w") as f:
+        json.dump({"pid": int(exited.stdout), "time": 0,
+                   "values": [["requests_total", [["endpoint", "schedule"]], 4],
+                              ["jobs", [["state", "running"]], 7]],
+                   "histograms": []}, f)
+
+    lines = first.render().splitlines()
+    assert 'requests_total{endpoint="schedule"} 7' in lines
+    assert 'jobs{state="running"} 3' in lines
+    assert 'seconds_bucket{le="1"} 1' in lines
+    assert "seconds_count 2" in lines
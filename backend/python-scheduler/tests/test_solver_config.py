@@ -0,0 +1,24 @@
+# test_solver_config.py
+import math
+
+import pytest
+
+from solver_config import resolve_config
+
+
+@pytest.mark.parametrize("value", [math.nan, math.inf, -math.inf, "nan", "inf"])
+def test_time_limit_must_be_finite(value):
+    with pytest.raises(ValueError, match="timeLimit must be a finite number"):
+        resolve_config({"timeLimit": value})
+
+
+@pytest.mark.parametrize("key", ["heuristicTime", "lnsStepTime", "scenarioTimeLimit", "relativeGap", "targetObjective"])
+def test_float_options_must_be_finite(key):
+    with pytest.raises(ValueError, match=f"{key} must be a finite number"):
+        resolve_config({key: math.inf})
+
+
+def test_environment_time_limit_must_be_finite():
+    with pytest.raises(ValueError, match="timeLimit"):
+        resolve_config(environ={"SCHED_TIME_LIMIT": "nan"})
+    assert resolve_config({"timeLimit": "2.5"}, environ={})["timeLimit"] == 2.5
@@ -0,0 +1,50 @@
+# test_streaming.py
+import json
+
+from conftest import small_payload
+from optimizer import TimetableScheduler
+
+
+def test_stopping_at_the_first_solution_keeps_it():
+    solutions = []
+
+    def on_solution(solution):
+        solutions.append(solution)
+        return False
+
+    result = TimetableScheduler(small_payload(time_limit=10)).generate_schedule(on_solution=on_solution)
+
+    assert len(solutions) == 1 and solutions[0]['solutionIndex'] == 1
+    assert solutions[0]['schedule'] and solutions[0]['wallTime'] < 10
+    assert result['status'] in ("optimal", "feasible") and result['schedule']
+
+
+def test_stream_endpoint_sends_solutions_then_the_result():
+    import main
+    response = main.app.test_client().post("/schedule/stream", json=small_payload())
+
+    assert response.mimetype == "application/x-ndjson"
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [event['event'] for event in events] == ["solution"] * (len(events) - 1) + ["result"]
+    solutions = [event for event in events if event['event'] == "solution"]
+    assert solutions and all(event['schedule'] for event in solutions)
+    objectives = [event['objective'] for event in solutions]
+    assert objectives == sorted(objectives, reverse=True)
+    assert events[-1]['status'] == "success" and events[-1]['timetable']
+
+
+def test_first_timetable_is_streamed_before_the_objective_phase():
+    solutions = []
+    payload = small_payload(num_classes=12, lab_ratio=0.2, time_limit=4)
+    scheduler = TimetableScheduler(payload)
+
+    result = scheduler.generate_schedule(on_solution=lambda solution: solutions.append(solution))
+
+    # Default weights: a feasibility phase, then the objective phase
+    assert [run['phase'] for run in result['statistics']['solverRuns']] == ["solveFeasibility", "solveObjective"]
+    first = solutions[0]
+    assert first['bestBound'] is None and first['schedule']
+    assert first['wallTime'] <= result['statistics']['timeToFirstSolution'] + 0.05
+    objectives = [solution['objective'] for solution in solutions]
+    assert objectives == sorted(set(objectives), reverse=True)
+    assert objectives[-1] >= result['statistics']['objective']['total']
@@ -0,0 +1,34 @@
+# test_strengthening.py
+from optimizer import TimetableScheduler
+from strengthening import _class_groups
+from synthetic import generate_payload
+
+
+def sections_payload(**options):
+    """Two identical sections plus one other class on a small week"""
+    payload = generate_payload(3, num_teachers=3, num_subjects=3, subjects_per_class=2, sections=2)
+    payload["solverOptions"] = dict({"timeLimit": 10, "decompose": False, "days": 3, "periods": 5}, **options)
+    return payload
+
+
+def test_identical_sections_are_grouped_unless_pinned():
+    payload = sections_payload()
+    assert _class_groups(TimetableScheduler(payload)) == [[0, 1]]
+
+    payload["fixedSlots"] = [{"classId": "cls0001", "day": "Monday", "period": 1,
+                              "subjectId": payload["classes"][1]["subjects"][0]["subjectId"]}]
+    assert _class_groups(TimetableScheduler(payload)) == []
+
+
+def test_strengthened_model_keeps_the_optimum(templates):
+    result = TimetableScheduler(sections_payload(strengthen=True)).generate_schedule()
+
+    statistics = result["statistics"]
+    assert statistics["model"]["strengthening"] == {
+        "classGroups": 1, "dayGroups": 1, "reversibleDays": 3, "impliedConstraints": 6}
+    # 0 is the best any timetable can do, so symmetry breaking lost nothing
+    assert result["status"] == "optimal" and statistics["objective"]["total"] == 0
+    assert statistics["conflicts"] == 0
+    hours = {c["id"]: sum(s["hoursPerWeek"] for s in c["subjects"]) for c in sections_payload()["classes"]}
+    assert {class_id: sum(1 for item in result["schedule"] if item["classId"] == class_id)
+            for class_id in hours} == hours
@@ -0,0 +1,34 @@
+# test_templates.py
+from conftest import small_payload, wait_for
+from decomposition import solve_schedule
+from jobs import JobManager
+
+
+def test_job_templates_reach_the_next_job(templates):
+    payload = small_payload()
+    payload["solverOptions"]["decompose"] = False
+    manager = JobManager(max_workers=1)
+    adopted = templates.stats()["adopted"]
+
+    statuses = []
+    for _ in range(2):
+        job = wait_for(manager, manager.submit(payload).id)
+        assert job.status == "completed"
+        statuses.append(job.result["statistics"]["model"]["template"])
+
+    assert statuses == ["stored", "hit"]
+    assert templates.stats()["adopted"] == adopted + 1
+
+
+def test_decomposed_components_reuse_templates(templates):
+    payload = small_payload(departments=2)
+    payload["solverOptions"]["numWorkers"] = 2
+
+    runs = []
+    for _ in range(2):
+        result = solve_schedule(payload)
+        assert result["status"] in ("optimal", "feasible")
+        details = result["statistics"]["decomposition"]["componentDetails"]
+        runs.append([detail["model"]["template"] for detail in details])
+
+    assert runs == [["stored", "stored"], ["hit", "hit"]]
@@ -0,0 +1,40 @@
+# test_timetable_array.py
+from timetable_array import TimetableArray
+
+ITEMS = [
+    {"classId": "c1", "day": "Monday", "period": 1, "subjectId": "s1", "teacherId": "t1", "roomId": "r1"},
+    {"classId": "c2", "day": "Monday", "period": 1, "subjectId": "s2", "teacherId": "t1", "roomId": "r1"},
+    {"classId": "c1", "day": "Tuesday", "period": 2, "subjectId": "s2", "teacherId": "t2", "roomId": "r2"},
+    {"classId": "c1", "day": "Tuesday", "period": 2, "subjectId": "s1", "teacherId": "t3", "roomId": None},
+]
+
+
+def test_items_round_trip_and_counts():
+    solution = TimetableArray.from_items(ITEMS)
+
+    assert solution.to_items() == [dict(item) for item in ITEMS]
+    assert solution.counts("teacher") == {"t1": 2, "t2": 1, "t3": 1}
+    assert solution.counts("room") == {"r1": 2, "r2": 1}
+    assert solution.usage("class", ["c1", "c2", "c3"]) == {"c1": 3, "c2": 1, "c3": 0}
+    assert solution.slot_usage().tolist() == [[2, 0], [0, 2]]
+
+
+def test_conflicts_are_reported_in_lesson_order():
+    conflicts = TimetableArray.from_items(ITEMS).conflicts()
+
+    assert [(c["type"], c.get("teacherId") or c.get("roomId") or c.get("classId"), c["day"], c["period"])
+            for c in conflicts] == [
+        ("teacher_double_booking", "t1", "Monday", 1),
+        ("room_double_booking", "r1", "Monday", 1),
+        ("class_double_booking", "c1", "Tuesday", 2),
+    ]
+    assert conflicts[2]["message"] == "Class c1 has overlapping subjects at Tuesday period 2"
+
+
+def test_views_group_lessons_by_class_teacher_and_room():
+    views = TimetableArray.from_items(ITEMS).views()
+
+    assert views["byClass"] == {"c1": {"Monday": [ITEMS[0]], "Tuesday": [ITEMS[2], ITEMS[3]]},
+                                "c2": {"Monday": [ITEMS[1]]}}
+    assert views["byTeacher"]["t1"] == ITEMS[:2]
+    assert views["byRoom"] == {"r1": ITEMS[:2], "r2": [ITEMS[2]]}
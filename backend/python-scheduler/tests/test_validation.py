@@ -0,0 +1,73 @@
+# test_validation.py
+import pytest
+
+from validation import TimetableValidator
+
+PAYLOAD = {
+    "classes": [{"id": "c1", "subjects": [{"subjectId": "maths", "teacherId": "t1", "hoursPerWeek": 2},
+                                          {"subjectId": "lab", "teacherId": "t2", "hoursPerWeek": 2}]},
+                {"id": "c2", "subjects": [{"subjectId": "maths", "teacherId": "t1", "hoursPerWeek": 1}]}],
+    "teachers": [{"id": "t1", "maxHoursPerDay": 2, "unavailableSlots": [{"day": "Friday", "period": 1}]},
+                 {"id": "t2"}],
+    "subjects": [{"id": "maths"}, {"id": "lab", "isLab": True}],
+}
+
+
+def lesson(class_id, day, period, subject_id="maths", teacher_id="t1"):
+    return {"classId": class_id, "day": day, "period": period, "subjectId": subject_id, "teacherId": teacher_id}
+
+
+TIMETABLE = [
+    lesson("c1", "Monday", 1), lesson("c1", "Tuesday", 1),
+    lesson("c1", "Monday", 3, "lab", "t2"), lesson("c1", "Monday", 4, "lab", "t2"),
+    lesson("c2", "Wednesday", 1),
+]
+
+
+def test_valid_timetable_has_no_conflicts():
+    validator = TimetableValidator(PAYLOAD)
+    assert validator.validate(validator.index(TIMETABLE)) == []
+
+
+def test_every_hard_rule_is_checked():
+    validator = TimetableValidator(dict(PAYLOAD, checkHours=True))
+    timetable = [
+        lesson("c1", "Monday", 1), lesson("c2", "Monday", 1),  # t1 double-booked
+        lesson("c1", "Friday", 1),  # t1 unavailable
+        lesson("c1", "Tuesday", 3, "lab", "t2"),  # lone lab period
+        lesson("c2", "Tuesday", 1, "lab", "t2"),  # c2 does not take the lab
+    ]
+
+    types = {conflict["type"] for conflict in validator.validate(validator.index(timetable))}
+
+    assert {"teacher_double_booking", "teacher_unavailable", "lab_not_paired",
+            "invalid_assignment", "subject_hours"} <= types
+
+
+def test_edits_are_checked_without_changing_the_timetable():
+    validator = TimetableValidator(PAYLOAD)
+    state = validator.index(TIMETABLE)
+    clash = {"move": {"classId": "c2", "day": "Wednesday", "period": 1}, "to": {"day": "Monday", "period": 1}}
+    harmless = {"move": {"classId": "c2", "day": "Wednesday", "period": 1}, "to": {"period": 2}}
+
+    result = validator.check_edit(state, clash)
+    assert not result["valid"]
+    assert [c["type"] for c in result["introduced"]] == ["teacher_double_booking"]
+    assert validator.check_edit(state, harmless)["valid"]
+    assert sorted(map(str, state.timetable())) == sorted(map(str, TIMETABLE))
+
+    validator.check_edit(state, harmless, commit=True)
+    assert lesson("c2", "Wednesday", 2) in state.timetable()
+    with pytest.raises(ValueError, match="No lesson for class c2 at Wednesday period 1"):
+        validator.check_edit(state, harmless)
+
+
+def test_validate_endpoint_checks_a_batch_of_edits():
+    import main
+    response = main.app.test_client().post("/validate", json=dict(PAYLOAD, timetable=TIMETABLE, edits=[
+        {"move": {"classId": "c2", "day": "Wednesday", "period": 1}, "to": {"day": "Monday"}},
+        {"remove": {"classId": "c2", "day": "Wednesday", "period": 1}},
+    ]))
+
+    results = response.get_json()["results"]
+    assert [result["valid"] for result in results] == [False, True]